@@ -5,116 +5,81 @@ MBRACE Intelligence - Maryland Incentive Scan Report Generator
 This script generates personalized PDF reports for calculator submissions.
 Run with: python generate_incentive_report.py --data '{"address": "123 Main St", ...}'
 
+Or render a whole file of submissions (JSONL or CSV) in one process:
+    python generate_incentive_report.py --batch leads.jsonl --out-dir reports/
+
+Or write smaller PDFs for email delivery with the lean output profile:
+    python generate_incentive_report.py --batch leads.jsonl --output-profile lean
+
+Or combine a whole batch into one PDF with bookmarks and an index page:
+    python generate_incentive_report.py --batch leads.jsonl --combined campaign.pdf
+
+Or run the long-lived HTTP render service (see report_service.py):
+    python generate_incentive_report.py serve --port 8080
+
+Or benchmark the scoring and rendering hot paths (see report_bench.py):
+    python generate_incentive_report.py bench --output bench.json
+
+Or queue submissions durably and drain them with workers (see report_queue.py):
+    python generate_incentive_report.py queue enqueue leads.jsonl
+    python generate_incentive_report.py queue work --drain
+
+Or roll many properties with unit counts into one portfolio report (see portfolio_report.py):
+    python generate_incentive_report.py portfolio properties.csv --output portfolio.pdf
+
+Or re-render only the leads a catalog change affects (see report_rescore.py):
+    python generate_incentive_report.py rescore leads.jsonl --old previous_rules.json
+
+Or compare what-if scenarios for one lead (see scenario_sweep.py):
+    python generate_incentive_report.py sweep --data '{...}' --vary utility='*' --pdf sweep.pdf
+
+Or keep submissions in a memory-mapped columnar archive for fast re-scoring (see lead_archive.py):
+    python generate_incentive_report.py archive import leads.jsonl --archive leads.mba
+    python generate_incentive_report.py archive score --archive leads.mba
+
+Or rank the lead pipeline by incentive value and urgency (see lead_index.py):
+    python generate_incentive_report.py index add leads.jsonl
+    python generate_incentive_report.py index top --k 500 --urgency HIGH --utility Pepco
+
 Or import and use programmatically:
-    from generate_incentive_report import generate_report
+    from generate_incentive_report import generate_report, render_report_bytes
     pdf_path = generate_report(submission_data)
+    pdf_bytes = render_report_bytes(submission_data)  # in memory, no file
 """
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import (
-    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, 
-    PageBreak, Image, HRFlowable
-)
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
+from io import BytesIO
+import hashlib
 import json
+import csv
 import argparse
 import os
+import subprocess
+import sys
+import time
+
+from incentive_rules import get_rules, is_blank, set_rules
+from report_cache import ReportCache
 
 
 # ============================================================================
-# COLOR SCHEME (MBRACE Brand)
+# LAZY LAYOUT EXPORTS
 # ============================================================================
-COLORS = {
-    'primary': colors.HexColor('#1a365d'),      # Dark blue
-    'secondary': colors.HexColor('#2c5282'),    # Medium blue
-    'accent': colors.HexColor('#ed8936'),       # Orange
-    'success': colors.HexColor('#38a169'),      # Green
-    'warning': colors.HexColor('#d69e2e'),      # Yellow
-    'text': colors.HexColor('#2d3748'),         # Dark gray
-    'light_gray': colors.HexColor('#e2e8f0'),   # Light gray
-    'white': colors.white
-}
+# reportlab-backed names, loaded from report_layout on first use so importing
+# this module for calculate_incentives() does not pull in the PDF stack
+_LAYOUT_EXPORTS = frozenset({
+    'COLORS', 'get_custom_styles', 'get_table_styles', 'default_styles', 'RESOURCES',
+    'MANDATE_CONTEXT', 'NEXT_STEPS', 'DISCLAIMER', 'report_variant',
+    'PrewrappedParagraph', 'build_static_fragments', 'get_template_fragments',
+    'clear_template_cache', 'OUTPUT_PROFILES', 'lean_styles', 'collapse_table_style',
+})
 
 
-# ============================================================================
-# CUSTOM STYLES
-# ============================================================================
-def get_custom_styles():
-    styles = getSampleStyleSheet()
-    
-    styles.add(ParagraphStyle(
-        name='ReportTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=COLORS['primary'],
-        spaceAfter=20,
-        alignment=TA_CENTER
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='SectionHeader',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=COLORS['primary'],
-        spaceBefore=20,
-        spaceAfter=10,
-        borderPadding=5,
-        backColor=COLORS['light_gray']
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='SubHeader',
-        parent=styles['Heading3'],
-        fontSize=12,
-        textColor=COLORS['secondary'],
-        spaceBefore=15,
-        spaceAfter=8
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='MBRACEBody',
-        parent=styles['Normal'],
-        fontSize=10,
-        textColor=COLORS['text'],
-        spaceBefore=6,
-        spaceAfter=6,
-        leading=14
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='Highlight',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=COLORS['primary'],
-        backColor=COLORS['light_gray'],
-        borderPadding=10,
-        spaceBefore=10,
-        spaceAfter=10
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='BigNumber',
-        parent=styles['Normal'],
-        fontSize=28,
-        textColor=COLORS['success'],
-        alignment=TA_CENTER,
-        spaceBefore=10,
-        spaceAfter=10
-    ))
-    
-    styles.add(ParagraphStyle(
-        name='Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.gray,
-        alignment=TA_CENTER
-    ))
-    
-    return styles
+def __getattr__(name):
+    if name in _LAYOUT_EXPORTS:
+        import report_layout
+        return getattr(report_layout, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ============================================================================
@@ -124,473 +89,772 @@ def calculate_incentives(data):
     """
     Calculate incentive eligibility based on submission data.
     Returns dict with program details and estimated amounts.
-    """
-    building_type = data.get('building_type', 'single_family')
-    income_level = data.get('income_level', 'over_150_ami')
-    utility = data.get('utility', 'BGE')
-    heating_system = data.get('heating_system', 'gas')
-    system_age = data.get('system_age', '10-15')
-    
-    incentives = {
-        'programs': [],
-        'utility_rebate': {'name': '', 'low': 0, 'high': 0},
-        'federal_rebate': {'name': '', 'low': 0, 'high': 0},
-        'state_grant': {'name': '', 'low': 0, 'high': 0},
-        'total_low': 0,
-        'total_high': 0,
-        'coverage_percent': '',
-        'annual_savings': {'low': 0, 'high': 0},
-        'payback_years': 0,
-        'compliance_status': '',
-        'urgency_level': ''
-    }
     
-    # -------------------------------------------------------------------------
-    # UTILITY REBATES (EmPOWER Maryland)
-    # -------------------------------------------------------------------------
-    utility_programs = {
-        'BGE': {'name': 'BGE EmPOWER', 'low': 3000, 'high': 8000},
-        'Pepco': {'name': 'Pepco EmPOWER', 'low': 2500, 'high': 7000},
-        'Potomac Edison': {'name': 'Potomac Edison EmPOWER', 'low': 2000, 'high': 6000},
-        'SMECO': {'name': 'SMECO EmPOWER', 'low': 2500, 'high': 5000},
-        'Other': {'name': 'Utility Rebates', 'low': 1500, 'high': 4000}
-    }
+    data may be a submission dict or a submission.Submission. Known spellings
+    of field values ("pepco", "Single Family") are resolved to catalog values;
+    use Submission.from_dict() to reject unrecognized values instead.
     
-    if utility in utility_programs:
-        incentives['utility_rebate'] = utility_programs[utility]
-        incentives['programs'].append({
-            'name': f"{utility_programs[utility]['name']} Rebates",
-            'type': 'Utility',
-            'amount': f"${utility_programs[utility]['low']:,} - ${utility_programs[utility]['high']:,}",
-            'eligibility': 'All Maryland ratepayers',
-            'notes': 'Heat pump and envelope improvement rebates'
-        })
-    
-    # -------------------------------------------------------------------------
-    # FEDERAL REBATES (IRA)
-    # -------------------------------------------------------------------------
-    if income_level == 'under_80_ami':
-        incentives['federal_rebate'] = {
-            'name': 'IRA HEEHR',
-            'low': 8000,
-            'high': 14000
-        }
-        incentives['programs'].append({
-            'name': 'IRA HEEHR (Home Efficiency Rebates)',
-            'type': 'Federal',
-            'amount': '$8,000 - $14,000',
-            'eligibility': 'Households under 80% AMI',
-            'notes': '100% of project costs covered for qualifying measures'
-        })
-    elif income_level == '80_150_ami':
-        incentives['federal_rebate'] = {
-            'name': 'IRA HOMES',
-            'low': 2000,
-            'high': 4000
-        }
-        incentives['programs'].append({
-            'name': 'IRA HOMES Rebates',
-            'type': 'Federal',
-            'amount': '$2,000 - $4,000',
-            'eligibility': 'Households 80-150% AMI',
-            'notes': '50% of project costs covered, capped amounts'
-        })
-    else:
-        incentives['federal_rebate'] = {
-            'name': '25C Tax Credit',
-            'low': 2000,
-            'high': 2000
-        }
-        incentives['programs'].append({
-            'name': 'Federal 25C Tax Credit',
-            'type': 'Federal',
-            'amount': 'Up to $2,000',
-            'eligibility': 'All taxpayers',
-            'notes': 'Annual tax credit for qualifying heat pumps'
-        })
-    
-    # -------------------------------------------------------------------------
-    # STATE GRANTS (MEA)
-    # -------------------------------------------------------------------------
-    if building_type == 'nonprofit':
-        incentives['state_grant'] = {
-            'name': 'MEA ECB/EEE Grants',
-            'low': 5000,
-            'high': 25000
-        }
-        incentives['programs'].append({
-            'name': 'MEA Electrifying Community Buildings (ECB)',
-            'type': 'State Grant',
-            'amount': '$5,000 - $25,000+',
-            'eligibility': '501(c)(3) community-serving facilities',
-            'notes': 'Heat pumps, HPWH, panel upgrades, envelope'
-        })
-        incentives['programs'].append({
-            'name': 'MEA Energy Efficiency Equity (EEE)',
-            'type': 'State Grant',
-            'amount': 'Additional coverage',
-            'eligibility': 'Facilities serving LMI populations',
-            'notes': 'Insulation, air sealing, efficiency measures'
-        })
-    elif building_type == '5+_multifamily':
-        if income_level in ['under_80_ami', '80_150_ami']:
-            incentives['state_grant'] = {
-                'name': 'DHCD/MEEHA',
-                'low': 3000,
-                'high': 12000
-            }
-            incentives['programs'].append({
-                'name': 'DHCD MEEHA / Multifamily Programs',
-                'type': 'State',
-                'amount': '$3,000 - $12,000 per unit',
-                'eligibility': 'Affordable multifamily properties',
-                'notes': 'Often covers 50-100% of project costs'
-            })
-    elif income_level == 'under_80_ami':
-        incentives['state_grant'] = {
-            'name': 'MEA Residential',
-            'low': 2000,
-            'high': 8000
-        }
-        incentives['programs'].append({
-            'name': 'MEA Residential Heat Pump Rebates',
-            'type': 'State',
-            'amount': '$2,000 - $8,000',
-            'eligibility': 'LMI Maryland households',
-            'notes': 'Income-qualified rebates for heat pumps'
-        })
-    
-    # -------------------------------------------------------------------------
-    # CALCULATE TOTALS
-    # -------------------------------------------------------------------------
-    incentives['total_low'] = (
-        incentives['utility_rebate'].get('low', 0) +
-        incentives['federal_rebate'].get('low', 0) +
-        incentives['state_grant'].get('low', 0)
-    )
-    
-    incentives['total_high'] = (
-        incentives['utility_rebate'].get('high', 0) +
-        incentives['federal_rebate'].get('high', 0) +
-        incentives['state_grant'].get('high', 0)
-    )
-    
-    # -------------------------------------------------------------------------
-    # ESTIMATE PROJECT COST & COVERAGE
-    # -------------------------------------------------------------------------
-    project_costs = {
-        'single_family': 15000,
-        '2-4_unit': 35000,
-        '5+_multifamily': 20000,  # per unit
-        'nonprofit': 50000
-    }
+    Program amounts and eligibility rules live in incentive_rules.json and are
+    compiled once per process (see incentive_rules.py). Results are memoized
+    and read-only; use incentive_rules.thaw() for a mutable copy.
+    """
+    return get_rules().evaluate_submission(data)
+
+
+def calculate_incentives_bulk(columns):
+    """
+    Score many submissions at once from column arrays (NumPy arrays or lists).
     
-    est_cost = project_costs.get(building_type, 15000)
-    avg_incentive = (incentives['total_low'] + incentives['total_high']) / 2
-    coverage = min(100, int((avg_incentive / est_cost) * 100))
+    Args:
+        columns: dict with utility, income_level, building_type, heating_system
+            and system_age columns; missing columns or None cells use the defaults
     
-    if coverage >= 80:
-        incentives['coverage_percent'] = '80-100%'
-    elif coverage >= 50:
-        incentives['coverage_percent'] = '50-80%'
-    elif coverage >= 30:
-        incentives['coverage_percent'] = '30-50%'
+    Returns:
+        dict of columns: total_low, total_high, coverage_percent,
+        annual_savings_low, annual_savings_high, payback_years, urgency_level
+    """
+    return get_rules().evaluate_bulk(columns)
+
+
+# ============================================================================
+# CLOCK & DETERMINISTIC MODE
+# ============================================================================
+# Report date in deterministic mode (golden comparisons, reproducible output)
+DETERMINISTIC_DATE = datetime(2025, 1, 1)
+
+_clock = datetime.now
+_deterministic = False
+
+
+def set_clock(clock=None):
+    """
+    Take report dates ("Report Generated", report cache keys) from clock(),
+    a callable returning a datetime. None restores datetime.now.
+    """
+    global _clock
+    _clock = clock or datetime.now
+
+
+def report_clock():
+    """The date and time stamped on a report rendered now (see set_clock)."""
+    return _clock()
+
+
+def set_deterministic(enabled=True, when=None):
+    """
+    Turn deterministic rendering on or off for this process.
+
+    In deterministic mode every report is dated `when` (default
+    DETERMINISTIC_DATE) and PDFs are written with reportlab's invariant
+    flag (fixed document ID and timestamps), so the same submission always
+    renders to the same bytes. The setting is exported as
+    MBRACE_DETERMINISTIC, so render processes started afterwards inherit it.
+    """
+    global _deterministic
+    _deterministic = enabled
+    if enabled:
+        when = when or DETERMINISTIC_DATE
+        set_clock(lambda: when)
+        os.environ['MBRACE_DETERMINISTIC'] = when.isoformat()
     else:
-        incentives['coverage_percent'] = '15-30%'
-    
-    # -------------------------------------------------------------------------
-    # ANNUAL SAVINGS (based on current fuel)
-    # -------------------------------------------------------------------------
-    savings_by_fuel = {
-        'gas': {'low': 400, 'high': 600},
-        'oil': {'low': 800, 'high': 1400},
-        'propane': {'low': 900, 'high': 1400},
-        'electric_resistance': {'low': 700, 'high': 1200},
-        'existing_heat_pump': {'low': 100, 'high': 300}
-    }
-    
-    incentives['annual_savings'] = savings_by_fuel.get(
-        heating_system, 
-        {'low': 400, 'high': 800}
-    )
-    
-    # -------------------------------------------------------------------------
-    # COMPLIANCE STATUS
-    # -------------------------------------------------------------------------
-    system_age_risk = {
-        '20+': 'HIGH',
-        '15-20': 'MODERATE',
-        '10-15': 'LOW',
-        '<10': 'MINIMAL'
+        set_clock(None)
+        os.environ.pop('MBRACE_DETERMINISTIC', None)
+
+
+def pdf_invariant():
+    """reportlab invariant flag for new documents: 1 in deterministic mode, else None (rl_config default)."""
+    return 1 if _deterministic else None
+
+
+if os.environ.get('MBRACE_DETERMINISTIC'):
+    set_deterministic(when=datetime.fromisoformat(os.environ['MBRACE_DETERMINISTIC']))
+
+
+# ============================================================================
+# OUTPUT NAMING & REPORT CACHE
+# ============================================================================
+# Bump when report layout or copy changes so cached PDFs are not reused
+TEMPLATE_VERSION = '1'
+
+# Submission fields that change a report's content (contact details do not)
+REPORT_FIELDS = ('address', 'building_type', 'utility', 'heating_system', 'system_age', 'income_level')
+
+
+def report_key(data, generated_at=None, output_profile='standard'):
+    """
+    Content key for a report: a hash of the report-relevant submission fields,
+    the incentive catalog, TEMPLATE_VERSION, the report date and (when not
+    standard) the output profile.
+
+    Field values are folded as Submission.from_dict folds them (known
+    spellings onto their catalog value, text stripped, blanks dropped), so a
+    raw dict and its Submission share a key. Unrecognized values are kept
+    as sent, since the report prints them.
+    """
+    from submission import ENUM_FIELDS, normalize_value
+    generated_at = generated_at or report_clock()
+    rules = get_rules()
+    submission = {}
+    for field in REPORT_FIELDS:
+        value = data.get(field)
+        if is_blank(value):
+            continue
+        member = normalize_value(field, value) if field in ENUM_FIELDS else None
+        submission[field] = member.value if member is not None else str(value).strip()
+    material = {
+        'submission': submission,
+        'rules': [rules.version, rules.fingerprint],
+        'template': TEMPLATE_VERSION,
+        'date': generated_at.strftime('%Y-%m-%d'),
     }
+    if output_profile != 'standard':
+        material['profile'] = output_profile
+    encoded = json.dumps(material, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:32]
+
+
+_report_cache = None
+
+
+def get_report_cache():
+    """The cache behind generate_report's default output path (./reports, unbounded)."""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache('reports')
+    return _report_cache
+
+
+def configure_report_cache(directory='reports', max_bytes=None, max_age=None):
+    """Point the default output cache elsewhere and/or bound its size (bytes) and age (seconds)."""
+    global _report_cache
+    _report_cache = ReportCache(directory, max_bytes, max_age)
+    return _report_cache
+
+
+# ============================================================================
+# PDF GENERATION
+# ============================================================================
+def generate_report(data, output_path=None, styles=None, table_styles=None, use_template_cache=True,
+                    writer=None, output_profile='standard'):
+    """
+    Generate a personalized incentive scan PDF report.
     
-    risk = system_age_risk.get(system_age, 'MODERATE')
+    Args:
+        data: dict with submission data (address, building_type, utility, etc.)
+        output_path: optional output path or writable binary file object such as
+            BytesIO (defaults to the report cache, see below)
+        styles: optional stylesheet from get_custom_styles() (defaults to the
+            process-wide default_styles(), built once)
+        table_styles: optional dict from get_table_styles() (same default)
+        use_template_cache: reuse pre-laid-out static sections across reports
+            that share a stylesheet; False lays out the whole story from scratch
+        writer: optional callable receiving the PDF as bytes chunks instead of
+            writing a file (output_path is ignored)
+        output_profile: 'standard', or 'lean' for smaller PDFs meant for email
+            delivery (binary compressed streams, base-14 fonts, collapsed table
+            styles; styles default to report_layout.lean_styles())
+    
+    Without output_path or writer, the report goes to the report cache
+    (./reports/incentive_scan_{report_key}.pdf) and an identical earlier
+    render from the same day is returned without rendering again. Custom
+    styles are not part of the key, so with them the report is always
+    rendered, to a file of its own in the cache directory.
+    
+    The report date comes from report_clock(); see set_deterministic() for
+    reproducible output.
     
-    if risk == 'HIGH':
-        incentives['compliance_status'] = 'Your system is likely to require replacement before or during the ZEHES mandate phase-in (2029+). Acting now maximizes incentive capture.'
-        incentives['urgency_level'] = 'HIGH'
-    elif risk == 'MODERATE':
-        incentives['compliance_status'] = 'Your system may reach end-of-life during the mandate transition period. Planning now provides flexibility and incentive optimization.'
-        incentives['urgency_level'] = 'MODERATE'
+    Returns:
+        str: path to generated PDF (the file object itself for file objects,
+        None when a writer callback is used)
+    """
+    from report_layout import WriterFile, profile_styles
+    shared_styles, shared_table_styles = profile_styles(output_profile)
+    custom_styles = ((styles is not None and styles is not shared_styles)
+                     or (table_styles is not None and table_styles is not shared_table_styles))
+    if styles is None:
+        styles = shared_styles
+    if table_styles is None:
+        table_styles = shared_table_styles
+    generated_at = report_clock()
+    
+    def build(target):
+        _build_report(data, target, styles, table_styles, use_template_cache, generated_at, output_profile)
+    
+    if writer is not None:
+        build(WriterFile(writer))
+        return None
+    if output_path is None:
+        key = report_key(data, generated_at, output_profile)
+        if custom_styles:
+            return get_report_cache().put(f"{key}_{os.urandom(4).hex()}", build)
+        return get_report_cache().get_or_render(key, build)
+    build(output_path)
+    return output_path
+
+
+def _build_report(data, target, styles, table_styles, use_template_cache, generated_at,
+                  output_profile='standard'):
+    """
+    Lay out and write one report to target (see report_layout.build_report).
+    Stage timings go to any hooks registered with render_metrics.add_render_hook.
+    """
+    from report_layout import build_report
+    import render_metrics
+    timer = render_metrics.start_timer()
+    build_report(data, target, styles, table_styles, use_template_cache, generated_at, timer, output_profile,
+                 pdf_invariant())
+    render_metrics.emit(timer, output=target if isinstance(target, str) else type(target).__name__,
+                        building_type=data.get('building_type'), template_cache=use_template_cache,
+                        output_profile=output_profile)
+
+
+def render_report_bytes(data, styles=None, table_styles=None, use_template_cache=True,
+                        output_profile='standard'):
+    """
+    Render a report entirely in memory and return the PDF bytes.
+    Nothing is written to disk; use this to answer HTTP requests or upload to storage.
+    """
+    buffer = BytesIO()
+    generate_report(data, buffer, styles, table_styles, use_template_cache, output_profile=output_profile)
+    return buffer.getvalue()
+
+
+# ============================================================================
+# BATCH GENERATION
+# ============================================================================
+class InvalidSubmission(Exception):
+    """A batch input record that could not be parsed into a submission."""
+
+
+def read_submissions(path):
+    """
+    Stream submissions from a JSONL, CSV or lead archive file (chosen by extension).
+
+    Yields one dict per record. Records that cannot be parsed are yielded as
+    InvalidSubmission instances so the caller can log them and keep going.
+    Empty CSV cells are dropped so the calculator defaults apply. A lead
+    archive (.mba, see lead_archive.py) yields Submissions instead.
+    """
+    if path.lower().endswith('.mba'):
+        from lead_archive import LeadArchive
+        with LeadArchive(path) as archive:
+            yield from archive
+        return
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            for row in csv.DictReader(f):
+                yield {k: v for k, v in row.items() if k and v not in (None, '')}
+            return
+        
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield InvalidSubmission(f"line {line_no}: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield InvalidSubmission(f"line {line_no}: expected a JSON object")
+                continue
+            yield record
+
+
+# Warm per-process render state for pool workers (see _init_render_worker)
+_WORKER_STATE = {}
+
+
+def _init_render_worker():
+    """Process-pool initializer: build styles and fill the scoring cache once per worker."""
+    get_rules().precompute()
+    from report_layout import default_styles
+    _WORKER_STATE['styles'], _WORKER_STATE['table_styles'] = default_styles()
+
+
+def _render_in_worker(data, output_path, output_profile='standard'):
+    """Render one report inside a pool worker using its warm styles."""
+    if not _WORKER_STATE:
+        _init_render_worker()
+    start = time.perf_counter()
+    if output_profile == 'standard':
+        path = generate_report(data, output_path, _WORKER_STATE['styles'], _WORKER_STATE['table_styles'])
     else:
-        incentives['compliance_status'] = 'Your system has remaining useful life. Current incentives represent an opportunity for proactive upgrade at reduced cost.'
-        incentives['urgency_level'] = 'OPPORTUNITY'
+        path = generate_report(data, output_path, output_profile=output_profile)
+    return path, round(time.perf_counter() - start, 4)
+
+
+def _render_to_cache_in_worker(data, cache_dir, key, generated_at):
+    """Render one report into a ReportCache directory inside a pool worker."""
+    if not _WORKER_STATE:
+        _init_render_worker()
+    start = time.perf_counter()
+    path = ReportCache(cache_dir).put(key, lambda target: _build_report(
+        data, target, _WORKER_STATE['styles'], _WORKER_STATE['table_styles'], True, generated_at
+    ))
+    return path, round(time.perf_counter() - start, 4)
+
+
+def _render_bytes_in_worker(data, generated_at=None):
+    """Render one report to bytes inside a pool worker using its warm styles, dated generated_at (default now)."""
+    if not _WORKER_STATE:
+        _init_render_worker()
+    start = time.perf_counter()
+    buffer = BytesIO()
+    _build_report(data, buffer, _WORKER_STATE['styles'], _WORKER_STATE['table_styles'], True,
+                  generated_at or report_clock())
+    return buffer.getvalue(), round(time.perf_counter() - start, 4)
+
+
+def _error_entry(entry, error):
+    entry['status'] = 'error'
+    entry['error'] = f"{type(error).__name__}: {error}"
+    return entry
+
+
+def _iter_batch_jobs(submissions, out_dir, indexed=False, output_profile='standard'):
+    """
+    Validate each record into a Submission and pair it with its output path,
+    or turn it into an error entry (unparseable or invalid field values).
+    """
+    from submission import Submission, SubmissionError
+    for index, data in (submissions if indexed else enumerate(submissions, 1)):
+        entry = {'index': index}
+        if isinstance(data, Exception):
+            yield entry, None, _error_entry(entry, data)
+            continue
+        try:
+            submission = Submission.from_dict(data)
+        except SubmissionError as e:
+            yield entry, None, _error_entry(entry, e)
+            continue
+        output_path = os.path.join(out_dir, f"incentive_scan_{index:06d}.pdf")
+        yield entry, (submission, output_path, output_profile), None
+
+
+def _render_serial(jobs):
+    _init_render_worker()
+    for entry, job, error_entry in jobs:
+        if error_entry is not None:
+            yield error_entry
+            continue
+        try:
+            entry['output'], entry['seconds'] = _render_in_worker(*job)
+            entry['bytes'] = os.path.getsize(entry['output'])
+            entry['status'] = 'ok'
+        except Exception as e:
+            _error_entry(entry, e)
+        yield entry
+
+
+def _render_parallel(jobs, workers, ordered, max_in_flight):
+    """
+    Shard jobs across a process pool.
+
+    At most max_in_flight renders are queued at once so a large input file is
+    never materialized in memory. With ordered=True, finished entries are held
+    back until every earlier record has been delivered.
+    """
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from collections import deque
+    
+    pending = {}
+    finished = {}
+    order = deque()  # indices not yet delivered, in input order
+    
+    def collect(futures):
+        for future in futures:
+            entry = pending.pop(future)
+            try:
+                entry['output'], entry['seconds'] = future.result()
+                entry['bytes'] = os.path.getsize(entry['output'])
+                entry['status'] = 'ok'
+            except Exception as e:
+                _error_entry(entry, e)
+            finished[entry['index']] = entry
+    
+    def deliver():
+        if not ordered:
+            for index in list(finished):
+                yield finished.pop(index)
+            return
+        while order and order[0] in finished:
+            yield finished.pop(order.popleft())
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as pool:
+        for entry, job, error_entry in jobs:
+            if ordered:
+                order.append(entry['index'])
+            if error_entry is not None:
+                finished[entry['index']] = error_entry
+            else:
+                pending[pool.submit(_render_in_worker, *job)] = entry
+            while len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            yield from deliver()
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+            yield from deliver()
+    yield from deliver()
+
+
+def generate_reports(submissions, out_dir='reports', manifest_path=None,
+                     workers=1, ordered=True, max_in_flight=None, indexed=False, output_profile='standard'):
+    """
+    Render one PDF per submission, reusing styles across the whole run.
     
-    # -------------------------------------------------------------------------
-    # PAYBACK CALCULATION
-    # -------------------------------------------------------------------------
-    net_cost = est_cost - avg_incentive
-    avg_savings = (incentives['annual_savings']['low'] + incentives['annual_savings']['high']) / 2
+    Records are validated strictly (see submission.Submission): a record with
+    an unrecognized field value becomes an error entry instead of a report
+    scored with the catalog defaults.
     
-    if avg_savings > 0 and net_cost > 0:
-        incentives['payback_years'] = round(net_cost / avg_savings, 1)
+    Args:
+        submissions: iterable of submission dicts or Submissions (e.g. from read_submissions)
+        out_dir: directory for the generated PDFs
+        manifest_path: optional JSONL file that receives one entry per record
+        workers: number of render processes (1 renders in this process)
+        ordered: deliver entries in input order (False yields as renders finish)
+        max_in_flight: cap on queued renders when workers > 1 (default 2x workers)
+        indexed: submissions are (index, record) pairs, e.g. a filtered subset
+            of a file that keeps each record's original index and output name
+        output_profile: 'standard' or 'lean' (see generate_report)
+    
+    Yields:
+        dict: manifest entry with index, status and output path and bytes, or error
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = _iter_batch_jobs(submissions, out_dir, indexed, output_profile)
+    if workers > 1:
+        entries = _render_parallel(jobs, workers, ordered, max_in_flight or workers * 2)
     else:
-        incentives['payback_years'] = 0
+        entries = _render_serial(jobs)
     
-    return incentives
+    manifest = open(manifest_path, 'w', encoding='utf-8') if manifest_path else None
+    try:
+        for entry in entries:
+            if manifest:
+                manifest.write(json.dumps(entry) + '\n')
+                manifest.flush()
+            yield entry
+    finally:
+        if manifest:
+            manifest.close()
 
 
-# ============================================================================
-# PDF GENERATION
-# ============================================================================
-def generate_report(data, output_path=None):
+def combined_title(index, raw, submission):
     """
-    Generate a personalized incentive scan PDF report.
+    Outline title of one report in a combined PDF: "3. Org Name, 12 Oak St".
+
+    Without an organization or address, the lead's id or contact from the
+    raw record is used, and failing that its building type and utility.
+    """
+    from lead_index import CONTACT_ID_FIELDS, LEAD_ID_FIELDS
+    name = ', '.join(value for value in (submission.get('org_name'), submission.get('address')) if value)
+    if not name:
+        name = next((str(raw[field]).strip() for field in LEAD_ID_FIELDS + CONTACT_ID_FIELDS
+                     if not is_blank(raw.get(field))), None)
+    if not name:
+        building_type = (submission.get('building_type') or 'unspecified building').replace('_', ' ').title()
+        name = f"{building_type}, {submission.get('utility') or 'no utility'}, no address"
+    return f"{index}. {name}"
+
+
+def _iter_combined_items(submissions):
+    """(index, title, Submission or error) per record for report_layout.build_combined_report."""
+    from submission import Submission, SubmissionError
+    for index, raw in enumerate(submissions, 1):
+        data = raw
+        if not isinstance(data, Exception):
+            try:
+                data = Submission.from_dict(raw)
+            except SubmissionError as e:
+                data = e
+        if isinstance(data, Exception):
+            yield index, None, data
+            continue
+        yield index, combined_title(index, raw, data), data
+
+
+def generate_combined_report(submissions, output_path, styles=None, table_styles=None, title=None,
+                             output_profile='standard'):
+    """
+    Render many submissions into one PDF (a campaign export for a partner).
+    
+    Each report starts on a new page and gets a bookmark titled with the
+    organization and/or address (see combined_title); a closing index page
+    links to every report. Records are read and laid out one at a time,
+    so the whole story is never held, but reportlab keeps every finished
+    page until the file is written: memory grows with the page count
+    (about 20 KB per page, so split very large campaigns). Invalid records
+    are listed on the index page instead of stopping the export.
     
     Args:
-        data: dict with submission data (address, building_type, utility, etc.)
-        output_path: optional output path (defaults to ./reports/scan_{timestamp}.pdf)
+        submissions: iterable of submission dicts or Submissions (e.g. from read_submissions)
+        output_path: output PDF path or writable binary file object
+        styles, table_styles: as for generate_report
+        title: PDF document title
+        output_profile: 'standard' or 'lean' (see generate_report)
     
     Returns:
-        str: path to generated PDF
+        dict: reports, pages and skipped [(index, error)]
     """
-    styles = get_custom_styles()
-    incentives = calculate_incentives(data)
-    
-    # Default output path
-    if output_path is None:
-        os.makedirs('reports', exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_path = f"reports/incentive_scan_{timestamp}.pdf"
-    
-    doc = SimpleDocTemplate(
-        output_path,
-        pagesize=letter,
-        rightMargin=0.75*inch,
-        leftMargin=0.75*inch,
-        topMargin=0.75*inch,
-        bottomMargin=0.75*inch
-    )
-    
-    story = []
-    
-    # =========================================================================
-    # HEADER
-    # =========================================================================
-    story.append(Paragraph("MBRACE INTELLIGENCE", styles['ReportTitle']))
-    story.append(Paragraph("Maryland Electrification Incentive Scan", styles['SubHeader']))
-    story.append(Spacer(1, 10))
-    
-    # Property info bar
-    property_info = f"""
-    <b>Property:</b> {data.get('address', 'N/A')}<br/>
-    <b>Building Type:</b> {data.get('building_type', 'N/A').replace('_', ' ').title()}<br/>
-    <b>Utility Territory:</b> {data.get('utility', 'N/A')}<br/>
-    <b>Report Generated:</b> {datetime.now().strftime('%B %d, %Y')}
-    """
-    story.append(Paragraph(property_info, styles['MBRACEBody']))
-    story.append(HRFlowable(width="100%", thickness=2, color=COLORS['primary']))
-    story.append(Spacer(1, 15))
-    
-    # =========================================================================
-    # INCENTIVE SUMMARY (The Big Number)
-    # =========================================================================
-    story.append(Paragraph("ESTIMATED TOTAL INCENTIVES", styles['SectionHeader']))
-    
-    total_range = f"${incentives['total_low']:,} — ${incentives['total_high']:,}"
-    story.append(Paragraph(total_range, styles['BigNumber']))
-    
-    coverage_text = f"Estimated Coverage: <b>{incentives['coverage_percent']}</b> of project costs"
-    story.append(Paragraph(coverage_text, styles['Highlight']))
-    story.append(Spacer(1, 10))
-    
-    # =========================================================================
-    # PROGRAM BREAKDOWN TABLE
-    # =========================================================================
-    story.append(Paragraph("PROGRAM ELIGIBILITY BREAKDOWN", styles['SectionHeader']))
-    
-    # Build table data
-    table_data = [['Program', 'Type', 'Est. Amount', 'Notes']]
-    
-    for prog in incentives['programs']:
-        table_data.append([
-            prog['name'],
-            prog['type'],
-            prog['amount'],
-            prog['notes']
-        ])
-    
-    # Create table
-    program_table = Table(table_data, colWidths=[2.2*inch, 0.8*inch, 1.3*inch, 2.2*inch])
-    program_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
-        ('TEXTCOLOR', (0, 0), (-1, 0), COLORS['white']),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('TOPPADDING', (0, 0), (-1, 0), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), COLORS['light_gray']),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [COLORS['white'], COLORS['light_gray']]),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.gray),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    
-    story.append(program_table)
-    story.append(Spacer(1, 20))
-    
-    # =========================================================================
-    # FINANCIAL IMPACT
-    # =========================================================================
-    story.append(Paragraph("FINANCIAL IMPACT ANALYSIS", styles['SectionHeader']))
-    
-    financial_data = [
-        ['Metric', 'Value'],
-        ['Est. Annual Energy Savings', f"${incentives['annual_savings']['low']:,} — ${incentives['annual_savings']['high']:,}"],
-        ['Est. Payback Period (with incentives)', f"~{incentives['payback_years']} years"],
-        ['15-Year Net Benefit vs. Waiting', f"${int(incentives['annual_savings']['low'] * 15 - (15000 - incentives['total_low'])):,}+"],
-    ]
-    
-    financial_table = Table(financial_data, colWidths=[3.5*inch, 3*inch])
-    financial_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), COLORS['secondary']),
-        ('TEXTCOLOR', (0, 0), (-1, 0), COLORS['white']),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.gray),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [COLORS['white'], COLORS['light_gray']]),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    
-    story.append(financial_table)
-    story.append(Spacer(1, 20))
-    
-    # =========================================================================
-    # COMPLIANCE STATUS
-    # =========================================================================
-    story.append(Paragraph("MANDATE COMPLIANCE STATUS", styles['SectionHeader']))
-    
-    urgency_colors = {
-        'HIGH': COLORS['accent'],
-        'MODERATE': COLORS['warning'],
-        'OPPORTUNITY': COLORS['success']
+    from report_layout import build_combined_report, profile_styles
+    if styles is None:
+        styles = profile_styles(output_profile)[0]
+    if table_styles is None:
+        table_styles = profile_styles(output_profile)[1]
+    return build_combined_report(_iter_combined_items(submissions), output_path, styles, table_styles,
+                                 report_clock(), title, output_profile, pdf_invariant())
+
+
+def summarize_batch(entries, elapsed):
+    """Summarize manifest entries from generate_reports into run-level stats."""
+    succeeded = [e for e in entries if e['status'] == 'ok']
+    failed = [e for e in entries if e['status'] != 'ok']
+    render_seconds = sum(e.get('seconds', 0) for e in succeeded)
+    pdf_bytes = sum(e.get('bytes', 0) for e in succeeded)
+    return {
+        'total': len(succeeded) + len(failed),
+        'succeeded': len(succeeded),
+        'failed': len(failed),
+        'failed_indexes': [e['index'] for e in failed],
+        'elapsed_seconds': round(elapsed, 3),
+        'reports_per_second': round(len(succeeded) / elapsed, 2) if elapsed > 0 else 0,
+        'mean_render_seconds': round(render_seconds / len(succeeded), 4) if succeeded else 0,
+        'mean_pdf_bytes': round(pdf_bytes / len(succeeded)) if succeeded else 0,
     }
+
+
+# ============================================================================
+# RENDER PROFILE
+# ============================================================================
+def profile_report(data, output_path=None, top=25):
+    """
+    Profile one warm render of data with cProfile and tracemalloc.
     
-    urgency_style = ParagraphStyle(
-        name='UrgencyBox',
-        parent=styles['Highlight'],
-        backColor=urgency_colors.get(incentives['urgency_level'], COLORS['light_gray']),
-        textColor=COLORS['white'] if incentives['urgency_level'] == 'HIGH' else COLORS['text']
-    )
-    
-    story.append(Paragraph(
-        f"<b>Status: {incentives['urgency_level']}</b>",
-        urgency_style
-    ))
+    A first render warms imports, styles and caches so the profile shows
+    steady-state cost. The PDF goes to output_path, or stays in memory.
     
-    story.append(Paragraph(incentives['compliance_status'], styles['MBRACEBody']))
-    
-    # Mandate context
-    mandate_context = """
-    <b>Key Dates:</b><br/>
-    • <b>2025-2026:</b> Maryland Clean Heat Rules begin phasing in<br/>
-    • <b>~2029:</b> ZEHES mandate requires end-of-life fossil systems be replaced with heat pumps<br/>
-    • <b>2030:</b> State target: 95% of HVAC/water heater sales must be heat pumps<br/>
-    • <b>2040s:</b> Near-total replacement of fossil fuel heating systems
-    """
-    story.append(Paragraph(mandate_context, styles['MBRACEBody']))
-    story.append(Spacer(1, 15))
-    
-    # =========================================================================
-    # NEXT STEPS
-    # =========================================================================
-    story.append(Paragraph("RECOMMENDED NEXT STEPS", styles['SectionHeader']))
-    
-    if data.get('building_type') == 'nonprofit':
-        next_steps = """
-        <b>For Nonprofit Organizations:</b><br/><br/>
-        1. <b>Confirm 501(c)(3) documentation</b> — IRS determination letter required for MEA grants<br/><br/>
-        2. <b>Request program-approved energy assessment</b> — Contact MEA or your utility<br/><br/>
-        3. <b>Apply for ECB/EEE grants</b> — Download current FOA from MEA website<br/><br/>
-        4. <b>Stack utility rebates</b> — Submit EmPOWER pre-approval in parallel<br/><br/>
-        5. <b>Wait for written approval before installation</b> — Critical for incentive capture
-        """
-    elif data.get('building_type') in ['5+_multifamily', '2-4_unit']:
-        next_steps = """
-        <b>For Multifamily Property Owners:</b><br/><br/>
-        1. <b>Confirm low-income status documentation</b> — LIHTC, HUD contracts, or tenant income records<br/><br/>
-        2. <b>Identify program lane</b> — EmPOWER low-income track or DHCD/MEEHA for 5+ units<br/><br/>
-        3. <b>Request program-approved energy audit</b> — Contact DHCD or your utility<br/><br/>
-        4. <b>Stack incentives</b> — EmPOWER + IRA HEEHR/HOMES + MEA grants<br/><br/>
-        5. <b>Submit applications with audit report and quotes</b> — Pre-approval before install
-        """
-    else:
-        next_steps = """
-        <b>For Homeowners:</b><br/><br/>
-        1. <b>Verify income eligibility</b> — Under 80% AMI qualifies for maximum rebates<br/><br/>
-        2. <b>Get quotes from electrification-ready contractors</b> — Ask about Manual J calculations<br/><br/>
-        3. <b>Apply for utility rebates</b> — EmPOWER HPwES track for comprehensive upgrades<br/><br/>
-        4. <b>Claim federal tax credit</b> — 25C credit up to $2,000 for qualifying heat pumps<br/><br/>
-        5. <b>Document everything</b> — AHRI certificates, invoices, ENERGY STAR ratings
-        """
-    
-    story.append(Paragraph(next_steps, styles['MBRACEBody']))
-    story.append(Spacer(1, 20))
-    
-    # =========================================================================
-    # FOOTER / DISCLAIMER
-    # =========================================================================
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.gray))
-    story.append(Spacer(1, 10))
-    
-    disclaimer = """
-    <b>Disclaimer:</b> This report provides estimates based on current program information and the data 
-    you submitted. Actual incentive amounts depend on final eligibility verification, program availability, 
-    and project specifications. Programs and funding levels may change. MBRACE Intelligence does not 
-    install equipment or provide contracting services. Consult program administrators for final eligibility 
-    determinations.<br/><br/>
-    <b>MBRACE Intelligence</b> | Maryland Electrification Data & Compliance<br/>
-    Questions? Reply to the email or text that delivered this report.
-    """
-    story.append(Paragraph(disclaimer, styles['Footer']))
-    
-    # Build PDF
-    doc.build(story)
+    Returns:
+        tuple: (stage timing record from render_metrics, profile text)
+    """
+    import render_metrics
+    render_report_bytes(data)
+    records = []
+    hook = render_metrics.add_render_hook(records.append)
+    try:
+        _, text = render_metrics.profile_call(generate_report, data, output_path or BytesIO(), top=top)
+    finally:
+        render_metrics.remove_render_hook(hook)
+    import report_layout
+    footprint = report_layout.RESOURCES.footprint()
+    text += f"== shared render resources: {footprint['total_bytes'] / 1024:.1f} KiB ==\n"
+    for key, size in footprint['resources'].items():
+        text += f"{key}: {size / 1024:.1f} KiB\n"
+    return records[-1], text
+
+
+# ============================================================================
+# START-UP PROFILE
+# ============================================================================
+# Cold-start budget (milliseconds) checked by --profile-startup
+STARTUP_BUDGET_MS = {
+    'import_scoring': 150,   # import generate_incentive_report (no reportlab)
+    'first_score': 50,       # first calculate_incentives(), including the catalog load
+    'first_pdf': 1500,       # process start to the first PDF in memory
+}
+
+STARTUP_SAMPLE = {
+    'address': '1234 Main Street, Baltimore, MD 21201',
+    'building_type': 'nonprofit',
+    'utility': 'BGE',
+    'heating_system': 'oil',
+    'system_age': '20+',
+    'income_level': 'under_80_ami',
+    'org_name': 'Test Nonprofit',
+}
+
+# Runs in a fresh interpreter so every import is cold
+_STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import generate_incentive_report as reports
+imported = time.perf_counter()
+data = json.loads(sys.argv[1])
+reports.calculate_incentives(data)
+scored = time.perf_counter()
+reportlab_loaded = 'reportlab' in sys.modules
+import report_layout
+layout_imported = time.perf_counter()
+reports.render_report_bytes(data)
+rendered = time.perf_counter()
+print(json.dumps({
+    'import_scoring': (imported - start) * 1000,
+    'first_score': (scored - imported) * 1000,
+    'import_layout': (layout_imported - scored) * 1000,
+    'first_render': (rendered - layout_imported) * 1000,
+    'reportlab_loaded_by_scoring': reportlab_loaded,
+}))
+"""
+
+
+def profile_startup(runs=3, data=None):
+    """
+    Measure cold start in fresh interpreters: scoring import time, first
+    score, layout import and time-to-first-PDF (medians over runs).
     
-    return output_path
+    Returns:
+        dict with per-stage milliseconds, the budget and whether it was met
+    """
+    data = data or STARTUP_SAMPLE
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        probe = subprocess.run([sys.executable, '-c', _STARTUP_PROBE, json.dumps(data)],
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               capture_output=True, text=True, check=True)
+        sample = json.loads(probe.stdout)
+        sample['first_pdf'] = (time.perf_counter() - start) * 1000
+        samples.append(sample)
+    
+    def median(stage):
+        return round(sorted(s[stage] for s in samples)[len(samples) // 2], 1)
+    
+    stages = {stage: median(stage) for stage in
+              ('import_scoring', 'first_score', 'import_layout', 'first_render', 'first_pdf')}
+    over = [stage for stage, budget in STARTUP_BUDGET_MS.items() if stages[stage] > budget]
+    return {
+        'runs': runs,
+        'milliseconds': stages,
+        'budget_ms': STARTUP_BUDGET_MS,
+        'over_budget': over,
+        'reportlab_loaded_by_scoring': any(s['reportlab_loaded_by_scoring'] for s in samples),
+    }
 
 
 # ============================================================================
 # CLI INTERFACE
 # ============================================================================
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from report_service import main as serve
+        serve(sys.argv[2:])
+        exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        from report_bench import main as bench
+        bench(sys.argv[2:])
+        exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'queue':
+        from report_queue import main as queue
+        queue(sys.argv[2:])
+        exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'portfolio':
+        from portfolio_report import main as portfolio
+        exit(portfolio(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'rescore':
+        from report_rescore import main as rescore
+        exit(rescore(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'sweep':
+        from scenario_sweep import main as sweep
+        exit(sweep(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'archive':
+        from lead_archive import main as archive
+        exit(archive(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'index':
+        from lead_index import main as index
+        exit(index(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'golden':
+        from golden_reports import main as golden
+        exit(golden(sys.argv[2:]))
+    
     parser = argparse.ArgumentParser(description='Generate MBRACE Incentive Scan Report')
-    parser.add_argument('--data', type=str, required=True, help='JSON string with submission data')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--data', type=str, help='JSON string with submission data')
+    source.add_argument('--batch', type=str, help='JSONL or CSV file with one submission per record')
+    source.add_argument('--profile-startup', action='store_true',
+                        help='Measure cold-start import time and time-to-first-PDF against the budget')
     parser.add_argument('--output', type=str, default=None, help='Output PDF path')
+    parser.add_argument('--profile', action='store_true',
+                        help='With --data: print per-stage timings and a cProfile/tracemalloc summary')
+    parser.add_argument('--rules', type=str, default=None,
+                        help='Incentive catalog JSON (default: $MBRACE_INCENTIVE_RULES or incentive_rules.json)')
+    parser.add_argument('--out-dir', type=str, default='reports', help='Output directory for --batch')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='JSONL manifest for --batch (defaults to <out-dir>/manifest.jsonl)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Render processes for --batch (default: CPU count)')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write manifest entries as renders finish instead of in input order')
+    parser.add_argument('--combined', type=str, default=None,
+                        help='With --batch: write every report into this one PDF instead of one file each '
+                             '(held in memory until written, about 20 KB per page)')
+    parser.add_argument('--output-profile', choices=('standard', 'lean'), default='standard',
+                        help='lean: smaller PDFs for email delivery (compressed binary streams, base-14 fonts)')
+    parser.add_argument('--deterministic', nargs='?', const=DETERMINISTIC_DATE.date().isoformat(), default=None,
+                        metavar='DATE', help='Reproducible output: date every report DATE '
+                        f'(default {DETERMINISTIC_DATE.date().isoformat()}) and write invariant PDFs')
     
     args = parser.parse_args()
     
+    if args.rules:
+        os.environ['MBRACE_INCENTIVE_RULES'] = os.path.abspath(args.rules)
+        set_rules(args.rules)
+    if args.deterministic:
+        try:
+            set_deterministic(when=datetime.fromisoformat(args.deterministic))
+        except ValueError as e:
+            parser.error(f"--deterministic: {e}")
+    
+    if args.profile_startup:
+        profile = profile_startup()
+        print(json.dumps(profile, indent=2))
+        exit(1 if profile['over_budget'] or profile['reportlab_loaded_by_scoring'] else 0)
+    
+    if args.batch and args.combined:
+        start = time.perf_counter()
+        result = generate_combined_report(read_submissions(args.batch), args.combined,
+                                          output_profile=args.output_profile)
+        for index, error in result['skipped']:
+            print(f"Record {index} not included: {error}")
+        print(f"Combined report generated: {args.combined} ({result['reports']} reports, "
+              f"{result['pages']} pages) in {time.perf_counter() - start:.2f}s")
+        exit(1 if result['skipped'] and not result['reports'] else 0)
+    
+    if args.batch:
+        manifest_path = args.manifest or os.path.join(args.out_dir, 'manifest.jsonl')
+        start = time.perf_counter()
+        entries = []
+        for entry in generate_reports(read_submissions(args.batch), args.out_dir, manifest_path,
+                                      workers=args.workers, ordered=not args.unordered,
+                                      output_profile=args.output_profile):
+            if entry['status'] != 'ok':
+                print(f"Record {entry['index']} failed: {entry['error']}")
+            entries.append({'index': entry['index'], 'status': entry['status'],
+                            'seconds': entry.get('seconds', 0), 'bytes': entry.get('bytes', 0)})
+        summary = summarize_batch(entries, time.perf_counter() - start)
+        print(f"Batch complete: {summary['succeeded']} generated, {summary['failed']} failed "
+              f"in {summary['elapsed_seconds']}s ({summary['reports_per_second']} reports/s, "
+              f"{summary['mean_pdf_bytes']:,} bytes/report, {args.workers} workers). Manifest: {manifest_path}")
+        exit(1 if summary['failed'] and not summary['succeeded'] else 0)
+    
     try:
         data = json.loads(args.data)
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON: {e}")
         exit(1)
     
-    output_path = generate_report(data, args.output)
-    print(f"Report generated: {output_path}")
+    if args.profile:
+        record, text = profile_report(data, args.output)
+        print(text)
+        print(json.dumps(record, indent=2))
+        exit(0)
+    
+    start = time.perf_counter()
+    output_path = generate_report(data, args.output, output_profile=args.output_profile)
+    print(f"Report generated: {output_path} ({os.path.getsize(output_path):,} bytes, "
+          f"{time.perf_counter() - start:.3f}s)")
 
 
 # ============================================================================
@@ -614,7 +878,14 @@ Example submission data structure:
 Command line:
 python generate_incentive_report.py --data '{"address": "1234 Main St", "building_type": "nonprofit", "utility": "BGE", "heating_system": "oil", "system_age": "20+", "income_level": "under_80_ami", "org_name": "Test Nonprofit"}'
 
+Batch (one JSON object per line, or a CSV with the same column names):
+python generate_incentive_report.py --batch leads.jsonl --out-dir reports/ --workers 8
+
 Programmatic:
 from generate_incentive_report import generate_report
 pdf_path = generate_report(submission_data)
+
+from generate_incentive_report import generate_reports, read_submissions
+for entry in generate_reports(read_submissions('leads.jsonl'), 'reports', workers=4):
+    print(entry)
 """
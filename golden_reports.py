@@ -0,0 +1,483 @@
+"""
+MBRACE Intelligence - Golden Report Harness
+===========================================
+
+Regression check for report output. Caching and fast-path work should not
+change what a lead reads, so this renders the whole enumerated input space
+(every catalog value of every calculator field, plus an unlisted value) in
+deterministic mode, extracts each PDF's text and structure, and compares
+them with a stored golden corpus.
+
+Per case the golden records:
+    text        the text lines on each page, in drawing order
+    structure   per page: fonts used, fill colors, and counts of rectangles,
+                fills, strokes and line segments
+    pdf_sha256  the exact bytes (a byte-only change, e.g. a reportlab
+                upgrade, is reported but does not fail the check)
+
+Text and structure come from the PDF content streams themselves, so the
+check covers exactly what is delivered. Goldens are gzip-compressed JSON
+lines: a header with the catalog, template and reportlab versions, then
+one line per case.
+
+Run with:
+    python generate_incentive_report.py golden record --goldens goldens/reports.jsonl.gz
+    python generate_incentive_report.py golden check --goldens goldens/reports.jsonl.gz --workers 8
+    python generate_incentive_report.py golden check --limit 64 --no-template-cache   # full layout path
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import argparse
+import base64
+import difflib
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+import zlib
+
+import generate_incentive_report as reports
+from incentive_rules import KEY_FIELDS, UNLISTED, get_rules
+
+GOLDEN_FORMAT = 'mbrace-golden-1'
+
+# Stand-in for a value the catalog does not list (scored as UNLISTED)
+UNLISTED_VALUE = 'unlisted'
+
+# Address vocabulary of the corpus. It is part of the goldens: changing it
+# changes every recorded case, so it lives here rather than with the benchmarks.
+STREETS = ('Main St', 'Charles St', 'Greenmount Ave', 'Harford Rd', 'Georgia Ave', 'Rockville Pike')
+CITIES = ('Baltimore, MD 21201', 'Silver Spring, MD 20910', 'Annapolis, MD 21401', 'Frederick, MD 21701')
+
+# Cases sent to a render process at a time
+CHUNK_SIZE = 32
+
+# Drift kinds that fail a check (bytes drift alone is reported only)
+FAILING_DRIFT = ('text', 'structure', 'pages', 'missing', 'unexpected')
+
+
+# ============================================================================
+# CORPUS
+# ============================================================================
+def golden_corpus(rules=None, seed=0):
+    """
+    One submission per input combination of the catalog (see RuleSet.input_space).
+
+    Address and organization text are drawn from random.Random(seed), so
+    the corpus is identical on every run with the same seed.
+
+    Yields:
+        (case key, submission dict)
+    """
+    rules = rules or get_rules()
+    rng = random.Random(seed)
+    for key in rules.input_space():
+        data = {field: UNLISTED_VALUE if value == UNLISTED else value for field, value in zip(KEY_FIELDS, key)}
+        data['address'] = f"{rng.randint(100, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}"
+        if data['building_type'] == 'nonprofit':
+            data['org_name'] = f"Community Organization {rng.randint(1, 999)}"
+        yield '|'.join(key), data
+
+
+# ============================================================================
+# PDF EXTRACTION
+# ============================================================================
+_TOKEN = re.compile(rb"""
+    (?P<string>\((?:\\.|[^\\()])*\))
+  | (?P<hex><[0-9A-Fa-f\s]*>)
+  | (?P<open>\[) | (?P<close>\])
+  | (?P<dict><<|>>)
+  | (?P<name>/[^\s/\[\]()<>{}%]+)
+  | (?P<number>[+-]?(?:\d+\.?\d*|\.\d+))
+  | (?P<op>[A-Za-z'"*]+)
+""", re.X | re.S)
+
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+_ESCAPE = re.compile(rb'\\([0-7]{1,3}|.)', re.S)
+
+_FILL_OPS = frozenset({'f', 'F', 'f*', 'B', 'B*', 'b', 'b*'})
+_STROKE_OPS = frozenset({'S', 's', 'B', 'B*', 'b', 'b*'})
+
+
+def _unescape(literal):
+    def replace(match):
+        code = match.group(1)
+        if code[:1].isdigit():
+            return bytes([int(code, 8) & 0xFF])
+        return _ESCAPES.get(code, code)
+    # reportlab's WinAnsi encoding puts the bullet at 0x7F
+    return _ESCAPE.sub(replace, literal[1:-1]).decode('cp1252', 'replace').replace('\x7f', '\u2022')
+
+
+def _pdf_objects(pdf):
+    """Object number -> (dictionary bytes, decoded stream or None), located through the xref table."""
+    start = int(re.search(rb'startxref\s+(\d+)', pdf[-64:]).group(1))
+    header = re.compile(rb'xref\s+0 (\d+)\s+').match(pdf, start)
+    offsets = [int(entry[:10]) for entry in pdf[header.end():].split(b'\n')[:int(header.group(1))]]
+    objects = {}
+    for number, offset in enumerate(offsets[1:], 1):
+        body_start = pdf.index(b'obj', offset) + 3
+        end = pdf.index(b'endobj', body_start)
+        body = pdf[body_start:end]
+        stream_at = body.find(b'stream')
+        if stream_at < 0 or b'/Length' not in body[:stream_at]:
+            objects[number] = (body, None)
+            continue
+        dictionary = body[:stream_at]
+        length = int(re.search(rb'/Length (\d+)', dictionary).group(1))
+        data_start = body_start + stream_at + len(b'stream') + (2 if pdf[body_start + stream_at + 6:][:2] == b'\r\n' else 1)
+        data = pdf[data_start:data_start + length]
+        # Every stream the generator writes is Flate, optionally wrapped in ASCII85
+        if b'/ASCII85Decode' in dictionary:
+            data = base64.a85decode(data, adobe=True)
+        if b'/FlateDecode' in dictionary:
+            data = zlib.decompress(data)
+        objects[number] = (dictionary, data)
+    return objects
+
+
+def _page_content(stream, fonts):
+    """Text lines and structure counts for one page's content stream."""
+    lines, current, operands = [], [], []
+    used_fonts, colors = set(), set()
+    counts = {'rects': 0, 'fills': 0, 'strokes': 0, 'segments': 0}
+
+    def end_line():
+        if current:
+            lines.append(''.join(current))
+            current.clear()
+
+    array = None
+    for match in _TOKEN.finditer(stream):
+        kind, token = match.lastgroup, match.group()
+        if kind == 'open':
+            array = []
+        elif kind == 'close':
+            operands.append(array or [])
+            array = None
+        elif kind in ('string', 'hex', 'name', 'number', 'dict'):
+            value = _unescape(token) if kind == 'string' else token.decode('latin-1')
+            if array is None:
+                operands.append(value)
+            elif kind == 'string':
+                array.append(value)
+        else:
+            op = token.decode('latin-1')
+            if op == 'Tf' and len(operands) >= 2:
+                used_fonts.add(f"{fonts.get(operands[-2], operands[-2])} {operands[-1]}")
+            elif op == 'Tj' and operands:
+                current.append(operands[-1])
+            elif op == 'TJ' and operands:
+                current.extend(operands[-1])
+            elif op in ("'", '"'):
+                end_line()
+                current.append(operands[-1] if operands else '')
+            elif op in ('T*', 'Tm', 'BT', 'ET') or (op in ('Td', 'TD') and operands and float(operands[-1]) != 0):
+                end_line()
+            elif op in ('rg', 'RG') and len(operands) >= 3:
+                colors.add(' '.join(operands[-3:]))
+            elif op == 're':
+                counts['rects'] += 1
+            elif op == 'l':
+                counts['segments'] += 1
+            if op in _FILL_OPS:
+                counts['fills'] += 1
+            if op in _STROKE_OPS:
+                counts['strokes'] += 1
+            operands = []
+    end_line()
+    structure = dict(counts, fonts=sorted(used_fonts), colors=sorted(colors))
+    return lines, structure
+
+
+def extract_pdf(pdf):
+    """
+    Text and structure of a generated PDF, page by page.
+
+    Returns:
+        dict: pages (count), text (list of line lists per page) and
+        structure (one dict per page)
+    """
+    objects = _pdf_objects(pdf)
+    fonts = {}
+    for body, stream in objects.values():
+        if stream is None and b'/Type /Font' in body:
+            name = re.search(rb'/Name /(\S+)', body)
+            base = re.search(rb'/BaseFont /(\S+)', body)
+            if name and base:
+                fonts['/' + name.group(1).decode()] = base.group(1).decode()
+    kids = next(re.search(rb'/Kids \[([^\]]*)\]', body).group(1) for body, stream in objects.values()
+                if stream is None and b'/Type /Pages' in body)
+    text, structure = [], []
+    for page in re.findall(rb'(\d+) 0 R', kids):
+        contents = re.search(rb'/Contents (\d+) 0 R', objects[int(page)][0])
+        lines, shape = _page_content(objects[int(contents.group(1))][1], fonts) if contents else ([], {})
+        text.append(lines)
+        structure.append(shape)
+    return {'pages': len(text), 'text': text, 'structure': structure}
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+# ============================================================================
+# RENDERING (pool workers)
+# ============================================================================
+_GOLDEN_STATE = {}
+
+
+def _init_golden_worker(when, output_profile, use_template_cache):
+    """Pool initializer: deterministic mode and warm render state for this process."""
+    reports.set_deterministic(when=when)
+    reports._init_render_worker()
+    _GOLDEN_STATE.update(output_profile=output_profile, use_template_cache=use_template_cache)
+
+
+def golden_record(key, data, output_profile='standard', use_template_cache=True):
+    """Render one case (deterministic mode must be on) and return its golden record."""
+    pdf = reports.render_report_bytes(data, use_template_cache=use_template_cache, output_profile=output_profile)
+    extracted = extract_pdf(pdf)
+    return {
+        'key': key,
+        'pages': extracted['pages'],
+        'text_sha256': _digest(extracted['text']),
+        'structure_sha256': _digest(extracted['structure']),
+        'pdf_sha256': hashlib.sha256(pdf).hexdigest(),
+        'text': extracted['text'],
+        'structure': extracted['structure'],
+    }
+
+
+def _render_cases(cases):
+    """Render a chunk of (key, data, expected digests or None); full records only where needed."""
+    results = []
+    for key, data, expected in cases:
+        record = golden_record(key, data, _GOLDEN_STATE['output_profile'], _GOLDEN_STATE['use_template_cache'])
+        if expected is not None and (record['text_sha256'], record['structure_sha256']) == expected:
+            del record['text'], record['structure']
+        results.append(record)
+    return results
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def render_corpus(cases, workers=1, when=None, output_profile='standard', use_template_cache=True):
+    """
+    Render (key, data, expected) cases on a process pool in deterministic mode.
+
+    expected is a (text_sha256, structure_sha256) pair; records that match
+    it come back without their text and structure. Yields records in order.
+    """
+    when = when or reports.DETERMINISTIC_DATE
+    initargs = (when, output_profile, use_template_cache)
+    if workers <= 1:
+        was_deterministic = reports.pdf_invariant() is not None
+        _init_golden_worker(*initargs)
+        try:
+            for chunk in _chunks(cases, CHUNK_SIZE):
+                yield from _render_cases(chunk)
+        finally:
+            if not was_deterministic:
+                reports.set_deterministic(False)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_golden_worker, initargs=initargs) as pool:
+        for records in pool.map(_render_cases, _chunks(cases, CHUNK_SIZE)):
+            yield from records
+
+
+# ============================================================================
+# GOLDEN FILES
+# ============================================================================
+def _header(count, seed, when, output_profile):
+    import reportlab
+    rules = get_rules()
+    return {
+        'format': GOLDEN_FORMAT,
+        'cases': count,
+        'seed': seed,
+        'date': when.isoformat(),
+        'output_profile': output_profile,
+        'rules_version': rules.version,
+        'rules_fingerprint': rules.fingerprint,
+        'template_version': reports.TEMPLATE_VERSION,
+        'reportlab': reportlab.Version,
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def read_goldens(path):
+    """(header, iterator of case records) from a golden file."""
+    f = gzip.open(path, 'rt', encoding='utf-8')
+    header = json.loads(f.readline())
+    if header.get('format') != GOLDEN_FORMAT:
+        f.close()
+        raise ValueError(f"{path}: not a golden file (format {header.get('format')!r})")
+
+    def records():
+        with f:
+            for line in f:
+                yield json.loads(line)
+    return header, records()
+
+
+def record_goldens(path, workers=1, seed=0, limit=None, output_profile='standard', when=None):
+    """
+    Render the corpus and write it as the new golden file (replacing path).
+
+    Returns:
+        dict: cases, bytes written and elapsed seconds
+    """
+    when = when or reports.DETERMINISTIC_DATE
+    start = time.perf_counter()
+    cases = [(key, data, None) for key, data in golden_corpus(seed=seed)][:limit]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial = path + '.partial'
+    with gzip.open(partial, 'wt', encoding='utf-8', compresslevel=9) as f:
+        f.write(json.dumps(_header(len(cases), seed, when, output_profile)) + '\n')
+        for record in render_corpus(cases, workers, when, output_profile):
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+    os.replace(partial, path)
+    return {'cases': len(cases), 'bytes': os.path.getsize(path),
+            'elapsed_seconds': round(time.perf_counter() - start, 2)}
+
+
+def _text_diff(golden, current, context=2, max_lines=12):
+    """A short unified diff between two page/line text lists."""
+    def flatten(pages):
+        return [f"p{number}: {line}" for number, lines in enumerate(pages, 1) for line in lines]
+    diff = list(difflib.unified_diff(flatten(golden), flatten(current), 'golden', 'current', n=context, lineterm=''))
+    return diff[:max_lines] + (['...'] if len(diff) > max_lines else [])
+
+
+def check_goldens(path, workers=1, limit=None, use_template_cache=True):
+    """
+    Re-render the golden corpus and compare it with the golden file.
+
+    The corpus is rebuilt from the header's seed, date and output profile.
+    A case drifts on text, structure or page count (failures) or only on
+    bytes (reported); cases missing from either side are failures too.
+
+    Returns:
+        dict: cases, passed, drift (kind -> count), failures (list of
+        {key, kinds, diff}), bytes_only (keys) and header
+    """
+    start = time.perf_counter()
+    header, golden_records = read_goldens(path)
+    when = datetime.fromisoformat(header['date'])
+    goldens = {record['key']: record for record in golden_records}
+    corpus = [(key, data) for key, data in golden_corpus(seed=header['seed'])][:limit]
+    cases = [(key, data, (goldens[key]['text_sha256'], goldens[key]['structure_sha256']) if key in goldens else None)
+             for key, data in corpus]
+
+    drift = {kind: 0 for kind in FAILING_DRIFT + ('bytes',)}
+    failures, bytes_only, passed = [], [], 0
+    for record in render_corpus(cases, workers, when, header['output_profile'], use_template_cache):
+        golden = goldens.pop(record['key'], None)
+        if golden is None:
+            drift['unexpected'] += 1
+            failures.append({'key': record['key'], 'kinds': ['unexpected'], 'diff': []})
+            continue
+        kinds = [kind for kind, field in (('pages', 'pages'), ('text', 'text_sha256'),
+                                          ('structure', 'structure_sha256'))
+                 if record[field] != golden[field]]
+        if kinds:
+            diff = _text_diff(golden['text'], record['text']) if 'text' in kinds else []
+            if 'structure' in kinds:
+                diff += [f"page {number} {field}: golden {old.get(field)} current {new.get(field)}"
+                         for number, (old, new) in enumerate(zip(golden['structure'], record['structure']), 1)
+                         for field in sorted(old.keys() | new.keys()) if old.get(field) != new.get(field)][:4]
+            failures.append({'key': record['key'], 'kinds': kinds, 'diff': diff})
+        elif record['pdf_sha256'] != golden['pdf_sha256']:
+            bytes_only.append(record['key'])
+            drift['bytes'] += 1
+            passed += 1
+        else:
+            passed += 1
+        for kind in kinds:
+            drift[kind] += 1
+    if limit is None:
+        for key in goldens:
+            drift['missing'] += 1
+            failures.append({'key': key, 'kinds': ['missing'], 'diff': []})
+    return {
+        'cases': len(cases),
+        'passed': passed,
+        'drift': drift,
+        'failures': failures,
+        'bytes_only': bytes_only,
+        'header': header,
+        'elapsed_seconds': round(time.perf_counter() - start, 2),
+    }
+
+
+# ============================================================================
+# CLI INTERFACE
+# ============================================================================
+def main(argv=None):
+    # Options shared by both commands, accepted after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--goldens', type=str, default=os.path.join('goldens', 'reports.jsonl.gz'),
+                        help='Golden file (gzip JSON lines)')
+    common.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Render processes')
+    common.add_argument('--limit', type=int, default=None, help='Only the first N cases (quick checks)')
+
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py golden',
+                                     description='Record or check golden report output')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', parents=[common], help='Render the corpus and store it as the goldens')
+    record.add_argument('--seed', type=int, default=0, help='Seed for the corpus address/organization text')
+    record.add_argument('--output-profile', choices=('standard', 'lean'), default='standard')
+
+    check = commands.add_parser('check', parents=[common], help='Re-render the corpus and report drift from the goldens')
+    check.add_argument('--no-template-cache', action='store_true',
+                       help='Render with full layout instead of the cached-template fast path')
+    check.add_argument('--show', type=int, default=10, help='Failing cases to print with their diffs')
+    check.add_argument('--json', action='store_true', help='Print the full result as JSON')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        result = record_goldens(args.goldens, args.workers, args.seed, args.limit, args.output_profile)
+        print(f"Recorded {result['cases']} golden cases to {args.goldens} "
+              f"({result['bytes'] / 1024:.0f} KiB) in {result['elapsed_seconds']}s")
+        return 0
+
+    try:
+        result = check_goldens(args.goldens, args.workers, args.limit, not args.no_template_cache)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for failure in result['failures'][:args.show]:
+            print(f"DRIFT {failure['key']}: {', '.join(failure['kinds'])}")
+            for line in failure['diff']:
+                print(f"    {line}")
+        header = result['header']
+        rules = get_rules()
+        if (header['rules_version'], header['rules_fingerprint']) != (rules.version, rules.fingerprint):
+            print(f"Note: goldens were recorded with catalog {header['rules_version']}; "
+                  f"current is {rules.version}, so amount changes are expected drift", file=sys.stderr)
+        drifted = {kind: count for kind, count in result['drift'].items() if count}
+        print(f"{result['passed']} of {result['cases']} cases match the goldens in {result['elapsed_seconds']}s"
+              + (f"; drift: {drifted}" if drifted else ''))
+    return 1 if result['failures'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
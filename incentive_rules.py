@@ -0,0 +1,685 @@
+"""
+MBRACE Intelligence - Incentive Rules Engine
+============================================
+
+Loads the versioned program catalog (incentive_rules.json) and compiles it once
+into immutable lookup tables, so scoring a submission is a handful of dict
+lookups instead of rebuilding the catalog and walking if/elif chains per call.
+
+Program amounts, eligibility rules and copy live in the JSON file; point the
+MBRACE_INCENTIVE_RULES environment variable at another file to ship a catalog
+update without a code release.
+
+Scored results are memoized per normalized input combination and returned as
+read-only FrozenDicts, so repeat submissions are a single cache hit.
+
+For portfolio analysis, evaluate_bulk() scores whole columns at once using
+categorical code lookups (vectorized with NumPy when it is installed).
+
+Usage:
+    from incentive_rules import get_rules
+    incentives = get_rules().evaluate_submission(submission_data)
+    totals = get_rules().evaluate_bulk({'utility': [...], 'income_level': [...], ...})
+"""
+
+from collections.abc import Mapping
+from types import MappingProxyType
+import functools
+import hashlib
+import itertools
+import json
+import os
+import threading
+
+np = None  # NumPy, imported on the first bulk call (see _numpy)
+_numpy_checked = False
+
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'incentive_rules.json')
+
+# The five submission fields that determine eligibility, in lookup-key order
+KEY_FIELDS = ('utility', 'income_level', 'building_type', 'heating_system', 'system_age')
+
+# Stand-in key for values the catalog never mentions; every such value scores the same
+UNLISTED = '<unlisted>'
+
+# Columns produced by RuleSet.evaluate_bulk()
+BULK_COLUMNS = ('total_low', 'total_high', 'coverage_percent', 'annual_savings_low',
+                'annual_savings_high', 'payback_years', 'urgency_level')
+
+EMPTY_AMOUNT = MappingProxyType({'name': '', 'low': 0, 'high': 0})
+
+
+def is_blank(value):
+    """True for a field left blank (None or ''); blank fields take the catalog default."""
+    return value is None or (isinstance(value, str) and value == '')
+
+
+def _numpy():
+    """NumPy if installed. Imported lazily so scalar scoring doesn't pay for it at start-up."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # bulk scoring falls back to pure Python
+            np = None
+        _numpy_checked = True
+    return np
+
+
+class RulesError(ValueError):
+    """The incentive catalog file is missing required sections or is malformed."""
+
+
+class FrozenDict(dict):
+    """
+    A read-only dict for cached results.
+    Still JSON-serializable and picklable; use .copy() or thaw() for a mutable version.
+    """
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only; use .copy() or thaw() to modify")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict.__repr__(self)})"
+
+
+def freeze_result(value):
+    """Recursively convert a result into FrozenDicts and tuples."""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze_result(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_result(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Recursively copy a frozen result back into plain dicts and lists."""
+    if isinstance(value, dict):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+
+def _freeze(value):
+    """Recursively convert catalog JSON into read-only mappings and tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _amount(entry):
+    return MappingProxyType({'name': entry['name'], 'low': int(entry['low']), 'high': int(entry['high'])})
+
+
+class CodedColumn:
+    """
+    A categorical column stored as small integer codes, for evaluate_bulk().
+
+    codes[i] == 0 means the field was not submitted; otherwise the value is
+    categories[codes[i] - 1]. Categories are resolved against the catalog
+    once per column instead of once per row, so codes can come straight
+    from storage (e.g. a memory-mapped lead_archive) without building strings.
+    """
+    __slots__ = ('codes', 'categories')
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = tuple(categories)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        code = self.codes[row]
+        return self.categories[code - 1] if code else None
+
+
+# ============================================================================
+# COMPILED RULE SET
+# ============================================================================
+class RuleSet:
+    """
+    An incentive catalog compiled into immutable per-dimension lookup tables.
+
+    Every table is keyed on listed values plus UNLISTED, so evaluation never
+    falls back to scanning the rule lists. Because any unlisted value scores
+    the same as UNLISTED, the normalized input space is finite and small;
+    lookup() memoizes frozen results over it in an LRU sized to hold all of it.
+    """
+
+    def __init__(self, catalog, source=None, cache_size=None):
+        try:
+            self._compile(catalog)
+        except (KeyError, TypeError, ValueError) as e:
+            raise RulesError(f"invalid incentive catalog {source or ''}: {e!r}") from e
+        self.source = source
+        self.catalog = _freeze(catalog)
+        canonical = json.dumps(catalog, sort_keys=True, separators=(',', ':'))
+        self.fingerprint = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        if cache_size is None:
+            cache_size = 1
+            for field in KEY_FIELDS:
+                cache_size *= len(self.domains[field]) + 1
+        self._lookup = functools.lru_cache(maxsize=cache_size)(self._evaluate_frozen)
+        self._bulk_tables_cache = None
+
+    def _compile(self, catalog):
+        self.version = str(catalog['version'])
+        self.defaults = MappingProxyType({f: catalog['defaults'][f] for f in KEY_FIELDS})
+
+        utility_section = catalog['utility_rebates']
+        federal_rules = catalog['federal_rebates']
+        state_rules = catalog['state_grants']
+        costs = catalog['project_costs']
+        savings = catalog['annual_savings']
+        compliance = catalog['compliance']
+
+        # Listed values: declared domains plus anything the rules reference
+        listed = {f: list(catalog.get('domains', {}).get(f, [])) for f in KEY_FIELDS}
+        listed['utility'] += list(utility_section['utilities'])
+        listed['building_type'] += list(costs['by_building_type'])
+        listed['heating_system'] += list(savings['by_heating_system'])
+        listed['system_age'] += list(compliance['risk_by_system_age'])
+        for rule in list(federal_rules) + list(state_rules):
+            for field, values in rule['match'].items():
+                if field not in ('building_type', 'income_level'):
+                    raise RulesError(f"rules can only match building_type/income_level, not {field!r}")
+                listed[field] += list(values)
+        self.domains = MappingProxyType({f: tuple(dict.fromkeys(v)) for f, v in listed.items()})
+        self._listed = MappingProxyType({f: frozenset(v) for f, v in self.domains.items()})
+
+        # Utility rebates: utility -> (rebate, program)
+        program = utility_section['program']
+        utilities = {}
+        for utility, entry in utility_section['utilities'].items():
+            rebate = _amount(entry)
+            utilities[utility] = (rebate, MappingProxyType({
+                'name': f"{rebate['name']}{program['name_suffix']}",
+                'type': program['type'],
+                'amount': f"${rebate['low']:,} - ${rebate['high']:,}",
+                'eligibility': program['eligibility'],
+                'notes': program['notes'],
+            }))
+        self._utilities = MappingProxyType(utilities)
+
+        # Federal rebates and state grants: first matching rule per (building_type, income_level)
+        building_keys = self.domains['building_type'] + (UNLISTED,)
+        income_keys = self.domains['income_level'] + (UNLISTED,)
+        self._federal = self._compile_matches(federal_rules, 'rebate', building_keys, income_keys)
+        self._state = self._compile_matches(state_rules, 'grant', building_keys, income_keys)
+
+        self._project_costs = MappingProxyType({k: int(v) for k, v in costs['by_building_type'].items()})
+        self._default_project_cost = int(costs['default'])
+        if min(list(self._project_costs.values()) + [self._default_project_cost]) <= 0:
+            raise RulesError("project costs must be positive")
+        self.per_unit_building_types = frozenset(costs.get('per_unit', ()))
+
+        self._coverage_bands = tuple(
+            (int(band['min_percent']), band['label'])
+            for band in sorted(catalog['coverage_bands'], key=lambda b: -b['min_percent'])
+        )
+
+        self._savings = MappingProxyType({
+            k: (int(v['low']), int(v['high'])) for k, v in savings['by_heating_system'].items()
+        })
+        self._default_savings = (int(savings['default']['low']), int(savings['default']['high']))
+
+        self._risk = MappingProxyType(dict(compliance['risk_by_system_age']))
+        self._default_risk = compliance['default_risk']
+        self._compliance = MappingProxyType({k: _freeze(v) for k, v in compliance['by_risk'].items()})
+        self._default_compliance = _freeze(compliance['default'])
+
+    @staticmethod
+    def _compile_matches(rules, amount_key, building_keys, income_keys):
+        table = {}
+        for building_type in building_keys:
+            for income_level in income_keys:
+                values = {'building_type': building_type, 'income_level': income_level}
+                entry = (EMPTY_AMOUNT, ())
+                for rule in rules:
+                    if all(values[f] in allowed for f, allowed in rule['match'].items()):
+                        amount = rule.get(amount_key)
+                        entry = (_amount(amount) if amount else EMPTY_AMOUNT, _freeze(rule.get('programs', [])))
+                        break
+                table[(building_type, income_level)] = entry
+        return MappingProxyType(table)
+
+    # ------------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------------
+    def submission_key(self, data):
+        """
+        Lookup key for a submission dict or Submission. A field that is
+        missing, None or '' (see is_blank) takes the catalog default, so a raw
+        dict scores the same as its validated Submission.
+        """
+        key = []
+        for field in KEY_FIELDS:
+            value = data.get(field)
+            key.append(self.defaults[field] if is_blank(value) else value)
+        return tuple(key)
+
+    def normalize_key(self, key):
+        """
+        Map each value onto the catalog: listed values pass through, known
+        spellings ("pepco", "Single Family") resolve to their listed value, and
+        anything else becomes UNLISTED (unlisted values all score alike).
+        """
+        normalized = []
+        for field, value in zip(KEY_FIELDS, key):
+            try:
+                listed = value in self._listed[field]
+            except TypeError:  # unhashable, e.g. a list from malformed JSON
+                listed = False
+            normalized.append(value if listed else self._resolve(field, value))
+        return tuple(normalized)
+
+    def _resolve(self, field, value):
+        """Listed value an unlisted spelling stands for, or UNLISTED."""
+        from submission import normalize_value
+        member = normalize_value(field, value)
+        if member is not None and member.value in self._listed[field]:
+            return member.value
+        return UNLISTED
+
+    def evaluate_submission(self, data):
+        """Memoized, read-only result for a submission dict (see lookup)."""
+        return self._lookup(self.normalize_key(self.submission_key(data)))
+
+    def lookup(self, utility, income_level, building_type, heating_system, system_age):
+        """
+        Memoized evaluate() returning a FrozenDict shared between callers.
+        Use thaw() on the result if you need to modify it.
+        """
+        return self._lookup(self.normalize_key(
+            (utility, income_level, building_type, heating_system, system_age)
+        ))
+
+    def _evaluate_frozen(self, key):
+        return freeze_result(self.evaluate(*key))
+
+    def project_cost(self, building_type):
+        """Estimated project cost for a building type (per unit for per_unit types)."""
+        return self._project_costs.get(building_type, self._default_project_cost)
+
+    def coverage_label(self, avg_incentive, est_cost):
+        """The coverage band label ("80-100%", ...) for an average incentive against a cost."""
+        coverage = min(100, int((avg_incentive / est_cost) * 100))
+        for min_percent, label in self._coverage_bands:
+            if coverage >= min_percent:
+                return label
+        return self._coverage_bands[-1][1]
+
+    @staticmethod
+    def payback_years(avg_incentive, est_cost, savings):
+        """Years for the (low, high) annual savings to repay the cost left after incentives; 0 if none is left."""
+        net_cost = est_cost - avg_incentive
+        avg_savings = (savings[0] + savings[1]) / 2
+        if avg_savings > 0 and net_cost > 0:
+            return round(net_cost / avg_savings, 1)
+        return 0
+
+    def unit_multiplier(self, building_type, units):
+        """How many times a per-building result counts for a property with units dwellings."""
+        return units if building_type in self.per_unit_building_types else 1
+
+    def input_space(self):
+        """Every normalized input combination (listed values plus UNLISTED per field)."""
+        return itertools.product(*(self.domains[f] + (UNLISTED,) for f in KEY_FIELDS))
+
+    def precompute(self):
+        """Fill the result cache for the whole input space. Returns the entry count."""
+        count = 0
+        for key in self.input_space():
+            self._lookup(key)
+            count += 1
+        return count
+
+    def cache_info(self):
+        """Hit/miss counters for the result cache (functools CacheInfo)."""
+        return self._lookup.cache_info()
+
+    def cache_clear(self):
+        self._lookup.cache_clear()
+
+    def evaluate(self, utility, income_level, building_type, heating_system, system_age):
+        """
+        Score one input combination.
+        Returns a fresh dict with program details and estimated amounts.
+        """
+        listed = self._listed
+        match_key = (
+            building_type if building_type in listed['building_type'] else UNLISTED,
+            income_level if income_level in listed['income_level'] else UNLISTED,
+        )
+        utility_entry = self._utilities.get(utility)
+        federal_rebate, federal_programs = self._federal[match_key]
+        state_grant, state_programs = self._state[match_key]
+
+        programs = []
+        if utility_entry:
+            utility_rebate = utility_entry[0]
+            programs.append(dict(utility_entry[1]))
+        else:
+            utility_rebate = EMPTY_AMOUNT
+        programs.extend(dict(p) for p in federal_programs)
+        programs.extend(dict(p) for p in state_programs)
+
+        total_low = utility_rebate['low'] + federal_rebate['low'] + state_grant['low']
+        total_high = utility_rebate['high'] + federal_rebate['high'] + state_grant['high']
+
+        est_cost = self._project_costs.get(building_type, self._default_project_cost)
+        avg_incentive = (total_low + total_high) / 2
+        coverage_percent = self.coverage_label(avg_incentive, est_cost)
+
+        savings = self._savings.get(heating_system, self._default_savings)
+        compliance = self._compliance.get(
+            self._risk.get(system_age, self._default_risk), self._default_compliance
+        )
+
+        payback_years = self.payback_years(avg_incentive, est_cost, savings)
+
+        return {
+            'programs': programs,
+            'utility_rebate': dict(utility_rebate),
+            'federal_rebate': dict(federal_rebate),
+            'state_grant': dict(state_grant),
+            'total_low': total_low,
+            'total_high': total_high,
+            'coverage_percent': coverage_percent,
+            'annual_savings': {'low': savings[0], 'high': savings[1]},
+            'payback_years': payback_years,
+            'compliance_status': compliance['status'],
+            'urgency_level': compliance['urgency_level'],
+        }
+
+    # ------------------------------------------------------------------------
+    # Bulk (columnar) evaluation
+    # ------------------------------------------------------------------------
+    def evaluate_bulk(self, columns):
+        """
+        Score many submissions given as columns.
+
+        Args:
+            columns: mapping of KEY_FIELDS names to equal-length sequences
+                (lists, NumPy arrays or CodedColumns). A missing column, or a
+                blank cell (None or ''), means the field was not submitted and
+                the catalog default applies, as in submission_key().
+
+        Returns:
+            dict of BULK_COLUMNS -> NumPy arrays (lists without NumPy); values
+            match calculate_incentives() row for row.
+        """
+        lengths = {len(columns[f]) for f in KEY_FIELDS if f in columns}
+        if len(lengths) > 1:
+            raise ValueError(f"bulk columns have different lengths: {sorted(lengths)}")
+        n = lengths.pop() if lengths else 0
+        if _numpy() is None:
+            return self._evaluate_bulk_python(columns, n)
+
+        codes = {f: self._column_codes(f, columns.get(f), n) for f in KEY_FIELDS}
+        tables = self._bulk_tables()
+
+        match = (codes['building_type'], codes['income_level'])
+        total_low = tables['utility_low'][codes['utility']] + tables['match_low'][match]
+        total_high = tables['utility_high'][codes['utility']] + tables['match_high'][match]
+        est_cost = tables['project_cost'][codes['building_type']]
+        avg_incentive = (total_low + total_high) / 2
+        coverage = np.minimum(100, np.trunc((avg_incentive / est_cost) * 100))
+        band = np.full(n, len(self._coverage_bands) - 1, dtype=np.intp)
+        for position in range(len(self._coverage_bands) - 1, -1, -1):
+            band[coverage >= self._coverage_bands[position][0]] = position
+
+        savings_low = tables['savings_low'][codes['heating_system']]
+        savings_high = tables['savings_high'][codes['heating_system']]
+        net_cost = est_cost - avg_incentive
+        avg_savings = (savings_low + savings_high) / 2
+        payback = np.zeros(n)
+        payable = (avg_savings > 0) & (net_cost > 0)
+        if payable.any():
+            # Round the few distinct ratios with Python's round() so results match exactly
+            ratios, inverse = np.unique(net_cost[payable] / avg_savings[payable], return_inverse=True)
+            payback[payable] = np.array([round(float(r), 1) for r in ratios])[inverse.ravel()]
+
+        return {
+            'total_low': total_low,
+            'total_high': total_high,
+            'coverage_percent': tables['band_labels'][band],
+            'annual_savings_low': savings_low,
+            'annual_savings_high': savings_high,
+            'payback_years': payback,
+            'urgency_level': tables['urgency'][codes['system_age']],
+        }
+
+    def _column_codes(self, field, column, n):
+        """Map a column to positions in domains[field]; UNLISTED is the last code."""
+        domain = self.domains[field]
+        index = {value: code for code, value in enumerate(domain)}
+        default = self.defaults[field]
+        default_code = index.get(default, len(domain)) if isinstance(default, str) else len(domain)
+        if column is None:
+            return np.full(n, default_code, dtype=np.intp)
+
+        def resolve(value):
+            if is_blank(value):
+                return default_code
+            return index.get(self._resolve(field, value), len(domain))
+
+        if isinstance(column, CodedColumn):
+            lookup = np.array([default_code] + [index[c] if c in index else resolve(c) for c in column.categories],
+                              dtype=np.intp)
+            return lookup[np.asarray(column.codes)]
+
+        values = np.asarray(column)
+        if values.dtype.kind == 'U':
+            uniques, inverse = np.unique(values, return_inverse=True)
+            lookup = np.array([index[u] if u in index else resolve(u) for u in map(str, uniques)],
+                              dtype=np.intp)
+            return lookup[inverse.ravel()]
+
+        def code(value):
+            try:
+                return index[value]
+            except (KeyError, TypeError):
+                return resolve(value)
+        return np.fromiter((code(v) for v in column), dtype=np.intp, count=n)
+
+    def _bulk_tables(self):
+        """Per-code NumPy lookup arrays, built on first bulk call."""
+        if self._bulk_tables_cache is not None:
+            return self._bulk_tables_cache
+
+        def keys(field):
+            return self.domains[field] + (UNLISTED,)
+
+        utilities = [self._utilities.get(u, (EMPTY_AMOUNT,))[0] for u in keys('utility')]
+        match_low = np.zeros((len(keys('building_type')), len(keys('income_level'))), dtype=np.int64)
+        match_high = np.zeros_like(match_low)
+        for b, building_type in enumerate(keys('building_type')):
+            for i, income_level in enumerate(keys('income_level')):
+                federal = self._federal[(building_type, income_level)][0]
+                state = self._state[(building_type, income_level)][0]
+                match_low[b, i] = federal['low'] + state['low']
+                match_high[b, i] = federal['high'] + state['high']
+        savings = [self._savings.get(f, self._default_savings) for f in keys('heating_system')]
+        urgency = [
+            self._compliance.get(self._risk.get(a, self._default_risk), self._default_compliance)['urgency_level']
+            for a in keys('system_age')
+        ]
+
+        tables = {
+            'utility_low': np.array([u['low'] for u in utilities], dtype=np.int64),
+            'utility_high': np.array([u['high'] for u in utilities], dtype=np.int64),
+            'match_low': match_low,
+            'match_high': match_high,
+            'project_cost': np.array([self._project_costs.get(b, self._default_project_cost)
+                                      for b in keys('building_type')], dtype=np.int64),
+            'savings_low': np.array([s[0] for s in savings], dtype=np.int64),
+            'savings_high': np.array([s[1] for s in savings], dtype=np.int64),
+            'band_labels': np.array([label for _, label in self._coverage_bands], dtype=object),
+            'urgency': np.array(urgency, dtype=object),
+        }
+        self._bulk_tables_cache = tables
+        return tables
+
+    def _evaluate_bulk_python(self, columns, n):
+        """Fallback without NumPy: gather from the memoized result per row."""
+        defaults = [self.defaults[f] for f in KEY_FIELDS]
+        fields = [columns.get(f) for f in KEY_FIELDS]
+        out = {name: [] for name in BULK_COLUMNS}
+        for row in range(n):
+            key = tuple(
+                default if column is None or is_blank(column[row]) else column[row]
+                for column, default in zip(fields, defaults)
+            )
+            result = self._lookup(self.normalize_key(key))
+            out['total_low'].append(result['total_low'])
+            out['total_high'].append(result['total_high'])
+            out['coverage_percent'].append(result['coverage_percent'])
+            out['annual_savings_low'].append(result['annual_savings']['low'])
+            out['annual_savings_high'].append(result['annual_savings']['high'])
+            out['payback_years'].append(result['payback_years'])
+            out['urgency_level'].append(result['urgency_level'])
+        return out
+
+
+# ============================================================================
+# CATALOG DIFF
+# ============================================================================
+_MISSING = object()
+
+
+def _catalog_paths(value, path=''):
+    """Flatten catalog JSON into {path: leaf value} ("federal_rebates[0].rebate.high")."""
+    if isinstance(value, Mapping):
+        leaves = {}
+        for key, item in value.items():
+            leaves.update(_catalog_paths(item, f"{path}.{key}" if path else key))
+        return leaves
+    if isinstance(value, (list, tuple)):
+        leaves = {}
+        for position, item in enumerate(value):
+            leaves.update(_catalog_paths(item, f"{path}[{position}]"))
+        return leaves
+    return {path: value}
+
+
+def catalog_changes(old, new):
+    """Catalog entries that differ between two RuleSets, as (path, old value, new value)."""
+    before, after = _catalog_paths(old.catalog), _catalog_paths(new.catalog)
+    return [
+        (path, before.get(path), after.get(path))
+        for path in sorted(before.keys() | after.keys())
+        if before.get(path, _MISSING) != after.get(path, _MISSING)
+    ]
+
+
+class RulesDiff:
+    """
+    Which submissions score differently under two versions of the catalog.
+
+    A submission's lookup key can differ between catalogs (new listed values,
+    changed defaults), so each submission maps to a pair of normalized keys.
+    The diff scores every reachable pair once; affects() is then two key
+    normalizations and a set lookup per lead instead of a full evaluation.
+    """
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.changes = catalog_changes(old, new)
+        seen = set()
+        changed = set()
+        if self.changes:
+            values = [sorted(set(old.domains[f]) | set(new.domains[f])) + [UNLISTED, _MISSING]
+                      for f in KEY_FIELDS]
+            for combination in itertools.product(*values):
+                pair = self._pair({f: v for f, v in zip(KEY_FIELDS, combination) if v is not _MISSING})
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                if old.lookup(*pair[0]) != new.lookup(*pair[1]):
+                    changed.add(pair)
+        self.combinations = len(seen)
+        self.changed_keys = frozenset(changed)
+
+    def _pair(self, data):
+        return (self.old.normalize_key(self.old.submission_key(data)),
+                self.new.normalize_key(self.new.submission_key(data)))
+
+    def affects(self, data):
+        """True if data (a submission dict or Submission) scores differently under the new catalog."""
+        return bool(self.changed_keys) and self._pair(data) in self.changed_keys
+
+    def summary(self):
+        """JSON-friendly description: catalog changes and the affected input values per field."""
+        affected = {
+            field: sorted({new_key[position] for _, new_key in self.changed_keys})
+            for position, field in enumerate(KEY_FIELDS)
+        }
+        return {
+            'old_version': self.old.version,
+            'new_version': self.new.version,
+            'catalog_changes': [{'path': path, 'old': before, 'new': after}
+                                for path, before, after in self.changes],
+            'input_combinations': self.combinations,
+            'changed_combinations': len(self.changed_keys),
+            'affected_values': affected,
+        }
+
+
+def diff_rules(old, new):
+    """RulesDiff between two RuleSets or catalog paths."""
+    old = load_rules(old) if isinstance(old, str) else old
+    new = load_rules(new) if isinstance(new, str) else new
+    return RulesDiff(old, new)
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+def load_rules(path=None):
+    """Load and compile an incentive catalog file (defaults to incentive_rules.json)."""
+    path = path or DEFAULT_RULES_PATH
+    try:
+        with open(path, encoding='utf-8') as f:
+            catalog = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise RulesError(f"cannot read incentive catalog {path}: {e}") from e
+    return RuleSet(catalog, source=path)
+
+
+_default_rules = None
+_default_lock = threading.Lock()
+
+
+def get_rules():
+    """
+    The process-wide rule set, compiled on first use.
+    Reads MBRACE_INCENTIVE_RULES if set, otherwise the bundled catalog.
+    """
+    global _default_rules
+    if _default_rules is None:
+        with _default_lock:
+            if _default_rules is None:
+                _default_rules = load_rules(os.environ.get('MBRACE_INCENTIVE_RULES'))
+    return _default_rules
+
+
+def set_rules(rules):
+    """Replace the process-wide rule set (a RuleSet, a catalog path, or None to reload)."""
+    global _default_rules
+    with _default_lock:
+        _default_rules = load_rules(rules) if isinstance(rules, str) else rules
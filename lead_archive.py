@@ -0,0 +1,394 @@
+"""
+MBRACE Intelligence - Columnar Lead Archive
+===========================================
+
+Append-only binary archive of calculator submissions for nightly re-scoring.
+Parsing millions of JSON lines back into dicts costs far more than scoring
+them; an archive is memory-mapped and its categorical columns go straight
+into RuleSet.evaluate_bulk() as CodedColumns, so scoring never builds a
+string or dict per lead.
+
+File layout (little-endian):
+
+    header   b'MBRLEAD1', uint32 length, JSON {format, enum_fields, text_fields}
+    block*   b'BLK1', uint32 rows, uint64 body length, body
+
+Each block body holds, in header order and padded to 8 bytes each:
+
+    enum field   rows x uint8 codes; 0 = not submitted, n = enum_fields[field][n - 1]
+    text field   (rows + 1) x uint32 offsets into a UTF-8 heap, then the heap;
+                 an empty string means not submitted
+
+Appends only ever add blocks, and a block left incomplete by a crash is
+ignored by readers and cut off by the next writer.
+
+Usage:
+    python generate_incentive_report.py archive import leads.jsonl --archive leads.mba
+    python generate_incentive_report.py archive score --archive leads.mba
+    python generate_incentive_report.py archive export --archive leads.mba --output leads.jsonl
+
+    for block in LeadArchive('leads.mba').blocks():
+        scores = get_rules().evaluate_bulk(block.columns())
+
+Files ending in .mba are also accepted wherever a JSONL/CSV submission
+file is (--batch, rescore), via read_submissions().
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import generate_incentive_report as reports
+from incentive_rules import CodedColumn, KEY_FIELDS, get_rules
+from submission import ENUM_FIELDS, TEXT_FIELDS, Submission, SubmissionError
+
+MAGIC = b'MBRLEAD1'
+BLOCK_MAGIC = b'BLK1'
+FORMAT_VERSION = 1
+ARCHIVE_SUFFIX = '.mba'
+DEFAULT_BLOCK_ROWS = 65536
+
+_HEADER_LENGTH = struct.Struct('<I')
+_BLOCK_HEADER = struct.Struct('<4sIQ')
+
+
+class ArchiveError(ValueError):
+    """The file is not a lead archive or its header is unreadable."""
+
+
+def _padded(length):
+    return (length + 7) & ~7
+
+
+def _new_header():
+    return {
+        'format': FORMAT_VERSION,
+        'enum_fields': {field: [member.value for member in enum] for field, enum in ENUM_FIELDS.items()},
+        'text_fields': list(TEXT_FIELDS),
+    }
+
+
+def _read_header(f):
+    """Parse the file header. Returns (header dict, offset of the first block)."""
+    prefix = f.read(len(MAGIC) + _HEADER_LENGTH.size)
+    if len(prefix) < len(MAGIC) + _HEADER_LENGTH.size or prefix[:len(MAGIC)] != MAGIC:
+        raise ArchiveError(f"{getattr(f, 'name', 'file')} is not a lead archive")
+    (length,) = _HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+    try:
+        header = json.loads(f.read(length))
+    except ValueError as e:
+        raise ArchiveError(f"unreadable archive header: {e}") from None
+    if header.get('format') != FORMAT_VERSION:
+        raise ArchiveError(f"unsupported archive format {header.get('format')!r}")
+    return header, len(prefix) + length
+
+
+def _scan_blocks(buffer, offset, end):
+    """[(body offset, rows)] for every complete block, and the offset after the last one."""
+    blocks = []
+    while offset + _BLOCK_HEADER.size <= end:
+        magic, rows, length = _BLOCK_HEADER.unpack_from(buffer, offset)
+        body = offset + _BLOCK_HEADER.size
+        if magic != BLOCK_MAGIC or body + length > end:
+            break
+        blocks.append((body, rows))
+        offset = body + length
+    return blocks, offset
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+class LeadArchiveWriter:
+    """
+    Append submissions to an archive (created if missing).
+
+    Rows are buffered and written as one block per block_rows submissions
+    (and on flush/close). Records are validated with Submission.from_dict,
+    so SubmissionError propagates for values the catalog doesn't know.
+    """
+
+    def __init__(self, path, block_rows=DEFAULT_BLOCK_ROWS):
+        self.path = path
+        self.block_rows = block_rows
+        self.rows_written = 0
+        if os.path.exists(path) and os.path.getsize(path):
+            self._file = open(path, 'r+b')
+            self.header, start = _read_header(self._file)
+            size = os.path.getsize(path)
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                _, end = _scan_blocks(view, start, size)
+            if end < size:  # drop a block cut short by a crash
+                self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'wb')
+            self.header = _new_header()
+            encoded = json.dumps(self.header, separators=(',', ':')).encode('utf-8')
+            self._file.write(MAGIC + _HEADER_LENGTH.pack(len(encoded)) + encoded)
+        self._codes = {field: {value: code for code, value in enumerate(values, 1)}
+                       for field, values in self.header['enum_fields'].items()}
+        self._text_fields = self.header['text_fields']
+        self._pending = []
+
+    def append(self, data):
+        """Add one submission dict or Submission."""
+        submission = Submission.from_dict(data)
+        row = []
+        for field, codes in self._codes.items():
+            value = submission.get(field)
+            if value is None:
+                row.append(0)
+            elif value in codes:
+                row.append(codes[value])
+            else:
+                raise SubmissionError([f"{field}: {value!r} is not in this archive's code table; "
+                                       "export and re-import the archive to add it"])
+        row.extend(submission.get(field) or '' for field in self._text_fields)
+        self._pending.append(row)
+        if len(self._pending) >= self.block_rows:
+            self.flush()
+
+    def extend(self, records):
+        for data in records:
+            self.append(data)
+
+    def flush(self):
+        """Write buffered rows as one block."""
+        if not self._pending:
+            return
+        rows = self._pending
+        self._pending = []
+        n = len(rows)
+        parts = []
+        for column, _ in enumerate(self._codes):
+            codes = bytes(row[column] for row in rows)
+            parts.append(codes + b'\0' * (_padded(n) - n))
+        for column in range(len(self._codes), len(self._codes) + len(self._text_fields)):
+            encoded = [row[column].encode('utf-8') for row in rows]
+            offsets = [0]
+            for value in encoded:
+                offsets.append(offsets[-1] + len(value))
+            heap = b''.join(encoded)
+            section = struct.pack(f'<{n + 1}I', *offsets) + heap
+            parts.append(section + b'\0' * (_padded(len(section)) - len(section)))
+        body = b''.join(parts)
+        self._file.write(_BLOCK_HEADER.pack(BLOCK_MAGIC, n, len(body)) + body)
+        self._file.flush()
+        self.rows_written += n
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================================
+# READING
+# ============================================================================
+class ArchiveBlock:
+    """One block of an archive: zero-copy views of its columns over the memory map."""
+
+    def __init__(self, archive, offset, rows):
+        self.archive = archive
+        self.rows = rows
+        self._offsets = {}
+        for field in archive.enum_fields:
+            self._offsets[field] = offset
+            offset += _padded(rows)
+        for field in archive.text_fields:
+            heap_length = struct.unpack_from('<I', archive._map, offset + 4 * rows)[0]
+            self._offsets[field] = offset
+            offset += _padded(4 * (rows + 1) + heap_length)
+
+    def __len__(self):
+        return self.rows
+
+    def codes(self, field):
+        """The uint8 code column for an enum field (a NumPy view when NumPy is installed)."""
+        offset = self._offsets[field]
+        try:
+            import numpy as np
+        except ImportError:
+            return memoryview(self.archive._map)[offset:offset + self.rows]
+        return np.frombuffer(self.archive._map, dtype=np.uint8, count=self.rows, offset=offset)
+
+    def columns(self, fields=KEY_FIELDS):
+        """CodedColumns for evaluate_bulk()."""
+        return {field: CodedColumn(self.codes(field), self.archive.enum_fields[field]) for field in fields}
+
+    def text(self, field):
+        """Decoded values of a text field (None where not submitted)."""
+        offset = self._offsets[field]
+        rows = self.rows
+        offsets = struct.unpack_from(f'<{rows + 1}I', self.archive._map, offset)
+        heap = offset + 4 * (rows + 1)
+        data = self.archive._map
+        return [data[heap + start:heap + end].decode('utf-8') or None
+                for start, end in zip(offsets, offsets[1:])]
+
+    def submissions(self):
+        """Rebuild the block's rows as Submissions."""
+        columns = [(field, CodedColumn(self.codes(field), values))
+                   for field, values in self.archive.enum_fields.items()]
+        texts = [(field, self.text(field)) for field in self.archive.text_fields]
+        for row in range(self.rows):
+            values = {field: column[row] for field, column in columns}
+            values.update((field, text[row]) for field, text in texts)
+            yield Submission.from_dict(values)
+
+
+class LeadArchive:
+    """
+    Read-only, memory-mapped view of an archive. Iterating yields
+    Submissions; blocks() gives columnar access for bulk scoring.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            header, start = _read_header(self._file)
+            size = os.path.getsize(path)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.enum_fields = {field: tuple(values) for field, values in header['enum_fields'].items()}
+        self.text_fields = tuple(header['text_fields'])
+        self._blocks, _ = _scan_blocks(self._map, start, size)
+
+    def __len__(self):
+        return sum(rows for _, rows in self._blocks)
+
+    def blocks(self):
+        for offset, rows in self._blocks:
+            yield ArchiveBlock(self, offset, rows)
+
+    def __iter__(self):
+        for block in self.blocks():
+            yield from block.submissions()
+
+    def score(self, rules=None):
+        """
+        Score every lead block by block.
+
+        Yields:
+            dict: evaluate_bulk() result columns for one block
+        """
+        rules = rules or get_rules()
+        for block in self.blocks():
+            yield rules.evaluate_bulk(block.columns())
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:  # NumPy views still alive; the map closes when they are freed
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def import_jsonl(source, path, block_rows=DEFAULT_BLOCK_ROWS):
+    """
+    Append every valid record of a JSONL/CSV submission file to an archive.
+
+    Returns:
+        dict: imported count and errors [(record index, message)]
+    """
+    errors = []
+    with LeadArchiveWriter(path, block_rows) as writer:
+        for index, data in enumerate(reports.read_submissions(source), 1):
+            if isinstance(data, Exception):
+                errors.append((index, str(data)))
+                continue
+            try:
+                writer.append(data)
+            except SubmissionError as e:
+                errors.append((index, str(e)))
+        writer.flush()
+        imported = writer.rows_written
+    return {'imported': imported, 'errors': errors}
+
+
+def export_jsonl(path, output):
+    """Write every archived lead as one JSON line (submitted fields only). Returns the count."""
+    count = 0
+    with LeadArchive(path) as archive, open(output, 'w', encoding='utf-8') as f:
+        for submission in archive:
+            f.write(json.dumps(submission.to_dict()) + '\n')
+            count += 1
+    return count
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+def _as_list(column):
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py archive',
+                                     description='Columnar lead archive for fast re-scoring')
+    parser.add_argument('--archive', type=str, default='leads' + ARCHIVE_SUFFIX, help='Archive file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_ = commands.add_parser('import', help='Append a JSONL or CSV submission file')
+    import_.add_argument('file')
+    import_.add_argument('--block-rows', type=int, default=DEFAULT_BLOCK_ROWS, help='Rows per block')
+    export = commands.add_parser('export', help='Write the archive out as JSONL')
+    export.add_argument('--output', type=str, required=True)
+    score = commands.add_parser('score', help='Score every lead and print totals')
+    score.add_argument('--output', type=str, default=None, help='Optional JSONL with one score per lead')
+    commands.add_parser('info', help='Show row and block counts')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        result = import_jsonl(args.file, args.archive, args.block_rows)
+        for index, error in result['errors']:
+            print(f"Record {index} skipped: {error}", file=sys.stderr)
+        print(f"Imported {result['imported']} leads into {args.archive} ({len(result['errors'])} skipped)")
+        return 1 if result['errors'] and not result['imported'] else 0
+    if args.command == 'export':
+        print(f"Exported {export_jsonl(args.archive, args.output)} leads to {args.output}")
+        return 0
+
+    with LeadArchive(args.archive) as archive:
+        if args.command == 'info':
+            print(json.dumps({'path': args.archive, 'leads': len(archive), 'blocks': len(archive._blocks),
+                              'bytes': os.path.getsize(args.archive)}, indent=2))
+            return 0
+        start = time.perf_counter()
+        leads = total_low = total_high = 0
+        out = open(args.output, 'w', encoding='utf-8') if args.output else None
+        try:
+            for scores in archive.score():
+                scores = {name: _as_list(column) for name, column in scores.items()}
+                leads += len(scores['total_low'])
+                total_low += sum(scores['total_low'])
+                total_high += sum(scores['total_high'])
+                if out:
+                    for row in zip(*scores.values()):
+                        out.write(json.dumps(dict(zip(scores, row))) + '\n')
+        finally:
+            if out:
+                out.close()
+        elapsed = time.perf_counter() - start
+    print(json.dumps({'leads': leads, 'total_low': total_low, 'total_high': total_high,
+                      'seconds': round(elapsed, 3),
+                      'leads_per_second': round(leads / elapsed) if elapsed else None}, indent=2))
+    return 0
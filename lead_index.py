@@ -0,0 +1,505 @@
+"""
+MBRACE Intelligence - Lead Prioritization Index
+===============================================
+
+SQLite index of scored leads, so "top 500 HIGH-urgency leads in Pepco
+territory by incentive value" is one indexed query instead of re-scoring the
+whole pipeline. Leads are scored once as they are added (incrementally, e.g.
+from the render service as they arrive) and stored with their catalog
+values, estimated incentives, payback and urgency.
+
+A lead with a lead_id (or an email/phone plus address to identify it)
+replaces its earlier entry when it is added again. When the incentive
+catalog changes, rescore() updates every stored score in one pass: leads
+sharing submitted inputs share a score, so only the distinct combinations
+are evaluated. Fields a lead left blank are kept blank (input_key) and take
+the catalog default at scoring time, so a changed default reaches them too.
+
+Run with:
+    python generate_incentive_report.py index add leads.jsonl --index leads.db
+    python generate_incentive_report.py index top --k 500 --urgency HIGH --utility Pepco
+    python generate_incentive_report.py index top --band 25k_50k --building-type nonprofit --json
+    python generate_incentive_report.py index stats
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+
+import generate_incentive_report as reports
+from incentive_rules import KEY_FIELDS, get_rules
+from submission import Submission, SubmissionError, normalize_value
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    lead_id          TEXT UNIQUE,
+    utility          TEXT    NOT NULL,
+    income_level     TEXT    NOT NULL,
+    building_type    TEXT    NOT NULL,
+    heating_system   TEXT    NOT NULL,
+    system_age       TEXT    NOT NULL,
+    input_key        TEXT    NOT NULL DEFAULT '',
+    total_low        INTEGER NOT NULL,
+    total_high       INTEGER NOT NULL,
+    payback_years    REAL    NOT NULL,
+    coverage_percent TEXT    NOT NULL,
+    urgency_level    TEXT    NOT NULL,
+    urgency_rank     INTEGER NOT NULL,
+    submission       TEXT    NOT NULL,
+    indexed_at       REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leads_value ON leads (total_high DESC);
+CREATE INDEX IF NOT EXISTS leads_priority ON leads (urgency_rank, total_high DESC);
+CREATE INDEX IF NOT EXISTS leads_utility ON leads (utility, urgency_rank, total_high DESC);
+CREATE INDEX IF NOT EXISTS leads_building ON leads (building_type, urgency_rank, total_high DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Most urgent first; unknown levels sort last
+URGENCY_RANK = {'HIGH': 0, 'MODERATE': 1, 'OPPORTUNITY': 2}
+
+# Bands on the high incentive estimate: name -> (at least, below)
+VALUE_BANDS = {
+    'under_10k': (0, 10000),
+    '10k_25k': (10000, 25000),
+    '25k_50k': (25000, 50000),
+    '50k_plus': (50000, None),
+}
+
+# Sort orders for top(): SQL ORDER BY clause
+ORDER_BY = {
+    'priority': 'urgency_rank, total_high DESC, id',
+    'total_high': 'total_high DESC, id',
+    'total_low': 'total_low DESC, id',
+    'payback_years': 'payback_years, total_high DESC, id',
+}
+
+# Record fields that identify a lead, in order of preference
+LEAD_ID_FIELDS = ('lead_id', 'submission_id', 'id')
+
+# Contact fields that identify a lead without an id, together with its address
+# (one contact can submit several properties)
+CONTACT_ID_FIELDS = ('email', 'phone')
+
+SCORE_COLUMNS = ('total_low', 'total_high', 'payback_years', 'coverage_percent', 'urgency_level', 'urgency_rank')
+RESULT_COLUMNS = ('lead_id',) + KEY_FIELDS + SCORE_COLUMNS[:-1]
+
+# Rows written per transaction by add_many
+INSERT_CHUNK = 5000
+
+
+def lead_id_for(data):
+    """
+    The identifying value of a submission dict or Submission, or None: the
+    first LEAD_ID_FIELDS value, else "contact|address" from the first
+    CONTACT_ID_FIELDS value and the address (case and spacing folded).
+
+    A Submission carries no LEAD_ID_FIELDS, so pass the raw dict when the
+    submission was validated first (as the render service does).
+    """
+    for field in LEAD_ID_FIELDS:
+        value = data.get(field)
+        if value not in (None, ''):
+            return str(value)
+    for field in CONTACT_ID_FIELDS:
+        value = data.get(field)
+        if value not in (None, ''):
+            address = ' '.join(str(data.get('address') or '').lower().split())
+            return f"{value}|{address}"
+    return None
+
+
+def input_key_for(submission):
+    """JSON list of the submitted KEY_FIELDS values of a Submission (null where left blank)."""
+    return json.dumps([submission.get(field) for field in KEY_FIELDS])
+
+
+def _scores(result):
+    return (result['total_low'], result['total_high'], result['payback_years'], result['coverage_percent'],
+            result['urgency_level'], URGENCY_RANK.get(result['urgency_level'], len(URGENCY_RANK)))
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+class LeadIndex:
+    """
+    Args:
+        path: SQLite database file (created on first use; ':memory:' for a
+            throwaway index)
+        rules: RuleSet to score with (default: the process-wide catalog)
+    """
+
+    def __init__(self, path='lead_index.db', rules=None):
+        self.path = path
+        self.rules = rules or get_rules()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        if 'input_key' not in {row[1] for row in self._db.execute('PRAGMA table_info(leads)')}:
+            self._add_input_keys()
+
+    def _add_input_keys(self):
+        """Upgrade an index written before input_key was stored, from the stored submissions."""
+        def upgrade(cursor):
+            cursor.execute("ALTER TABLE leads ADD COLUMN input_key TEXT NOT NULL DEFAULT ''")
+            rows = cursor.execute('SELECT id, submission FROM leads').fetchall()
+            cursor.executemany('UPDATE leads SET input_key = ? WHERE id = ?',
+                               [(input_key_for(Submission.from_dict(json.loads(submission))), row_id)
+                                for row_id, submission in rows])
+        self._transaction(upgrade)
+
+    def _transaction(self, work):
+        with self._lock:
+            cursor = self._db.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(cursor)
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+            return result
+
+    @property
+    def catalog(self):
+        """'version:fingerprint' of the catalog the stored scores came from (None when empty)."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'catalog'").fetchone()
+        return row[0] if row else None
+
+    def _current_catalog(self):
+        return f"{self.rules.version}:{self.rules.fingerprint}"
+
+    @property
+    def stale(self):
+        """True when stored scores came from a different catalog than self.rules."""
+        catalog = self.catalog
+        return catalog is not None and catalog != self._current_catalog()
+
+    # ------------------------------------------------------------------------
+    # Insertion
+    # ------------------------------------------------------------------------
+    def _key(self, submitted):
+        """Catalog key for submitted KEY_FIELDS values, with the current defaults for blanks."""
+        return self.rules.normalize_key(self.rules.submission_key(dict(zip(KEY_FIELDS, submitted))))
+
+    def _row(self, data, lead_id, now):
+        submission = Submission.from_dict(data)
+        key = self._key([submission.get(field) for field in KEY_FIELDS])
+        result = self.rules.lookup(*key)
+        return ((lead_id if lead_id is not None else lead_id_for(data),) + key + (input_key_for(submission),)
+                + _scores(result) + (json.dumps(submission.to_dict()), now))
+
+    def add(self, data, lead_id=None):
+        """Score and index one submission (replacing an earlier entry with the same lead id)."""
+        self.add_many([data], [lead_id])
+
+    def add_many(self, submissions, lead_ids=None):
+        """
+        Score and index many submissions, committing every INSERT_CHUNK rows.
+
+        Leads are identified by lead_ids (parallel to submissions) or by the
+        first of LEAD_ID_FIELDS they carry; leads without one are always
+        added as new entries. If the catalog changed since the index was
+        last written, stored scores are brought up to date first (rescore).
+
+        Returns:
+            dict: added (new or replaced leads) and invalid, a list of
+            (position, error) for records that failed validation
+        """
+        if self.stale:
+            self.rescore()
+        lead_ids = iter(lead_ids) if lead_ids is not None else None
+        counts = {'added': 0, 'invalid': []}
+        rows = []
+        columns = ('lead_id',) + KEY_FIELDS + ('input_key',) + SCORE_COLUMNS + ('submission', 'indexed_at')
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns[1:])
+        statement = (f"INSERT INTO leads ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                     f"ON CONFLICT(lead_id) DO UPDATE SET {updates}")
+        catalog = self._current_catalog()
+
+        def flush(cursor):
+            cursor.executemany(statement, rows)
+            cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('catalog', ?)", (catalog,))
+
+        now = time.time()
+        for position, data in enumerate(submissions, 1):
+            lead_id = next(lead_ids) if lead_ids is not None else None
+            if isinstance(data, Exception):
+                counts['invalid'].append((position, str(data)))
+                continue
+            try:
+                rows.append(self._row(data, lead_id, now))
+            except SubmissionError as e:
+                counts['invalid'].append((position, str(e)))
+                continue
+            if len(rows) >= INSERT_CHUNK:
+                self._transaction(flush)
+                counts['added'] += len(rows)
+                rows = []
+        if rows:
+            self._transaction(flush)
+            counts['added'] += len(rows)
+        return counts
+
+    def remove(self, lead_id):
+        """Drop a lead (e.g. once it has converted). Returns True if it was indexed."""
+        return self._transaction(lambda cursor: cursor.execute('DELETE FROM leads WHERE lead_id = ?',
+                                                               (str(lead_id),)).rowcount > 0)
+
+    def rescore(self):
+        """
+        Re-score every stored lead with self.rules in one UPDATE.
+
+        Each distinct set of submitted inputs is resolved (defaults, unlisted
+        values) and evaluated once into a temporary table; the leads then
+        pick up their catalog key and scores by input_key.
+
+        Returns:
+            dict: combinations evaluated and leads updated
+        """
+        catalog = self._current_catalog()
+        columns = KEY_FIELDS + SCORE_COLUMNS
+
+        def update(cursor):
+            inputs = [row[0] for row in cursor.execute('SELECT DISTINCT input_key FROM leads')]
+            cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS scores (input_key TEXT PRIMARY KEY, {', '.join(columns)})")
+            cursor.execute('DELETE FROM scores')
+            rows = []
+            for input_key in inputs:
+                key = self._key(json.loads(input_key))
+                rows.append((input_key,) + key + _scores(self.rules.lookup(*key)))
+            cursor.executemany(f"INSERT INTO scores VALUES ({', '.join('?' * (len(columns) + 1))})", rows)
+            cursor.execute(f"UPDATE leads SET ({', '.join(columns)}) = "
+                           f"(SELECT {', '.join(columns)} FROM scores s WHERE s.input_key = leads.input_key)")
+            updated = cursor.rowcount
+            cursor.execute('DELETE FROM scores')
+            cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('catalog', ?)", (catalog,))
+            return {'combinations': len(inputs), 'updated': updated}
+        return self._transaction(update)
+
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+    def _where(self, utility=None, building_type=None, urgency=None, band=None, min_value=None, max_value=None):
+        """SQL WHERE clause and parameters for the query filters (see top)."""
+        clauses, params = [], []
+
+        def any_of(column, values):
+            values = [values] if isinstance(values, str) else list(values)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        for field, values in (('utility', utility), ('building_type', building_type)):
+            if values is None:
+                continue
+            resolved = []
+            for value in [values] if isinstance(values, str) else values:
+                member = normalize_value(field, value)
+                if member is None:
+                    raise ValueError(f"{field}: unknown value {value!r}")
+                resolved.append(member.value)
+            any_of(field, resolved)
+        if urgency is not None:
+            levels = [urgency] if isinstance(urgency, str) else list(urgency)
+            unknown = [level for level in levels if level.upper() not in URGENCY_RANK]
+            if unknown:
+                raise ValueError(f"urgency: unknown level {unknown[0]!r} (choose from {', '.join(URGENCY_RANK)})")
+            any_of('urgency_rank', [URGENCY_RANK[level.upper()] for level in levels])
+        if band is not None:
+            bands = [band] if isinstance(band, str) else list(band)
+            ranges = []
+            for name in bands:
+                if name not in VALUE_BANDS:
+                    raise ValueError(f"band: unknown band {name!r} (choose from {', '.join(VALUE_BANDS)})")
+                low, high = VALUE_BANDS[name]
+                ranges.append('(total_high >= ?' + (' AND total_high < ?)' if high is not None else ')'))
+                params.extend([low] + ([high] if high is not None else []))
+            clauses.append('(' + ' OR '.join(ranges) + ')')
+        if min_value is not None:
+            clauses.append('total_high >= ?')
+            params.append(min_value)
+        if max_value is not None:
+            clauses.append('total_high <= ?')
+            params.append(max_value)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def top(self, k=100, order_by='priority', include_submission=True, **filters):
+        """
+        The best k leads matching the filters.
+
+        Args:
+            k: number of leads to return
+            order_by: one of ORDER_BY ('priority' is most urgent first, then
+                highest incentive estimate)
+            include_submission: attach each lead's stored submission dict
+            utility, building_type: a value or list of values (known
+                spellings such as "pepco" are accepted)
+            urgency: HIGH, MODERATE or OPPORTUNITY, or a list of them
+            band: a VALUE_BANDS name or list of names
+            min_value, max_value: bounds on the high incentive estimate
+
+        Returns:
+            list of dicts with lead_id, the input fields, total_low,
+            total_high, payback_years, coverage_percent, urgency_level and
+            (optionally) submission
+
+        Raises:
+            ValueError: unknown filter value or order_by, or k below 1
+        """
+        if order_by not in ORDER_BY:
+            raise ValueError(f"order_by must be one of {', '.join(ORDER_BY)}")
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        where, params = self._where(**filters)
+        columns = RESULT_COLUMNS + (('submission',) if include_submission else ())
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(columns)} FROM leads{where} "
+                                    f"ORDER BY {ORDER_BY[order_by]} LIMIT ?", params + [k]).fetchall()
+        leads = [dict(zip(columns, row)) for row in rows]
+        if include_submission:
+            for lead in leads:
+                lead['submission'] = json.loads(lead['submission'])
+        return leads
+
+    def count(self, **filters):
+        """Number of leads matching the filters (same filters as top)."""
+        where, params = self._where(**filters)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM leads{where}", params).fetchone()[0]
+
+    def stats(self):
+        """Lead counts and total high estimate by urgency, utility and building type."""
+        result = {'leads': 0, 'catalog': self.catalog, 'stale': self.stale}
+        with self._lock:
+            result['leads'], result['total_high'] = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(total_high), 0) FROM leads').fetchone()
+            for column in ('urgency_level', 'utility', 'building_type'):
+                result[f"by_{column}"] = {
+                    value: {'leads': leads, 'total_high': total}
+                    for value, leads, total in self._db.execute(
+                        f"SELECT {column}, COUNT(*), SUM(total_high) FROM leads "
+                        f"GROUP BY {column} ORDER BY SUM(total_high) DESC")}
+        return result
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============================================================================
+# CLI INTERFACE
+# ============================================================================
+def _add_filters(parser):
+    parser.add_argument('--utility', action='append', default=None, help='Utility territory (repeatable)')
+    parser.add_argument('--building-type', action='append', default=None, help='Building type (repeatable)')
+    parser.add_argument('--urgency', action='append', default=None, choices=list(URGENCY_RANK),
+                        help='Urgency level (repeatable)')
+    parser.add_argument('--band', action='append', default=None, choices=list(VALUE_BANDS),
+                        help='Incentive value band on the high estimate (repeatable)')
+    parser.add_argument('--min-value', type=int, default=None, help='Minimum high incentive estimate')
+    parser.add_argument('--max-value', type=int, default=None, help='Maximum high incentive estimate')
+
+
+def _filters(args):
+    return {'utility': args.utility, 'building_type': args.building_type, 'urgency': args.urgency,
+            'band': args.band, 'min_value': args.min_value, 'max_value': args.max_value}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py index',
+                                     description='Rank the lead pipeline by incentive value and urgency')
+    parser.add_argument('--index', type=str, default='lead_index.db', help='Lead index database file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='Score and index submissions from a JSONL/CSV/.mba file or --data')
+    add.add_argument('file', nargs='?', help='JSONL, CSV or lead archive (.mba) file')
+    add.add_argument('--data', type=str, help='JSON string with one submission')
+
+    top = commands.add_parser('top', help='List the top leads matching the filters')
+    top.add_argument('--k', type=int, default=100, help='Number of leads')
+    top.add_argument('--order-by', choices=list(ORDER_BY), default='priority', help='Sort order')
+    top.add_argument('--json', action='store_true', help='Print JSON lines with the stored submissions')
+    _add_filters(top)
+
+    count = commands.add_parser('count', help='Count leads matching the filters')
+    _add_filters(count)
+
+    commands.add_parser('stats', help='Lead counts and value by urgency, utility and building type')
+    commands.add_parser('rescore', help='Re-score every lead with the current catalog')
+    remove = commands.add_parser('remove', help='Drop leads by lead id')
+    remove.add_argument('lead_ids', nargs='+')
+
+    args = parser.parse_args(argv)
+    index = LeadIndex(args.index)
+    try:
+        if args.command == 'add':
+            if args.data:
+                try:
+                    records = [json.loads(args.data)]
+                except json.JSONDecodeError as e:
+                    parser.error(f"--data: invalid JSON: {e}")
+            elif args.file:
+                records = reports.read_submissions(args.file)
+            else:
+                parser.error('add needs a file or --data')
+            start = time.perf_counter()
+            counts = index.add_many(records)
+            for position, error in counts['invalid']:
+                print(f"Record {position} skipped: {error}")
+            print(f"Indexed {counts['added']} leads in {time.perf_counter() - start:.2f}s "
+                  f"({index.count()} in {args.index})")
+        elif args.command in ('top', 'count'):
+            if index.stale:
+                print(f"Warning: {args.index} was scored with catalog {index.catalog}; "
+                      f"run 'index rescore' to update it", file=sys.stderr)
+            try:
+                if args.command == 'count':
+                    print(index.count(**_filters(args)))
+                    return 0
+                start = time.perf_counter()
+                leads = index.top(args.k, args.order_by, include_submission=args.json, **_filters(args))
+                elapsed = time.perf_counter() - start
+            except ValueError as e:
+                parser.error(str(e))
+            for lead in leads:
+                if args.json:
+                    print(json.dumps(lead))
+                else:
+                    print(f"{lead['urgency_level']:<12} ${lead['total_low']:>7,} - ${lead['total_high']:>7,}  "
+                          f"{lead['payback_years']:>5} yr  {lead['utility']:<15} {lead['building_type']:<15} "
+                          f"{lead['lead_id'] or ''}")
+            print(f"{len(leads)} leads in {elapsed * 1000:.1f} ms", file=sys.stderr)
+        elif args.command == 'stats':
+            print(json.dumps(index.stats(), indent=2))
+        elif args.command == 'rescore':
+            start = time.perf_counter()
+            counts = index.rescore()
+            print(f"Re-scored {counts['updated']} leads ({counts['combinations']} input combinations) "
+                  f"in {time.perf_counter() - start:.2f}s")
+        elif args.command == 'remove':
+            removed = sum(index.remove(lead_id) for lead_id in args.lead_ids)
+            print(f"Removed {removed} leads")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
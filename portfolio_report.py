@@ -0,0 +1,397 @@
+"""
+MBRACE Intelligence - Portfolio Reports
+=======================================
+
+One consolidated incentive scan for a housing authority or LIHTC owner
+with many buildings. Each property is a calculator submission plus a unit
+count (and an optional name):
+
+    {"property_name": "Elm Court", "units": 48, "address": "...",
+     "building_type": "5+_multifamily", "utility": "BGE", ...}
+
+Incentives, project costs and savings for the catalog's per_unit building
+types (5+_multifamily) are per dwelling unit and are multiplied by the
+unit count; other building types count once per building.
+
+score_portfolio() aggregates eligibility and totals in a single pass over
+the properties; scoring is memoized per input combination, so a portfolio
+of thousands of similar buildings scores in milliseconds and reportlab is
+not loaded until a PDF is rendered.
+
+The per-property listing is laid out as a series of small fixed-geometry
+tables (PROPERTY_ROWS_PER_TABLE rows each, constant column widths and row
+heights), so layout time grows linearly with the number of properties
+instead of reportlab re-measuring and re-splitting one very large table.
+
+Run with:
+    python generate_incentive_report.py portfolio properties.csv --output portfolio.pdf
+    python generate_incentive_report.py portfolio properties.jsonl --name "Harbor Housing" --json
+"""
+
+from dataclasses import dataclass
+from xml.sax.saxutils import escape
+import argparse
+import json
+import sys
+
+import generate_incentive_report as reports
+from incentive_rules import get_rules
+from submission import Submission, SubmissionError
+
+# Columns accepted for the unit count and the property label
+UNIT_FIELDS = ('units', 'unit_count')
+NAME_FIELDS = ('property_name', 'property_id', 'name')
+
+PROPERTY_ROWS_PER_TABLE = 40
+MAX_LISTED_ERRORS = 200
+
+
+@dataclass(frozen=True, slots=True)
+class PortfolioProperty:
+    name: str
+    units: int
+    submission: Submission
+
+    @classmethod
+    def from_dict(cls, data, index):
+        """
+        Validate one portfolio record (a submission plus units/name).
+
+        Units may be written as a float ("12.0", as CSV exports often do) but
+        must be whole. They default to 1, except for the catalog's per_unit
+        building types, whose totals are multiplied by the unit count: a
+        record of that type without a units column is rejected rather than
+        scored as a single unit.
+
+        Raises SubmissionError listing every problem with the record.
+        """
+        errors = []
+        try:
+            submission = Submission.from_dict(data)
+        except SubmissionError as e:
+            errors.extend(e.errors)
+            submission = None
+        raw_units = next((data[f] for f in UNIT_FIELDS if data.get(f) not in (None, '')), None)
+        units = 1
+        if raw_units is None:
+            building_type = submission.get('building_type') if submission else None
+            if building_type in get_rules().per_unit_building_types:
+                errors.append(f"units: required for {building_type} properties (incentives are per unit)")
+        else:
+            try:
+                number = float(raw_units)
+                if not number.is_integer() or number < 1:
+                    raise ValueError
+                units = int(number)
+            except (TypeError, ValueError, OverflowError):
+                errors.append(f"units: expected a whole number of at least 1, got {raw_units!r}")
+        if errors:
+            raise SubmissionError(errors)
+        name = next((str(data[f]).strip() for f in NAME_FIELDS if data.get(f) not in (None, '')), None)
+        return cls(name or submission.address or f"Property {index}", units, submission)
+
+
+def parse_properties(records):
+    """
+    Validate an iterable of portfolio records.
+
+    Yields (index, PortfolioProperty) per valid record and (index, error)
+    per invalid one, so callers can list bad records and keep going.
+    """
+    for index, record in enumerate(records, 1):
+        if isinstance(record, Exception):
+            yield index, record
+            continue
+        if not isinstance(record, dict):
+            yield index, SubmissionError([f"expected a JSON object, got {type(record).__name__}"])
+            continue
+        try:
+            yield index, PortfolioProperty.from_dict(record, index)
+        except SubmissionError as e:
+            yield index, e
+
+
+# ============================================================================
+# SCORING
+# ============================================================================
+def _add(totals, key, units, low, high):
+    entry = totals.get(key)
+    if entry is None:
+        entry = totals[key] = {'properties': 0, 'units': 0, 'low': 0, 'high': 0}
+    entry['properties'] += 1
+    entry['units'] += units
+    entry['low'] += low
+    entry['high'] += high
+
+
+def score_portfolio(records, name=None):
+    """
+    Score every property and aggregate the portfolio in one pass.
+
+    Args:
+        records: iterable of portfolio record dicts (see parse_properties),
+            e.g. read_submissions('properties.csv')
+        name: portfolio name for the report title
+
+    Returns:
+        dict: portfolio totals, 'programs' / 'building_types' / 'urgency'
+        breakdowns (properties, units, low, high), 'properties' rows and
+        'errors' for records that were excluded
+    """
+    rules = get_rules()
+    rows = []
+    errors = []
+    programs = {}
+    building_types = {}
+    urgency = {}
+    total_units = total_low = total_high = 0
+    total_cost = savings_low = savings_high = 0
+
+    for index, prop in parse_properties(records):
+        if isinstance(prop, Exception):
+            errors.append({'index': index, 'error': str(prop)})
+            continue
+        incentives = reports.calculate_incentives(prop.submission)
+        building_type = prop.submission.get('building_type')
+        scale = rules.unit_multiplier(building_type, prop.units)
+        low = incentives['total_low'] * scale
+        high = incentives['total_high'] * scale
+        cost = rules.project_cost(building_type) * scale
+
+        total_units += prop.units
+        total_low += low
+        total_high += high
+        total_cost += cost
+        savings_low += incentives['annual_savings']['low'] * scale
+        savings_high += incentives['annual_savings']['high'] * scale
+
+        for key, program_type in (('utility_rebate', 'Utility'), ('federal_rebate', 'Federal'),
+                                  ('state_grant', 'State')):
+            amount = incentives[key]
+            if amount['high']:
+                _add(programs, (amount['name'], program_type), prop.units,
+                     amount['low'] * scale, amount['high'] * scale)
+        _add(building_types, building_type or 'unspecified', prop.units, low, high)
+        _add(urgency, incentives['urgency_level'], prop.units, low, high)
+
+        rows.append({
+            'index': index,
+            'name': prop.name,
+            'address': prop.submission.address or '',
+            'building_type': building_type or '',
+            'units': prop.units,
+            'low': low,
+            'high': high,
+            'coverage_percent': incentives['coverage_percent'],
+            'urgency_level': incentives['urgency_level'],
+        })
+
+    avg_incentive = (total_low + total_high) / 2
+    return {
+        'name': name,
+        'rules_version': rules.version,
+        'property_count': len(rows),
+        'unit_count': total_units,
+        'total_low': total_low,
+        'total_high': total_high,
+        'project_cost': total_cost,
+        'coverage_percent': rules.coverage_label(avg_incentive, total_cost) if total_cost else None,
+        'annual_savings': {'low': savings_low, 'high': savings_high},
+        'payback_years': rules.payback_years(avg_incentive, total_cost, (savings_low, savings_high)),
+        'programs': [dict(entry, name=program, type=program_type)
+                     for (program, program_type), entry in programs.items()],
+        'building_types': building_types,
+        'urgency': urgency,
+        'properties': rows,
+        'errors': errors,
+    }
+
+
+# ============================================================================
+# PDF
+# ============================================================================
+def _money_range(low, high):
+    return f"${low:,} — ${high:,}"
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def _breakdown_table(layout, header, items, label, col_widths, table_style):
+    data = [header]
+    for key, entry in items:
+        data.append([label(key), f"{entry['properties']:,}", f"{entry['units']:,}",
+                     _money_range(entry['low'], entry['high'])])
+    table = layout.Table(data, colWidths=col_widths, repeatRows=1)
+    table.setStyle(table_style)
+    return table
+
+
+def generate_portfolio_report(portfolio, output_path, styles=None, generated_at=None):
+    """
+    Render a scored portfolio (see score_portfolio) as one consolidated PDF.
+
+    Args:
+        portfolio: dict returned by score_portfolio
+        output_path: PDF path or binary file object
+        styles: optional (styles, table_styles) pair (default: report_layout.default_styles())
+        generated_at: report date (default: reports.report_clock())
+
+    Returns:
+        output_path
+    """
+    import report_layout as layout
+    inch = layout.inch
+    styles, table_styles = styles or layout.default_styles()
+    generated_at = generated_at or reports.report_clock()
+
+    doc = layout.SimpleDocTemplate(
+        output_path,
+        pagesize=layout.letter,
+        rightMargin=0.75*inch,
+        leftMargin=0.75*inch,
+        topMargin=0.75*inch,
+        bottomMargin=0.75*inch,
+        title=f"Portfolio Incentive Scan - {portfolio['name'] or 'Portfolio'}",
+        invariant=reports.pdf_invariant(),
+    )
+    story = []
+
+    # =========================================================================
+    # HEADER
+    # =========================================================================
+    story.append(layout.Paragraph("MBRACE Intelligence", styles['ReportTitle']))
+    story.append(layout.Paragraph("Portfolio Incentive Scan", styles['SubHeader']))
+    story.append(layout.Paragraph(f"""
+    <b>Portfolio:</b> {escape(portfolio['name'] or 'N/A')}<br/>
+    <b>Properties:</b> {portfolio['property_count']:,} &nbsp; <b>Units:</b> {portfolio['unit_count']:,}<br/>
+    <b>Report Generated:</b> {generated_at.strftime('%B %d, %Y')}
+    """, styles['MBRACEBody']))
+    story.append(layout.HRFlowable(width="100%", thickness=2, color=layout.COLORS['primary']))
+    story.append(layout.Spacer(1, 15))
+
+    # =========================================================================
+    # PORTFOLIO SUMMARY
+    # =========================================================================
+    story.append(layout.Paragraph("Estimated Portfolio Incentives", styles['SectionHeader']))
+    story.append(layout.Paragraph(_money_range(portfolio['total_low'], portfolio['total_high']),
+                                  styles['BigNumber']))
+    if portfolio['coverage_percent']:
+        story.append(layout.Paragraph(
+            f"Estimated Coverage: <b>{portfolio['coverage_percent']}</b> of "
+            f"${portfolio['project_cost']:,} in estimated project costs", styles['Highlight']))
+    story.append(layout.Spacer(1, 10))
+
+    savings = portfolio['annual_savings']
+    financial = layout.Table([
+        ['Metric', 'Value'],
+        ['Properties / Units', f"{portfolio['property_count']:,} / {portfolio['unit_count']:,}"],
+        ['Est. Project Cost', f"${portfolio['project_cost']:,}"],
+        ['Est. Annual Energy Savings', _money_range(savings['low'], savings['high'])],
+        ['Est. Payback Period (with incentives)', f"~{portfolio['payback_years']} years"],
+        ['Records Excluded', f"{len(portfolio['errors']):,}"],
+    ], colWidths=[3.5*inch, 3*inch])
+    financial.setStyle(table_styles['financial'])
+    story.append(financial)
+    story.append(layout.Spacer(1, 20))
+
+    # =========================================================================
+    # BREAKDOWNS
+    # =========================================================================
+    story.append(layout.Paragraph("Programs Across the Portfolio", styles['SectionHeader']))
+    programs = sorted(portfolio['programs'], key=lambda p: -p['high'])
+    story.append(_breakdown_table(
+        layout, ['Program', 'Properties', 'Units', 'Est. Amount'],
+        [(f"{p['name']} ({p['type']})", p) for p in programs], str,
+        [2.9*inch, 0.9*inch, 0.9*inch, 1.8*inch], table_styles['program']))
+    story.append(layout.Spacer(1, 15))
+
+    story.append(layout.Paragraph("By Building Type", styles['SubHeader']))
+    story.append(_breakdown_table(
+        layout, ['Building Type', 'Properties', 'Units', 'Est. Incentives'],
+        sorted(portfolio['building_types'].items()), lambda k: k.replace('_', ' ').title(),
+        [2.9*inch, 0.9*inch, 0.9*inch, 1.8*inch], table_styles['program']))
+    story.append(layout.Spacer(1, 15))
+
+    story.append(layout.Paragraph("By Replacement Urgency", styles['SubHeader']))
+    story.append(_breakdown_table(
+        layout, ['Urgency', 'Properties', 'Units', 'Est. Incentives'],
+        sorted(portfolio['urgency'].items()), str,
+        [2.9*inch, 0.9*inch, 0.9*inch, 1.8*inch], table_styles['program']))
+
+    # =========================================================================
+    # PROPERTY DETAIL (chunked fixed-geometry tables)
+    # =========================================================================
+    story.append(layout.PageBreak())
+    story.append(layout.Paragraph("Property Detail", styles['SectionHeader']))
+    header = ['#', 'Property', 'Type', 'Units', 'Est. Incentives', 'Coverage', 'Urgency']
+    col_widths = [0.45*inch, 2.35*inch, 0.95*inch, 0.5*inch, 1.35*inch, 0.6*inch, 0.8*inch]
+    rows = portfolio['properties']
+    for start in range(0, len(rows), PROPERTY_ROWS_PER_TABLE):
+        data = [header]
+        for row in rows[start:start + PROPERTY_ROWS_PER_TABLE]:
+            data.append([
+                str(row['index']),
+                _clip(row['name'], 40),
+                row['building_type'].replace('_', ' ').title(),
+                f"{row['units']:,}",
+                _money_range(row['low'], row['high']),
+                row['coverage_percent'],
+                row['urgency_level'],
+            ])
+        table = layout.Table(data, colWidths=col_widths, rowHeights=[16] * len(data), repeatRows=1)
+        table.setStyle(table_styles['property'])
+        story.append(table)
+
+    # =========================================================================
+    # EXCLUDED RECORDS, FOOTER / DISCLAIMER
+    # =========================================================================
+    errors = portfolio['errors']
+    if errors:
+        story.append(layout.Paragraph("Records Excluded", styles['SectionHeader']))
+        for error in errors[:MAX_LISTED_ERRORS]:
+            text = escape(f"Record {error['index']}: {error['error']}")
+            story.append(layout.Paragraph(text, styles['MBRACEBody']))
+        if len(errors) > MAX_LISTED_ERRORS:
+            story.append(layout.Paragraph(f"... and {len(errors) - MAX_LISTED_ERRORS:,} more",
+                                          styles['MBRACEBody']))
+
+    story.append(layout.Spacer(1, 20))
+    story.append(layout.HRFlowable(width="100%", thickness=1, color=layout.colors.gray))
+    story.append(layout.Spacer(1, 10))
+    story.append(layout.Paragraph(layout.DISCLAIMER, styles['Footer']))
+
+    doc.build(story)
+    return output_path
+
+
+def portfolio_summary(portfolio):
+    """The JSON-friendly totals of a scored portfolio (no per-property rows)."""
+    summary = {k: v for k, v in portfolio.items() if k not in ('properties', 'errors')}
+    summary['errors'] = len(portfolio['errors'])
+    return summary
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py portfolio',
+                                     description='Consolidated incentive scan for a multi-property portfolio')
+    parser.add_argument('file', help='JSONL or CSV file with one property per record')
+    parser.add_argument('--output', type=str, default='portfolio_incentive_scan.pdf', help='Output PDF path')
+    parser.add_argument('--name', type=str, default=None, help='Portfolio name for the report title')
+    parser.add_argument('--json', action='store_true', help='Print the portfolio totals as JSON and skip the PDF')
+    args = parser.parse_args(argv)
+
+    portfolio = score_portfolio(reports.read_submissions(args.file), name=args.name)
+    for error in portfolio['errors']:
+        print(f"Record {error['index']} excluded: {error['error']}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(portfolio_summary(portfolio), indent=2))
+    else:
+        generate_portfolio_report(portfolio, args.output)
+        print(f"Portfolio report generated: {args.output} ({portfolio['property_count']:,} properties, "
+              f"{portfolio['unit_count']:,} units)")
+    return 1 if portfolio['errors'] and not portfolio['property_count'] else 0
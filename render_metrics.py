@@ -0,0 +1,238 @@
+"""
+MBRACE Intelligence - Render Instrumentation
+============================================
+
+Optional per-stage timing for report renders. When at least one hook is
+registered, every render records how long each stage took and how many
+memory blocks it left allocated (sys.getallocatedblocks deltas):
+
+    score          calculate_incentives
+    story          story assembly (paragraphs, tables, cached fragments)
+    build          doc.build: layout, drawing and PDF serialization
+    table_layout   Table.wrap calls (already counted inside build)
+    write          copying the finished PDF to its path, file object or writer
+
+Hooks are plain callables receiving one record dict per render. Three are
+provided: LoggingHook, JsonLinesHook and PrometheusHook. Hooks are
+per-process, so register them in the process that renders (for batch pools,
+in the worker initializer).
+
+Usage:
+    from render_metrics import add_render_hook, JsonLinesHook
+    add_render_hook(JsonLinesHook('render_timings.jsonl'))
+
+profile_call() wraps one call in cProfile and tracemalloc for the
+--profile CLI flag.
+"""
+
+from datetime import datetime, timezone
+import cProfile
+import io
+import json
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger('mbrace.render')
+
+
+# ============================================================================
+# STAGE TIMERS
+# ============================================================================
+class RenderTimer:
+    """
+    Lap timer for one render. Each lap(stage) closes the stage that began at
+    the previous lap; time_calls() adds a nested stage around a method.
+    """
+    enabled = True
+
+    def __init__(self):
+        self.seconds = {}
+        self.allocated_blocks = {}
+        self._started = self._last = time.perf_counter()
+        self._blocks = sys.getallocatedblocks()
+
+    def _add(self, stage, seconds, blocks):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.allocated_blocks[stage] = self.allocated_blocks.get(stage, 0) + blocks
+
+    def lap(self, stage):
+        now, blocks = time.perf_counter(), sys.getallocatedblocks()
+        self._add(stage, now - self._last, blocks - self._blocks)
+        self._last, self._blocks = now, blocks
+
+    def time_calls(self, obj, method, stage):
+        """Count every call of obj.method toward stage (on this instance only)."""
+        original = getattr(obj, method)
+
+        def timed(*args, **kwargs):
+            start, blocks = time.perf_counter(), sys.getallocatedblocks()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self._add(stage, time.perf_counter() - start, sys.getallocatedblocks() - blocks)
+
+        setattr(obj, method, timed)
+
+    def record(self, **info):
+        """The hook payload: stage milliseconds, allocation deltas and caller info."""
+        return dict(
+            info,
+            at=datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            total_ms=round((self._last - self._started) * 1000, 3),
+            stages_ms={stage: round(s * 1000, 3) for stage, s in self.seconds.items()},
+            allocated_blocks=dict(self.allocated_blocks),
+        )
+
+
+class _NullTimer:
+    """Stand-in used when no hooks are registered; every call is a no-op."""
+    enabled = False
+
+    def lap(self, stage):
+        pass
+
+    def time_calls(self, obj, method, stage):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+# ============================================================================
+# HOOK REGISTRY
+# ============================================================================
+_hooks = []
+_hooks_lock = threading.Lock()
+
+
+def add_render_hook(hook):
+    """Register a callable that receives one timing record per render."""
+    with _hooks_lock:
+        _hooks.append(hook)
+    return hook
+
+
+def remove_render_hook(hook):
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def start_timer():
+    """A RenderTimer if anyone is listening, otherwise NULL_TIMER."""
+    return RenderTimer() if _hooks else NULL_TIMER
+
+
+def emit(timer, **info):
+    """Send a finished timer's record to every hook. Hook failures are logged, not raised."""
+    if not timer.enabled:
+        return
+    record = timer.record(**info)
+    for hook in list(_hooks):
+        try:
+            hook(record)
+        except Exception:
+            logger.exception('render hook %r failed', hook)
+
+
+# ============================================================================
+# HOOKS
+# ============================================================================
+class LoggingHook:
+    """Log one line per render."""
+
+    def __init__(self, log=None, level=logging.INFO):
+        self.log = log or logger
+        self.level = level
+
+    def __call__(self, record):
+        stages = ' '.join(f"{stage}={ms:.1f}ms" for stage, ms in record['stages_ms'].items())
+        self.log.log(self.level, 'render %s total=%.1fms %s', record.get('output', ''),
+                     record['total_ms'], stages)
+
+
+class JsonLinesHook:
+    """Append each record as one JSON line to path."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+class PrometheusHook:
+    """Accumulate per-stage summaries; render() returns Prometheus text exposition."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.total_seconds = 0.0
+        self.stage_seconds = {}
+        self.stage_blocks = {}
+
+    def __call__(self, record):
+        with self._lock:
+            self.renders += 1
+            self.total_seconds += record['total_ms'] / 1000
+            for stage, ms in record['stages_ms'].items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + ms / 1000
+            for stage, blocks in record['allocated_blocks'].items():
+                self.stage_blocks[stage] = self.stage_blocks.get(stage, 0) + blocks
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP mbrace_report_render_seconds Wall time per report render.',
+                '# TYPE mbrace_report_render_seconds summary',
+                f'mbrace_report_render_seconds_sum {self.total_seconds:.6f}',
+                f'mbrace_report_render_seconds_count {self.renders}',
+                '# HELP mbrace_report_stage_seconds Wall time per render stage.',
+                '# TYPE mbrace_report_stage_seconds summary',
+            ]
+            for stage, seconds in self.stage_seconds.items():
+                lines.append(f'mbrace_report_stage_seconds_sum{{stage="{stage}"}} {seconds:.6f}')
+                lines.append(f'mbrace_report_stage_seconds_count{{stage="{stage}"}} {self.renders}')
+            lines += [
+                '# HELP mbrace_report_stage_allocated_blocks Net change in allocated memory blocks per stage, summed.',
+                '# TYPE mbrace_report_stage_allocated_blocks gauge',
+            ]
+            for stage, blocks in self.stage_blocks.items():
+                lines.append(f'mbrace_report_stage_allocated_blocks{{stage="{stage}"}} {blocks}')
+        return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# PROFILING
+# ============================================================================
+def profile_call(fn, *args, top=25, **kwargs):
+    """
+    Run fn under cProfile and tracemalloc.
+
+    Returns:
+        tuple: (fn's result, text summary with the top functions by cumulative
+        time and the top allocation sites by size)
+    """
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(fn, *args, **kwargs)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    out = io.StringIO()
+    out.write(f"== cProfile: top {top} by cumulative time ==\n")
+    pstats.Stats(profiler, stream=out).strip_dirs().sort_stats('cumulative').print_stats(top)
+    out.write(f"== tracemalloc: peak {peak / 1024:.1f} KiB, still allocated {current / 1024:.1f} KiB ==\n")
+    for stat in snapshot.statistics('lineno')[:top]:
+        out.write(f"{stat}\n")
+    return result, out.getvalue()
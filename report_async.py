@@ -0,0 +1,250 @@
+"""
+MBRACE Intelligence - Async Report Rendering
+============================================
+
+asyncio front end for the renderer, for intake code that runs on an event
+loop (webhook handlers, Firebase listeners). doc.build is CPU-bound, so
+renders run on a process pool (warm styles, see _init_render_worker) and
+the event loop only awaits the result.
+
+Concurrency is bounded in two places:
+    max_concurrency  renders handed to the executor at once
+    max_pending      callers allowed to wait behind them; further callers
+                     block (backpressure) or, with block=False, get QueueFull
+
+Each render takes an optional timeout, which covers time spent waiting for a
+slot as well as the render itself. On timeout or cancellation a render that
+has not started is dropped; one already running in a worker finishes there
+and its result is discarded. The limits are kept per event loop, so one
+renderer can serve successive asyncio.run() calls.
+
+Usage:
+    from report_async import render_report_async, AsyncReportRenderer
+
+    pdf_bytes = await render_report_async(data, timeout=30)
+
+    async with AsyncReportRenderer(workers=4) as renderer:
+        async for entry in renderer.render_many(submissions, out_dir='reports'):
+            print(entry)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import os
+import weakref
+
+import generate_incentive_report as reports
+from submission import Submission, SubmissionError
+
+
+async def _aiterate(items):
+    """Iterate a sync or async iterable asynchronously."""
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class AsyncReportRenderer:
+    """
+    Args:
+        workers: render processes when no executor is given (default: CPU count)
+        max_concurrency: renders running at once (default: workers)
+        max_pending: callers that may wait for a render slot before
+            backpressure applies (default: 2x max_concurrency)
+        timeout: default per-report timeout in seconds (None waits forever)
+        executor: optional concurrent.futures executor to render on instead
+            of a private process pool (it is not shut down by close())
+    """
+
+    def __init__(self, workers=None, max_concurrency=None, max_pending=None, timeout=None,
+                 executor=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.workers
+        self.max_pending = self.max_concurrency * 2 if max_pending is None else max_pending
+        self.timeout = timeout
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._limits = weakref.WeakKeyDictionary()
+        self.stats = {'ok': 0, 'error': 0, 'timeout': 0, 'cancelled': 0, 'rejected': 0}
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=reports._init_render_worker)
+        return self._executor
+
+    def _loop_limits(self):
+        """(admission, running) semaphores for the running event loop (asyncio primitives are per loop)."""
+        loop = asyncio.get_running_loop()
+        limits = self._limits.get(loop)
+        if limits is None:
+            limits = self._limits[loop] = (asyncio.Semaphore(self.max_concurrency + self.max_pending),
+                                           asyncio.Semaphore(self.max_concurrency))
+        return limits
+
+    async def render(self, data, output_path=None, timeout=None, block=True):
+        """
+        Render one report without blocking the event loop.
+
+        Args:
+            data: submission dict
+            output_path: optional PDF path; without it the PDF bytes are returned
+            timeout: seconds to wait for this report, including time queued
+                for a slot (defaults to self.timeout)
+            block: when every slot is taken, wait (True) or raise
+                asyncio.QueueFull immediately (False)
+
+        Returns:
+            bytes or str: PDF bytes, or output_path when one was given
+        """
+        result, _ = await self._render_timed(data, output_path, timeout, block)
+        return result
+
+    async def _render_timed(self, data, output_path, timeout, block):
+        admission, running = self._loop_limits()
+        if not block and admission.locked():
+            self.stats['rejected'] += 1
+            raise asyncio.QueueFull('render queue is full')
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+
+        async def queue_and_render():
+            async with admission:
+                async with running:
+                    if output_path is None:
+                        return await loop.run_in_executor(self.executor, reports._render_bytes_in_worker, data)
+                    return await loop.run_in_executor(self.executor, reports._render_in_worker, data,
+                                                      output_path)
+        try:
+            result = await asyncio.wait_for(queue_and_render(), timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeout'] += 1
+            raise
+        except asyncio.CancelledError:
+            self.stats['cancelled'] += 1
+            raise
+        except Exception:
+            self.stats['error'] += 1
+            raise
+        self.stats['ok'] += 1
+        return result
+
+    async def _render_entry(self, index, data, out_dir, timeout):
+        """Render one record into a manifest entry like generate_reports() yields."""
+        entry = {'index': index}
+        if isinstance(data, Exception):
+            return reports._error_entry(entry, data)
+        try:
+            data = Submission.from_dict(data)
+        except SubmissionError as e:
+            return reports._error_entry(entry, e)
+        output_path = os.path.join(out_dir, f"incentive_scan_{index:06d}.pdf") if out_dir else None
+        try:
+            result, entry['seconds'] = await self._render_timed(data, output_path, timeout, True)
+        except asyncio.TimeoutError:
+            return reports._error_entry(entry, TimeoutError(f"render exceeded {timeout or self.timeout}s"))
+        except Exception as e:
+            return reports._error_entry(entry, e)
+        entry['output' if out_dir else 'pdf'] = result
+        entry['status'] = 'ok'
+        return entry
+
+    async def render_many(self, submissions, out_dir=None, ordered=True, timeout=None):
+        """
+        Stream entries for many submissions (a sync or async iterable).
+
+        At most max_concurrency + max_pending renders are outstanding or
+        finished but not yet yielded, so the source is only read as fast as
+        reports finish and a slow report holds back a bounded number of
+        results. Entries carry 'output' (a path under out_dir) or 'pdf'
+        (bytes), or an 'error'. With ordered=True they are yielded in input
+        order.
+
+        Yields:
+            dict: entry with index, status, seconds and output/pdf or error
+        """
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        window = self.max_concurrency + self.max_pending
+        pending = set()
+        finished = {}
+        next_index = 1
+
+        def deliver():
+            nonlocal next_index
+            if not ordered:
+                entries = list(finished.values())
+                finished.clear()
+                return entries
+            entries = []
+            while next_index in finished:
+                entries.append(finished.pop(next_index))
+                next_index += 1
+            return entries
+
+        async def collect(return_when):
+            nonlocal pending
+            done, pending = await asyncio.wait(pending, return_when=return_when)
+            for task in done:
+                entry = task.result()
+                finished[entry['index']] = entry
+
+        try:
+            index = 0
+            async for data in _aiterate(submissions):
+                index += 1
+                pending.add(asyncio.ensure_future(self._render_entry(index, data, out_dir, timeout)))
+                # Results held for ordering count against the window too
+                while len(pending) + len(finished) >= window:
+                    await collect(asyncio.FIRST_COMPLETED)
+                    for entry in deliver():
+                        yield entry
+                for entry in deliver():
+                    yield entry
+            while pending:
+                await collect(asyncio.FIRST_COMPLETED)
+                for entry in deliver():
+                    yield entry
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        """Shut down the private process pool (renders already running finish first)."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def aclose(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+_default_renderer = None
+
+
+def get_default_renderer():
+    """The shared renderer behind render_report_async (CPU-count workers)."""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = AsyncReportRenderer()
+    return _default_renderer
+
+
+async def render_report_async(data, output_path=None, timeout=None):
+    """
+    Async counterpart of render_report_bytes / generate_report.
+
+    Returns the PDF bytes, or output_path when one is given. Raises
+    asyncio.TimeoutError if the report takes longer than timeout seconds.
+    """
+    return await get_default_renderer().render(data, output_path, timeout)
@@ -0,0 +1,423 @@
+"""
+MBRACE Intelligence - Report Benchmarks
+=======================================
+
+Benchmark suite for the scoring and rendering hot paths. Every mode renders
+the same seeded synthetic lead mix and reports latency percentiles,
+throughput, peak RSS and PDF sizes. Results are written as JSON (and
+appended to a JSONL history) so runs can be compared over time.
+
+Run with:
+    python generate_incentive_report.py bench --count 500 --output bench.json
+    python -m report_bench scalar batch parallel --workers 4
+    python -m report_bench --compare bench_before.json --output bench_after.json
+
+Modes:
+    scoring    calculate_incentives (cached and uncached) and bulk scoring
+    scalar     generate_report per lead, as a one-off caller would (fresh styles, disk write)
+    batch      generate_reports in one process (shared styles, template cache)
+    parallel   generate_reports on a process pool (--workers)
+    templates  full layout vs. cached-template fast path, with output check
+    profiles   standard vs. lean output profile: bytes and render time per report
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import reportlab
+from reportlab import rl_config
+
+import generate_incentive_report as reports
+from incentive_rules import get_rules
+
+MODES = ('scoring', 'scalar', 'batch', 'parallel', 'templates', 'profiles')
+
+
+# ============================================================================
+# SYNTHETIC SUBMISSIONS
+# ============================================================================
+# Rough lead mix from the calculator funnel: mostly homeowners, then nonprofits
+BUILDING_TYPE_WEIGHTS = {'single_family': 55, '2-4_unit': 15, '5+_multifamily': 15, 'nonprofit': 15}
+UTILITY_WEIGHTS = {'BGE': 40, 'Pepco': 30, 'Potomac Edison': 12, 'SMECO': 10, 'Other': 8}
+INCOME_WEIGHTS = {'under_80_ami': 40, '80_150_ami': 35, 'over_150_ami': 25}
+HEATING_WEIGHTS = {'gas': 45, 'oil': 15, 'propane': 10, 'electric_resistance': 20, 'existing_heat_pump': 10}
+AGE_WEIGHTS = {'<10': 20, '10-15': 30, '15-20': 30, '20+': 20}
+
+STREETS = ['Main St', 'Charles St', 'Greenmount Ave', 'Harford Rd', 'Georgia Ave', 'Rockville Pike']
+CITIES = ['Baltimore, MD 21201', 'Silver Spring, MD 20910', 'Annapolis, MD 21401', 'Frederick, MD 21701']
+
+
+def _pick(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def synthetic_submissions(count, seed=0):
+    """A reproducible, realistically weighted mix of calculator submissions."""
+    rng = random.Random(seed)
+    submissions = []
+    for i in range(count):
+        building_type = _pick(rng, BUILDING_TYPE_WEIGHTS)
+        data = {
+            'address': f"{rng.randint(100, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+            'building_type': building_type,
+            'utility': _pick(rng, UTILITY_WEIGHTS),
+            'heating_system': _pick(rng, HEATING_WEIGHTS),
+            'system_age': _pick(rng, AGE_WEIGHTS),
+            'income_level': _pick(rng, INCOME_WEIGHTS),
+            'phone': f"+1410555{i % 10000:04d}",
+            'email': f"lead{i}@example.org",
+        }
+        if building_type == 'nonprofit':
+            data['org_name'] = f"Community Organization {i}"
+        submissions.append(data)
+    return submissions
+
+
+# ============================================================================
+# MEASUREMENT HELPERS
+# ============================================================================
+def latency_stats(seconds):
+    """Percentiles in milliseconds for a list of per-item durations in seconds."""
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(percentile(50) * 1000, 3),
+        'p90_ms': round(percentile(90) * 1000, 3),
+        'p99_ms': round(percentile(99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def size_stats(sizes):
+    if not sizes:
+        return {}
+    return {
+        'mean_pdf_bytes': round(statistics.fmean(sizes)),
+        'median_pdf_bytes': statistics.median(sizes),
+        'max_pdf_bytes': max(sizes),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its largest finished child."""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return {'peak_rss_mb': round(own, 1), 'peak_child_rss_mb': round(children, 1)}
+
+
+def _throughput(count, elapsed):
+    return round(count / elapsed, 2) if elapsed > 0 else 0
+
+
+# ============================================================================
+# BENCHMARK MODES
+# ============================================================================
+def bench_scoring(count=500, seed=0):
+    """calculate_incentives latency (memoized vs. uncached evaluate) and bulk rows/s."""
+    submissions = synthetic_submissions(count, seed)
+    rules = get_rules()
+
+    uncached = []
+    for data in submissions:
+        start = time.perf_counter()
+        rules.evaluate(*rules.submission_key(data))
+        uncached.append(time.perf_counter() - start)
+
+    rules.precompute()
+    cached = []
+    for data in submissions:
+        start = time.perf_counter()
+        reports.calculate_incentives(data)
+        cached.append(time.perf_counter() - start)
+
+    columns = {field: [data[field] for data in submissions] for field in
+               ('utility', 'income_level', 'building_type', 'heating_system', 'system_age')}
+    reports.calculate_incentives_bulk({field: values[:1] for field, values in columns.items()})  # warm-up
+    start = time.perf_counter()
+    reports.calculate_incentives_bulk(columns)
+    bulk_seconds = time.perf_counter() - start
+
+    info = rules.cache_info()
+    return {
+        'mode': 'scoring',
+        'submissions': count,
+        'uncached': dict(latency_stats(uncached), per_second=_throughput(count, sum(uncached))),
+        'cached': dict(latency_stats(cached), per_second=_throughput(count, sum(cached))),
+        'cache': {'hits': info.hits, 'misses': info.misses},
+        'bulk': {'seconds': round(bulk_seconds, 4), 'rows_per_second': _throughput(count, bulk_seconds)},
+    }
+
+
+def bench_scalar(count=200, seed=0):
+    """
+    generate_report once per lead, writing to disk, with a fresh stylesheet
+    built for every call: the cost a one-off caller paid before styles were
+    shared (batch measures the shared default_styles() path).
+    """
+    submissions = synthetic_submissions(count, seed)
+    latencies, sizes = [], []
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        for i, data in enumerate(submissions):
+            path = os.path.join(out_dir, f"report_{i}.pdf")
+            began = time.perf_counter()
+            reports.generate_report(data, path, reports.get_custom_styles(), reports.get_table_styles())
+            latencies.append(time.perf_counter() - began)
+            sizes.append(os.path.getsize(path))
+        elapsed = time.perf_counter() - start
+    return dict({'mode': 'scalar', 'submissions': count, 'elapsed_seconds': round(elapsed, 3),
+                 'reports_per_second': _throughput(count, elapsed)},
+                **latency_stats(latencies), **size_stats(sizes))
+
+
+def _bench_generate_reports(mode, count, seed, workers):
+    submissions = synthetic_submissions(count, seed)
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        entries = list(reports.generate_reports(submissions, out_dir, workers=workers))
+        elapsed = time.perf_counter() - start
+        sizes = [os.path.getsize(e['output']) for e in entries if e['status'] == 'ok']
+    latencies = [e['seconds'] for e in entries if e['status'] == 'ok']
+    return dict({'mode': mode, 'submissions': count, 'workers': workers,
+                 'failed': sum(1 for e in entries if e['status'] != 'ok'),
+                 'elapsed_seconds': round(elapsed, 3),
+                 'reports_per_second': _throughput(len(latencies), elapsed)},
+                **latency_stats(latencies), **size_stats(sizes))
+
+
+def bench_batch(count=200, seed=0):
+    """generate_reports in a single process."""
+    return _bench_generate_reports('batch', count, seed, workers=1)
+
+
+def bench_parallel(count=200, seed=0, workers=None):
+    """generate_reports sharded over a process pool."""
+    return _bench_generate_reports('parallel', count, seed, workers=workers or os.cpu_count() or 1)
+
+
+# ============================================================================
+# TEMPLATE CACHE BENCHMARK
+# ============================================================================
+def _render_all(submissions, styles, table_styles, use_template_cache):
+    outputs = []
+    start = time.perf_counter()
+    for data in submissions:
+        buffer = BytesIO()
+        reports.generate_report(data, buffer, styles, table_styles, use_template_cache=use_template_cache)
+        outputs.append(buffer.getvalue())
+    return time.perf_counter() - start, outputs
+
+
+def bench_template_cache(count=200, seed=0, repeat=3):
+    """
+    Compare full story layout against the cached-template fast path.
+
+    Both paths render the same submissions with a shared stylesheet; the best
+    of `repeat` runs is reported, and the PDFs are checked to be byte-identical.
+    """
+    submissions = synthetic_submissions(count, seed)
+    styles = reports.get_custom_styles()
+    table_styles = reports.get_table_styles()
+    previous_invariant = rl_config.invariant
+    rl_config.invariant = 1  # stable PDF ids/dates so outputs can be compared
+    try:
+        _render_all(submissions[:10], styles, table_styles, True)  # warm imports and caches
+        full = [_render_all(submissions, styles, table_styles, False) for _ in range(repeat)]
+        cached = [_render_all(submissions, styles, table_styles, True) for _ in range(repeat)]
+    finally:
+        rl_config.invariant = previous_invariant
+
+    full_best = min(seconds for seconds, _ in full)
+    cached_best = min(seconds for seconds, _ in cached)
+    return {
+        'mode': 'templates',
+        'submissions': count,
+        'repeat': repeat,
+        'full_ms_per_report': round(full_best / count * 1000, 3),
+        'cached_ms_per_report': round(cached_best / count * 1000, 3),
+        'full_runs_seconds': [round(seconds, 4) for seconds, _ in full],
+        'cached_runs_seconds': [round(seconds, 4) for seconds, _ in cached],
+        'speedup': round(full_best / cached_best, 2),
+        'identical_output': full[0][1] == cached[0][1],
+        'median_pdf_bytes': statistics.median(len(pdf) for pdf in cached[0][1]),
+    }
+
+
+# ============================================================================
+# OUTPUT PROFILE BENCHMARK
+# ============================================================================
+def _render_profile(submissions, profile):
+    outputs = []
+    start = time.perf_counter()
+    for data in submissions:
+        outputs.append(reports.render_report_bytes(data, output_profile=profile))
+    return time.perf_counter() - start, outputs
+
+
+def bench_output_profiles(count=200, seed=0, repeat=3):
+    """
+    Compare the standard and lean output profiles on the same submissions:
+    bytes per report and render time (best of `repeat` runs).
+    """
+    submissions = synthetic_submissions(count, seed)
+    result = {'mode': 'profiles', 'submissions': count, 'repeat': repeat}
+    for profile in ('standard', 'lean'):
+        _render_profile(submissions[:10], profile)  # warm imports, styles and caches
+        runs = [_render_profile(submissions, profile) for _ in range(repeat)]
+        best = min(seconds for seconds, _ in runs)
+        sizes = [len(pdf) for pdf in runs[0][1]]
+        result[profile] = dict({'ms_per_report': round(best / count * 1000, 3),
+                                'runs_seconds': [round(seconds, 4) for seconds, _ in runs]},
+                               **size_stats(sizes))
+    standard, lean = result['standard'], result['lean']
+    result['bytes_saved_percent'] = round((1 - lean['mean_pdf_bytes'] / standard['mean_pdf_bytes']) * 100, 1)
+    result['time_saved_percent'] = round((1 - lean['ms_per_report'] / standard['ms_per_report']) * 100, 1)
+    return result
+
+
+# ============================================================================
+# SUITE
+# ============================================================================
+def run_mode(mode, count=200, seed=0, workers=None, repeat=3):
+    """Run one benchmark mode in the current process and attach its peak RSS."""
+    if mode == 'scoring':
+        result = bench_scoring(count, seed)
+    elif mode == 'scalar':
+        result = bench_scalar(count, seed)
+    elif mode == 'batch':
+        result = bench_batch(count, seed)
+    elif mode == 'parallel':
+        result = bench_parallel(count, seed, workers)
+    elif mode == 'templates':
+        result = bench_template_cache(count, seed, repeat)
+    elif mode == 'profiles':
+        result = bench_output_profiles(count, seed, repeat)
+    else:
+        raise ValueError(f"unknown benchmark mode {mode!r} (choose from {', '.join(MODES)})")
+    result.update(peak_rss_mb())
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(modes=MODES, count=200, seed=0, workers=None, repeat=3, isolate=True):
+    """
+    Run several modes and return a machine-readable result document.
+
+    With isolate=True each mode runs in a fresh interpreter, so peak RSS and
+    warm caches from one mode don't leak into the next.
+    """
+    results = []
+    for mode in modes:
+        if isolate:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results.append(pool.submit(run_mode, mode, count, seed, workers, repeat).result())
+        else:
+            results.append(run_mode(mode, count, seed, workers, repeat))
+
+    rules = get_rules()
+    return {
+        'run_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'reportlab': reportlab.Version,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'rules_version': rules.version,
+        'template_version': reports.TEMPLATE_VERSION,
+        'params': {'count': count, 'seed': seed, 'workers': workers, 'repeat': repeat, 'isolated': isolate},
+        'results': results,
+    }
+
+
+# Metrics compared between runs, and whether higher is better
+COMPARED_METRICS = {
+    'p50_ms': False, 'p99_ms': False, 'reports_per_second': True, 'speedup': True,
+    'cached_ms_per_report': False, 'peak_rss_mb': False, 'mean_pdf_bytes': False,
+    'bytes_saved_percent': True,
+}
+
+
+def compare_runs(before, after):
+    """Per-mode percentage changes for COMPARED_METRICS between two suite results."""
+    previous = {r['mode']: r for r in before.get('results', [])}
+    rows = []
+    for result in after.get('results', []):
+        old = previous.get(result['mode'])
+        if not old:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric in result and old.get(metric):
+                change = (result[metric] - old[metric]) / old[metric] * 100
+                improved = change > 0 if higher_is_better else change < 0
+                rows.append({'mode': result['mode'], 'metric': metric, 'before': old[metric],
+                             'after': result[metric], 'change_percent': round(change, 1),
+                             'improved': improved})
+    return rows
+
+
+# ============================================================================
+# CLI INTERFACE
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='report_bench', description='Benchmark MBRACE report generation')
+    parser.add_argument('modes', nargs='*', metavar='mode',
+                        help=f"Benchmark modes to run: {', '.join(MODES)} or all (default: all)")
+    parser.add_argument('--count', type=int, default=200, help='Synthetic submissions per mode')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic submission mix')
+    parser.add_argument('--workers', type=int, default=None, help='Pool size for parallel mode (default: CPU count)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per variant in templates and profiles modes (best is reported)')
+    parser.add_argument('--output', type=str, default=None, help='Write the result JSON here')
+    parser.add_argument('--history', type=str, default=None, help='Append the result as one line to this JSONL file')
+    parser.add_argument('--compare', type=str, default=None, help='Earlier result JSON to compare against')
+    parser.add_argument('--no-isolate', action='store_true', help='Run all modes in this process')
+    args = parser.parse_args(argv)
+    unknown = set(args.modes) - set(MODES) - {'all'}
+    if unknown:
+        parser.error(f"unknown mode(s) {', '.join(sorted(unknown))} (choose from {', '.join(MODES)}, all)")
+
+    modes = MODES if not args.modes or 'all' in args.modes else tuple(dict.fromkeys(args.modes))
+    suite = run_suite(modes, args.count, args.seed, args.workers, args.repeat, isolate=not args.no_isolate)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(suite, f, indent=2)
+    if args.history:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(suite) + '\n')
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            suite['comparison'] = compare_runs(json.load(f), suite)
+    print(json.dumps(suite, indent=2))
+
+
+if __name__ == "__main__":
+    main()
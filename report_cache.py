@@ -0,0 +1,184 @@
+"""
+MBRACE Intelligence - Rendered Report Cache
+===========================================
+
+Content-addressed on-disk store for rendered PDFs. Each report is named by
+the hash of its normalized submission plus the rules/template versions
+(see generate_incentive_report.report_key), so concurrent renders never
+collide and identical resubmissions are served without re-rendering.
+
+Files are written to a temporary name and atomically renamed into place,
+with the permissions the process umask gives any new file (so a web server
+or n8n running as another account can read them).
+Eviction drops entries older than max_age and then the least recently
+used entries until the directory fits in max_bytes.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+
+def _umask_file_mode():
+    # os.umask can only be read by setting it; done once, at import
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# mkstemp creates files as 0600; cached reports get the usual new-file mode
+FILE_MODE = _umask_file_mode()
+
+
+class ReportCache:
+    """
+    Args:
+        directory: where cached PDFs live
+        max_bytes: optional size bound for the directory's cached reports
+        max_age: optional age bound in seconds (since the report was rendered)
+        evict_interval: minimum seconds between automatic evictions after put()
+    """
+
+    PREFIX = 'incentive_scan_'
+    SUFFIX = '.pdf'
+
+    def __init__(self, directory='reports', max_bytes=None, max_age=None, evict_interval=60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_interval = evict_interval
+        self.hits = 0
+        self.misses = 0
+        self._last_evict = 0.0
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{self.PREFIX}{key}{self.SUFFIX}")
+
+    def get(self, key):
+        """Path of a cached report for key, or None if absent or expired."""
+        path = self.path_for(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        now = time.time()
+        if self.max_age is not None and now - stat.st_mtime > self.max_age:
+            self._remove(path)
+            self.misses += 1
+            return None
+        # atime tracks last use for LRU eviction; mtime stays the render time
+        try:
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:  # evicted by another thread or process since the stat
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, render):
+        """
+        Render a report into the cache.
+
+        Args:
+            key: content key from report_key()
+            render: callable taking a temporary output path and writing the PDF
+
+        Returns:
+            str: final path of the cached report
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.rendering_', suffix=self.SUFFIX, dir=self.directory)
+        os.close(fd)
+        try:
+            render(tmp_path)
+            os.chmod(tmp_path, FILE_MODE)
+            path = self.path_for(key)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.maybe_evict()
+        return path
+
+    def put_bytes(self, key, pdf):
+        """Store an already rendered PDF (bytes) under key. Returns its path."""
+        def write(target):
+            with open(target, 'wb') as f:
+                f.write(pdf)
+        return self.put(key, write)
+
+    def get_or_render(self, key, render):
+        return self.get(key) or self.put(key, render)
+
+    # ------------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------------
+    def entries(self):
+        """(path, size, last_used, rendered_at) for every cached report."""
+        try:
+            scan = os.scandir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        with scan:
+            for entry in scan:
+                if not (entry.name.startswith(self.PREFIX) and entry.name.endswith(self.SUFFIX)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # evicted or replaced by another worker since the scan
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_atime, stat.st_mtime))
+        return entries
+
+    def maybe_evict(self):
+        """Evict if bounds are configured and evict_interval has passed."""
+        if self.max_bytes is None and self.max_age is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            if now - self._last_evict < self.evict_interval:
+                return 0
+            self._last_evict = now
+        return self.evict()
+
+    def evict(self):
+        """Apply the age and size bounds now. Returns the number of files removed."""
+        now = time.time()
+        removed = 0
+        live = []
+        for path, size, last_used, rendered_at in self.entries():
+            if self.max_age is not None and now - rendered_at > self.max_age:
+                removed += self._remove(path)
+            else:
+                live.append((last_used, size, path))
+
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in live)
+            for last_used, size, path in sorted(live):
+                if total <= self.max_bytes:
+                    break
+                removed += self._remove(path)
+                total -= size
+        return removed
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            'directory': self.directory,
+            'reports': len(entries),
+            'bytes': sum(size for _, size, _, _ in entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,884 @@
+"""
+MBRACE Intelligence - Report Layout
+===================================
+
+Everything that needs reportlab: brand colors, paragraph and table styles,
+static report copy, the template cache and the story builder for one report.
+
+generate_incentive_report imports this module on the first render, so
+scoring-only callers (the n8n "Calculate Incentives" step, serverless
+functions) never pay for loading the PDF stack.
+"""
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, 
+    PageBreak, Image, HRFlowable, Flowable
+)
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFBase85Encode, PDFStream, PDFZCompress
+from reportlab.pdfgen.canvas import Canvas
+from reportlab import rl_config
+from io import BytesIO
+from xml.sax.saxutils import escape
+import copy
+import os
+import sys
+import threading
+import types
+import weakref
+
+from incentive_rules import get_rules
+from render_metrics import NULL_TIMER
+from submission import normalize_value
+
+
+# ============================================================================
+# COLOR SCHEME (MBRACE Brand)
+# ============================================================================
+COLORS = {
+    'primary': colors.HexColor('#1a365d'),      # Dark blue
+    'secondary': colors.HexColor('#2c5282'),    # Medium blue
+    'accent': colors.HexColor('#ed8936'),       # Orange
+    'success': colors.HexColor('#38a169'),      # Green
+    'warning': colors.HexColor('#d69e2e'),      # Yellow
+    'text': colors.HexColor('#2d3748'),         # Dark gray
+    'light_gray': colors.HexColor('#e2e8f0'),   # Light gray
+    'white': colors.white
+}
+
+
+# ============================================================================
+# CUSTOM STYLES
+# ============================================================================
+def get_custom_styles():
+    styles = getSampleStyleSheet()
+    
+    styles.add(ParagraphStyle(
+        name='ReportTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=COLORS['primary'],
+        spaceAfter=20,
+        alignment=TA_CENTER
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=COLORS['primary'],
+        spaceBefore=20,
+        spaceAfter=10,
+        borderPadding=5,
+        backColor=COLORS['light_gray']
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='SubHeader',
+        parent=styles['Heading3'],
+        fontSize=12,
+        textColor=COLORS['secondary'],
+        spaceBefore=15,
+        spaceAfter=8
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='MBRACEBody',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=COLORS['text'],
+        spaceBefore=6,
+        spaceAfter=6,
+        leading=14
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='Highlight',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=COLORS['primary'],
+        backColor=COLORS['light_gray'],
+        borderPadding=10,
+        spaceBefore=10,
+        spaceAfter=10
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='BigNumber',
+        parent=styles['Normal'],
+        fontSize=28,
+        textColor=COLORS['success'],
+        alignment=TA_CENTER,
+        spaceBefore=10,
+        spaceAfter=10
+    ))
+    
+    styles.add(ParagraphStyle(
+        name='Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.gray,
+        alignment=TA_CENTER
+    ))
+    
+    return styles
+
+
+def get_table_styles():
+    """
+    Build the TableStyles used by the report tables.
+    TableStyle objects are read-only once built, so batch runs share one set.
+    """
+    return {
+        'program': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), COLORS['white']),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('BACKGROUND', (0, 1), (-1, -1), COLORS['light_gray']),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [COLORS['white'], COLORS['light_gray']]),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.gray),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]),
+        'financial': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLORS['secondary']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), COLORS['white']),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.gray),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [COLORS['white'], COLORS['light_gray']]),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ]),
+        # Compact listing for portfolio reports (see portfolio_report.py)
+        'property': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), COLORS['white']),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('ALIGN', (3, 1), (4, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [COLORS['white'], COLORS['light_gray']]),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.gray),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]),
+        # What-if scenario table (see scenario_sweep.py): money columns right-aligned
+        'comparison': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
+            ('TEXTCOLOR', (0, 0), (-1, 0), COLORS['white']),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('ALIGN', (6, 1), (8, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [COLORS['white'], COLORS['light_gray']]),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.gray),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ]),
+    }
+
+
+def urgency_style(styles, urgency_level):
+    """The status box style for an urgency level (orange/yellow/green)."""
+    urgency_colors = {
+        'HIGH': COLORS['accent'],
+        'MODERATE': COLORS['warning'],
+        'OPPORTUNITY': COLORS['success']
+    }
+    
+    return ParagraphStyle(
+        name='UrgencyBox',
+        parent=styles['Highlight'],
+        backColor=urgency_colors.get(urgency_level, COLORS['light_gray']),
+        textColor=COLORS['white'] if urgency_level == 'HIGH' else COLORS['text']
+    )
+
+
+# ============================================================================
+# RESOURCE REGISTRY
+# ============================================================================
+def _deep_sizeof(obj, seen):
+    """Approximate bytes held by obj and everything it references (each object counted once)."""
+    if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType,
+                                           types.BuiltinFunctionType, types.MethodType)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += _deep_sizeof(vars(obj), seen)
+    return size
+
+
+def _decode_image(path):
+    reader = ImageReader(path)
+    reader.getRGBData()  # decode now, so renders only ever read the pixels
+    return reader
+
+
+class ResourceRegistry:
+    """
+    Process-wide render resources (stylesheets, table styles, urgency
+    styles, decoded images), each built once on first use and then shared
+    read-only by every render and thread in the process.
+    """
+    
+    def __init__(self):
+        self._resources = {}
+        self._lock = threading.RLock()
+    
+    def get(self, key, factory):
+        """The resource stored under key, calling factory() to build it the first time."""
+        try:
+            return self._resources[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._resources:
+                self._resources[key] = factory()
+            return self._resources[key]
+    
+    def image(self, path, width=None, height=None):
+        """
+        An Image flowable for path. The pixels are decoded once per process;
+        each call returns a new flowable, since reportlab keeps layout state on it.
+        """
+        reader = self.get(('image', os.path.abspath(path)), lambda: _decode_image(path))
+        flowable = Image(path, width, height)
+        if '_img' not in vars(flowable):  # JPEGs are embedded as-is, never decoded
+            flowable._img = reader
+        return flowable
+    
+    def peek(self, key, default=None):
+        """The resource stored under key if it has been built, else default (never builds)."""
+        return self._resources.get(key, default)
+    
+    def clear(self):
+        with self._lock:
+            self._resources.clear()
+    
+    def footprint(self):
+        """
+        Approximate memory held by each resource, in bytes.
+        
+        Returns:
+            dict: resources (key -> bytes) and total_bytes. Objects shared
+            between resources (parent styles, colors) are counted once.
+        """
+        seen = set()
+        with self._lock:
+            items = list(self._resources.items())
+        sizes = {':'.join(map(str, key)) if isinstance(key, tuple) else str(key): _deep_sizeof(resource, seen)
+                 for key, resource in items}
+        return {'resources': sizes, 'total_bytes': sum(sizes.values())}
+
+
+RESOURCES = ResourceRegistry()
+
+
+def default_styles():
+    """
+    The (styles, table_styles) pair used when a caller passes none.
+    
+    Built once per process (see RESOURCES); treat them as read-only (call
+    get_custom_styles() for a stylesheet you can modify).
+    """
+    return RESOURCES.get('styles', lambda: (get_custom_styles(), get_table_styles()))
+
+
+def shared_urgency_style(styles, urgency_level):
+    """urgency_style(), built once per level for the default stylesheet."""
+    if styles is default_styles()[0]:
+        key = ('urgency_style', urgency_level)
+    elif styles is RESOURCES.peek('lean_styles', (None,))[0]:
+        key = ('lean_urgency_style', urgency_level)
+    else:
+        return urgency_style(styles, urgency_level)
+    return RESOURCES.get(key, lambda: urgency_style(styles, urgency_level))
+
+
+# ============================================================================
+# OUTPUT PROFILES
+# ============================================================================
+# standard: reportlab defaults, byte-identical to earlier releases
+# lean: smaller PDFs for email delivery (binary Flate streams, base-14 fonts
+#       only, table style commands without a visible effect removed)
+OUTPUT_PROFILES = ('standard', 'lean')
+
+# Fonts every PDF viewer provides, so they are never embedded
+BASE14_FONTS = frozenset({
+    'Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique', 'Helvetica-BoldOblique',
+    'Times-Roman', 'Times-Bold', 'Times-Italic', 'Times-BoldItalic',
+    'Courier', 'Courier-Bold', 'Courier-Oblique', 'Courier-BoldOblique',
+    'Symbol', 'ZapfDingbats',
+})
+
+# Cell properties a later command on the same cells replaces outright
+_CELL_PROPERTY_OPS = frozenset({
+    'FONTNAME', 'FACE', 'FONTSIZE', 'SIZE', 'LEADING', 'TEXTCOLOR', 'ALIGN', 'ALIGNMENT', 'VALIGN',
+    'LEFTPADDING', 'RIGHTPADDING', 'TOPPADDING', 'BOTTOMPADDING',
+})
+
+# Whole-table commands that only restate the reportlab cell defaults
+_DEFAULT_CELL_COMMANDS = frozenset({
+    ('ALIGN', 'LEFT'), ('ALIGNMENT', 'LEFT'), ('VALIGN', 'BOTTOM'),
+    ('FONTNAME', 'Helvetica'), ('FACE', 'Helvetica'),
+    ('LEFTPADDING', 6), ('RIGHTPADDING', 6), ('TOPPADDING', 3), ('BOTTOMPADDING', 3),
+})
+
+_WHOLE_TABLE = ((0, 0), (-1, -1))
+
+
+def base14_font(name):
+    """name if it is a base-14 font, else the Helvetica face with the same weight and slant."""
+    if name in BASE14_FONTS:
+        return name
+    lowered = name.lower()
+    bold = 'bold' in lowered
+    oblique = 'italic' in lowered or 'oblique' in lowered
+    return 'Helvetica' + ('-' if bold or oblique else '') + ('Bold' if bold else '') + ('Oblique' if oblique else '')
+
+
+def collapse_table_style(style):
+    """
+    A copy of a TableStyle without the commands that cannot change the output:
+
+    - cell properties (font, size, alignment, padding) that a later command
+      sets again for the same cells, or the whole table
+    - whole-table cell properties that restate the reportlab defaults
+    - a BACKGROUND that a later ROWBACKGROUNDS/COLBACKGROUNDS over the same
+      cells paints over completely
+    - exact duplicates
+
+    Fewer commands means less per-cell style resolution on every table
+    layout and fewer fill operations in the page stream.
+    """
+    commands = [tuple(command) for command in style.getCommands()]
+    keep = []
+    for position, command in enumerate(commands):
+        op, cells, values = command[0], command[1:3], command[3:]
+        later = commands[position + 1:]
+        earlier = commands[:position]
+        if command in later:
+            continue
+        if op in _CELL_PROPERTY_OPS and any(
+                other[0] == op and other[1:3] in (cells, _WHOLE_TABLE) for other in later):
+            continue
+        if (cells == _WHOLE_TABLE and (op,) + values in _DEFAULT_CELL_COMMANDS
+                and not any(other[0] in (op, 'FONT') for other in earlier)):
+            continue
+        if op == 'BACKGROUND' and any(
+                other[0] in ('ROWBACKGROUNDS', 'COLBACKGROUNDS') and other[1:3] == cells
+                and other[3] and None not in other[3] for other in later):
+            continue
+        if op in ('FONT', 'FONTNAME', 'FACE'):
+            command = (op,) + cells + (base14_font(values[0]),) + values[1:]
+        keep.append(command)
+    return TableStyle(keep)
+
+
+def get_lean_styles():
+    """
+    get_custom_styles() and get_table_styles() for the lean profile: every
+    font resolved to a base-14 face and every table style collapsed.
+    """
+    styles = get_custom_styles()
+    for style in styles.byName.values():
+        for attribute in ('fontName', 'bulletFontName'):
+            if getattr(style, attribute, None):
+                setattr(style, attribute, base14_font(getattr(style, attribute)))
+    table_styles = {name: collapse_table_style(style) for name, style in get_table_styles().items()}
+    return styles, table_styles
+
+
+def lean_styles():
+    """The (styles, table_styles) pair for the lean profile, built once per process (see RESOURCES)."""
+    return RESOURCES.get('lean_styles', get_lean_styles)
+
+
+def profile_styles(profile):
+    """The shared (styles, table_styles) pair for an output profile."""
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"unknown output profile {profile!r} (choose from {', '.join(OUTPUT_PROFILES)})")
+    return lean_styles() if profile == 'lean' else default_styles()
+
+
+class ProfileCanvas(Canvas):
+    """
+    Canvas every report is built with. Profiles that change how page
+    streams are encoded set use_a85; None keeps rl_config as configured.
+
+    reportlab chooses a compressed page's filters from the global
+    rl_config.useA85 when the document is saved. A canvas whose setting
+    differs attaches its own content stream to each page as it is
+    finished instead, so nothing global changes and renders in other
+    threads are unaffected.
+    """
+    use_a85 = None
+
+    def showPage(self):
+        Canvas.showPage(self)
+        if self.use_a85 is None or not self._pageCompression or bool(self.use_a85) == bool(rl_config.useA85):
+            return
+        # reportlab-internal: PDFPage.check_format keeps a Contents stream set
+        # before save (tests/test_report_layout.py checks the lean output)
+        page = self._doc.Pages.pages[-1]
+        contents = PDFStream(content=page.stream,
+                             filters=[PDFBase85Encode, PDFZCompress] if self.use_a85 else [PDFZCompress])
+        contents.__Comment__ = 'page stream'
+        page.Contents = contents
+
+
+class LeanCanvas(ProfileCanvas):
+    """
+    Lean profile canvas: Flate-compressed page streams written as binary,
+    without the ASCII85 wrapping reportlab adds by default (it grows every
+    compressed stream by a quarter).
+    """
+    use_a85 = False
+
+    def __init__(self, *args, **kwargs):
+        kwargs['pageCompression'] = 1
+        ProfileCanvas.__init__(self, *args, **kwargs)
+
+
+def canvas_for_profile(profile):
+    """The canvasmaker doc.build should use for an output profile."""
+    return LeanCanvas if profile == 'lean' else ProfileCanvas
+
+
+# ============================================================================
+# STATIC REPORT CONTENT
+# ============================================================================
+MANDATE_CONTEXT = """
+    <b>Key Dates:</b><br/>
+    • <b>2025-2026:</b> Maryland Clean Heat Rules begin phasing in<br/>
+    • <b>~2029:</b> ZEHES mandate requires end-of-life fossil systems be replaced with heat pumps<br/>
+    • <b>2030:</b> State target: 95% of HVAC/water heater sales must be heat pumps<br/>
+    • <b>2040s:</b> Near-total replacement of fossil fuel heating systems
+    """
+
+NEXT_STEPS = {
+    'nonprofit': """
+        <b>For Nonprofit Organizations:</b><br/><br/>
+        1. <b>Confirm 501(c)(3) documentation</b> — IRS determination letter required for MEA grants<br/><br/>
+        2. <b>Request program-approved energy assessment</b> — Contact MEA or your utility<br/><br/>
+        3. <b>Apply for ECB/EEE grants</b> — Download current FOA from MEA website<br/><br/>
+        4. <b>Stack utility rebates</b> — Submit EmPOWER pre-approval in parallel<br/><br/>
+        5. <b>Wait for written approval before installation</b> — Critical for incentive capture
+        """,
+    'multifamily': """
+        <b>For Multifamily Property Owners:</b><br/><br/>
+        1. <b>Confirm low-income status documentation</b> — LIHTC, HUD contracts, or tenant income records<br/><br/>
+        2. <b>Identify program lane</b> — EmPOWER low-income track or DHCD/MEEHA for 5+ units<br/><br/>
+        3. <b>Request program-approved energy audit</b> — Contact DHCD or your utility<br/><br/>
+        4. <b>Stack incentives</b> — EmPOWER + IRA HEEHR/HOMES + MEA grants<br/><br/>
+        5. <b>Submit applications with audit report and quotes</b> — Pre-approval before install
+        """,
+    'homeowner': """
+        <b>For Homeowners:</b><br/><br/>
+        1. <b>Verify income eligibility</b> — Under 80% AMI qualifies for maximum rebates<br/><br/>
+        2. <b>Get quotes from electrification-ready contractors</b> — Ask about Manual J calculations<br/><br/>
+        3. <b>Apply for utility rebates</b> — EmPOWER HPwES track for comprehensive upgrades<br/><br/>
+        4. <b>Claim federal tax credit</b> — 25C credit up to $2,000 for qualifying heat pumps<br/><br/>
+        5. <b>Document everything</b> — AHRI certificates, invoices, ENERGY STAR ratings
+        """,
+}
+
+DISCLAIMER = """
+    <b>Disclaimer:</b> This report provides estimates based on current program information and the data 
+    you submitted. Actual incentive amounts depend on final eligibility verification, program availability, 
+    and project specifications. Programs and funding levels may change. MBRACE Intelligence does not 
+    install equipment or provide contracting services. Consult program administrators for final eligibility 
+    determinations.<br/><br/>
+    <b>MBRACE Intelligence</b> | Maryland Electrification Data & Compliance<br/>
+    Questions? Reply to the email or text that delivered this report.
+    """
+
+
+def report_variant(data):
+    """Which next-steps variant a submission gets: nonprofit, multifamily or homeowner."""
+    building_type = normalize_value('building_type', data.get('building_type'))
+    if building_type == 'nonprofit':
+        return 'nonprofit'
+    elif building_type in ['5+_multifamily', '2-4_unit']:
+        return 'multifamily'
+    return 'homeowner'
+
+
+# ============================================================================
+# TEMPLATE CACHE
+# ============================================================================
+class PrewrappedParagraph(Paragraph):
+    """
+    A Paragraph whose line breaks are computed once and shared by its copies.
+    
+    The template cache hands each document a shallow copy (reportlab records
+    per-document state such as the canvas and page postponement on flowables);
+    copies share the parsed text and the _layouts dict, so only the first
+    document pays for parsing and line breaking.
+    """
+    _layouts = None  # availWidth -> (size, wrap state), shared between copies
+    
+    def wrap(self, availWidth, availHeight):
+        layout = self._layouts.get(availWidth) if self._layouts is not None else None
+        if layout is not None:
+            size, (self.width, self.height, self._wrapWidths, self.blPara) = layout
+            return size
+        size = Paragraph.wrap(self, availWidth, availHeight)
+        if self._layouts is not None:
+            self._layouts[availWidth] = (size, (self.width, self.height, self._wrapWidths, self.blPara))
+        return size
+
+
+def build_static_fragments(styles, variant, urgency_level, compliance_status, paragraph_class=Paragraph):
+    """
+    Flowables that are identical for every report sharing a (variant, urgency) pair.
+    
+    Returns a dict of flowable lists keyed by report section.
+    """
+    status_style = shared_urgency_style(styles, urgency_level)
+    
+    return {
+        'header': [
+            paragraph_class("MBRACE INTELLIGENCE", styles['ReportTitle']),
+            paragraph_class("Maryland Electrification Incentive Scan", styles['SubHeader']),
+            Spacer(1, 10),
+        ],
+        'summary_header': [paragraph_class("ESTIMATED TOTAL INCENTIVES", styles['SectionHeader'])],
+        'programs_header': [paragraph_class("PROGRAM ELIGIBILITY BREAKDOWN", styles['SectionHeader'])],
+        'financial_header': [paragraph_class("FINANCIAL IMPACT ANALYSIS", styles['SectionHeader'])],
+        'compliance': [
+            paragraph_class("MANDATE COMPLIANCE STATUS", styles['SectionHeader']),
+            paragraph_class(f"<b>Status: {urgency_level}</b>", status_style),
+            paragraph_class(compliance_status, styles['MBRACEBody']),
+            paragraph_class(MANDATE_CONTEXT, styles['MBRACEBody']),
+            Spacer(1, 15),
+        ],
+        'next_steps': [
+            paragraph_class("RECOMMENDED NEXT STEPS", styles['SectionHeader']),
+            paragraph_class(NEXT_STEPS[variant], styles['MBRACEBody']),
+            Spacer(1, 20),
+        ],
+        'footer': [
+            HRFlowable(width="100%", thickness=1, color=colors.gray),
+            Spacer(1, 10),
+            paragraph_class(DISCLAIMER, styles['Footer']),
+        ],
+    }
+
+
+_template_cache = weakref.WeakKeyDictionary()  # stylesheet -> {template key: fragments}
+_template_lock = threading.Lock()
+
+
+def get_template_fragments(styles, variant, urgency_level, compliance_status):
+    """
+    Pre-laid-out static fragments for one (variant, urgency) template.
+    
+    Fragments are built once per stylesheet; every call returns fresh shallow
+    copies so documents (and threads) never share per-build flowable state.
+    """
+    key = (variant, urgency_level, compliance_status)
+    with _template_lock:
+        templates = _template_cache.setdefault(styles, {})
+        fragments = templates.get(key)
+        if fragments is None:
+            fragments = build_static_fragments(styles, variant, urgency_level, compliance_status,
+                                               PrewrappedParagraph)
+            for flowables in fragments.values():
+                for flowable in flowables:
+                    if isinstance(flowable, PrewrappedParagraph):
+                        flowable._layouts = {}
+            templates[key] = fragments
+    return {section: [copy.copy(f) for f in flowables] for section, flowables in fragments.items()}
+
+
+def clear_template_cache():
+    """Drop all cached template fragments (e.g. after changing styles in place)."""
+    with _template_lock:
+        _template_cache.clear()
+
+
+# ============================================================================
+# PDF LAYOUT
+# ============================================================================
+class WriterFile:
+    """File-like adapter that streams PDF output to a callback in bounded chunks."""
+    
+    def __init__(self, writer, chunk_size=64 * 1024):
+        self.writer = writer
+        self.chunk_size = chunk_size
+    
+    def write(self, data):
+        view = memoryview(data)
+        for offset in range(0, len(view), self.chunk_size):
+            self.writer(view[offset:offset + self.chunk_size].tobytes())
+        return len(data)
+
+
+def _document(target, **kwargs):
+    """The letter-size document template every report uses (kwargs such as title, invariant)."""
+    return SimpleDocTemplate(
+        target,
+        pagesize=letter,
+        rightMargin=0.75*inch,
+        leftMargin=0.75*inch,
+        topMargin=0.75*inch,
+        bottomMargin=0.75*inch,
+        **kwargs
+    )
+
+
+def build_report(data, target, styles, table_styles, use_template_cache, generated_at, timer=NULL_TIMER,
+                 profile='standard', invariant=None):
+    """
+    Lay out and write one report to target (a path or binary file object).
+    
+    With an enabled timer (see render_metrics), each stage is lapped and the
+    PDF is built in memory first so the final write is timed on its own.
+    profile selects how the PDF is serialized (see OUTPUT_PROFILES); invariant=1
+    writes a fixed document ID and timestamps (None: the rl_config default).
+    """
+    buffer = BytesIO() if timer.enabled else None
+    doc = _document(buffer if timer.enabled else target, invariant=invariant)
+    story = report_story(data, styles, table_styles, use_template_cache, generated_at, timer)
+    timer.lap('story')
+    
+    # Build PDF
+    doc.build(story, canvasmaker=canvas_for_profile(profile))
+    
+    if timer.enabled:
+        timer.lap('build')
+        pdf = buffer.getvalue()
+        if hasattr(target, 'write'):
+            target.write(pdf)
+        else:
+            with open(target, 'wb') as f:
+                f.write(pdf)
+        timer.lap('write')
+
+
+def report_story(data, styles, table_styles, use_template_cache, generated_at, timer=NULL_TIMER):
+    """
+    The flowables for one report (laps 'score' once the incentives are known).
+    
+    Returns:
+        list: story for doc.build, or to append to a combined document
+    """
+    incentives = get_rules().evaluate_submission(data)
+    timer.lap('score')
+    
+    template = (report_variant(data), incentives['urgency_level'], incentives['compliance_status'])
+    if use_template_cache:
+        static = get_template_fragments(styles, *template)
+    else:
+        static = build_static_fragments(styles, *template)
+    
+    story = []
+    
+    # =========================================================================
+    # HEADER
+    # =========================================================================
+    story.extend(static['header'])
+    
+    # Property info bar
+    property_info = f"""
+    <b>Property:</b> {data.get('address', 'N/A')}<br/>
+    <b>Building Type:</b> {data.get('building_type', 'N/A').replace('_', ' ').title()}<br/>
+    <b>Utility Territory:</b> {data.get('utility', 'N/A')}<br/>
+    <b>Report Generated:</b> {generated_at.strftime('%B %d, %Y')}
+    """
+    story.append(Paragraph(property_info, styles['MBRACEBody']))
+    story.append(HRFlowable(width="100%", thickness=2, color=COLORS['primary']))
+    story.append(Spacer(1, 15))
+    
+    # =========================================================================
+    # INCENTIVE SUMMARY (The Big Number)
+    # =========================================================================
+    story.extend(static['summary_header'])
+    
+    total_range = f"${incentives['total_low']:,} — ${incentives['total_high']:,}"
+    story.append(Paragraph(total_range, styles['BigNumber']))
+    
+    coverage_text = f"Estimated Coverage: <b>{incentives['coverage_percent']}</b> of project costs"
+    story.append(Paragraph(coverage_text, styles['Highlight']))
+    story.append(Spacer(1, 10))
+    
+    # =========================================================================
+    # PROGRAM BREAKDOWN TABLE
+    # =========================================================================
+    story.extend(static['programs_header'])
+    
+    # Build table data
+    table_data = [['Program', 'Type', 'Est. Amount', 'Notes']]
+    
+    for prog in incentives['programs']:
+        table_data.append([
+            prog['name'],
+            prog['type'],
+            prog['amount'],
+            prog['notes']
+        ])
+    
+    # Create table
+    program_table = Table(table_data, colWidths=[2.2*inch, 0.8*inch, 1.3*inch, 2.2*inch])
+    program_table.setStyle(table_styles['program'])
+    timer.time_calls(program_table, 'wrap', 'table_layout')
+    
+    story.append(program_table)
+    story.append(Spacer(1, 20))
+    
+    # =========================================================================
+    # FINANCIAL IMPACT
+    # =========================================================================
+    story.extend(static['financial_header'])
+    
+    financial_data = [
+        ['Metric', 'Value'],
+        ['Est. Annual Energy Savings', f"${incentives['annual_savings']['low']:,} — ${incentives['annual_savings']['high']:,}"],
+        ['Est. Payback Period (with incentives)', f"~{incentives['payback_years']} years"],
+        ['15-Year Net Benefit vs. Waiting', f"${int(incentives['annual_savings']['low'] * 15 - (15000 - incentives['total_low'])):,}+"],
+    ]
+    
+    financial_table = Table(financial_data, colWidths=[3.5*inch, 3*inch])
+    financial_table.setStyle(table_styles['financial'])
+    timer.time_calls(financial_table, 'wrap', 'table_layout')
+    
+    story.append(financial_table)
+    story.append(Spacer(1, 20))
+    
+    # =========================================================================
+    # COMPLIANCE STATUS, NEXT STEPS, FOOTER / DISCLAIMER
+    # =========================================================================
+    story.extend(static['compliance'])
+    story.extend(static['next_steps'])
+    story.extend(static['footer'])
+    
+    return story
+
+
+# ============================================================================
+# COMBINED EXPORT
+# ============================================================================
+class LeadBookmark(Flowable):
+    """
+    Zero-size marker at the top of each report in a combined document: it
+    bookmarks its page, adds an outline entry and records (key, title, page).
+    """
+    
+    def __init__(self, key, title, placed):
+        Flowable.__init__(self)
+        self.key = key
+        self.title = title
+        self.placed = placed
+    
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+    
+    def draw(self):
+        canv = self.canv
+        canv.bookmarkPage(self.key)
+        canv.addOutlineEntry(self.title, self.key, level=0, closed=True)
+        canv.showOutline()
+        self.placed.append((self.key, self.title, canv.getPageNumber()))
+
+
+class LazyStory(list):
+    """
+    A story that doc.build drains from the front, refilled one chunk at a
+    time only once it runs empty, so at most one report's flowables are
+    alive at once. Finished pages are serialized as they are completed.
+    """
+    
+    def __init__(self, chunks):
+        list.__init__(self)
+        self._chunks = iter(chunks)
+    
+    def __len__(self):
+        if not list.__len__(self):
+            for chunk in self._chunks:
+                self.extend(chunk)
+                if list.__len__(self):
+                    break
+        return list.__len__(self)
+
+
+INDEX_ROWS_PER_TABLE = 40
+
+
+def combined_index_story(placed, skipped, styles, table_styles):
+    """Closing index: one linked row per report with its page, then the records left out."""
+    story = [Paragraph("CAMPAIGN INDEX", styles['SectionHeader'])]
+    rows = [['Report', 'Page']]
+    for key, title, page in placed:
+        rows.append([Paragraph(f'<a href="#{key}">{escape(title)}</a>', styles['MBRACEBody']), str(page)])
+    for start in range(1, len(rows), INDEX_ROWS_PER_TABLE):
+        table = Table([rows[0]] + rows[start:start + INDEX_ROWS_PER_TABLE],
+                      colWidths=[5.5*inch, 1*inch], repeatRows=1)
+        table.setStyle(table_styles['program'])
+        story.append(table)
+    if skipped:
+        story.append(Paragraph("RECORDS NOT INCLUDED", styles['SectionHeader']))
+        for index, error in skipped:
+            story.append(Paragraph(escape(f"Record {index}: {error}"), styles['MBRACEBody']))
+    return story
+
+
+def build_combined_report(items, target, styles, table_styles, generated_at, title=None, profile='standard',
+                          invariant=None):
+    """
+    Lay out many reports into one PDF, each starting on a new page.
+    
+    Reports share one document, so fonts and styles are embedded once. Each
+    report gets an outline bookmark, and a closing index page links to every
+    report with its page number. Items are laid out as they are read, but
+    the canvas holds every finished page until save(), so memory is
+    proportional to the number of pages.
+    
+    Args:
+        items: iterable of (index, title, data) where data is a submission,
+            or an exception for records that are listed as not included
+        target: output path or binary file object
+        profile: output profile (see OUTPUT_PROFILES)
+        invariant: reportlab invariant flag (see build_report)
+    
+    Returns:
+        dict: reports, pages and skipped [(index, error)]
+    """
+    placed = []
+    skipped = []
+    
+    def chunks():
+        started = False
+        for index, label, data in items:
+            if isinstance(data, Exception):
+                skipped.append((index, str(data)))
+                continue
+            story = report_story(data, styles, table_styles, True, generated_at)
+            story.insert(0, LeadBookmark(f"lead_{index:06d}", label, placed))
+            if started:
+                story.insert(0, PageBreak())
+            started = True
+            yield story
+        index_story = combined_index_story(placed, skipped, styles, table_styles)
+        yield ([PageBreak()] if started else []) + index_story
+    
+    doc = _document(target, title=title or 'MBRACE Incentive Scans', invariant=invariant)
+    doc.build(LazyStory(chunks()), canvasmaker=canvas_for_profile(profile))
+    return {'reports': len(placed), 'pages': doc.page, 'skipped': skipped}
+
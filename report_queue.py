@@ -0,0 +1,398 @@
+"""
+MBRACE Intelligence - Durable Report Queue
+==========================================
+
+SQLite-backed job queue for report generation, so a burst of leads survives
+a renderer crash. Everything lives in one local database file; several
+worker processes can drain it at once.
+
+Job lifecycle:
+    pending  --claim-->  claimed  --ack-->   done
+                            |
+                            +--nack--> pending again after a backoff delay,
+                                       or dead once max_attempts is reached
+
+A claim is a lease: if a worker dies before ack/nack, the lease expires and
+the job is claimed again, or dead-lettered if it has already used
+max_attempts (a submission that crashes its worker every time). Only the
+worker holding the lease can ack or nack a job. Reports are rendered into a content-addressed
+ReportCache, so a job that was rendered but never acked is not rendered twice.
+
+Run with:
+    python generate_incentive_report.py queue enqueue leads.jsonl
+    python generate_incentive_report.py queue work --out-dir reports --drain
+    python generate_incentive_report.py queue stats
+"""
+
+from datetime import datetime
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+import generate_incentive_report as reports
+from report_cache import ReportCache
+from submission import Submission, parse_submissions
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    submission    TEXT    NOT NULL,
+    status        TEXT    NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    available_at  REAL    NOT NULL,
+    lease_expires REAL,
+    worker        TEXT,
+    output        TEXT,
+    last_error    TEXT,
+    created_at    REAL    NOT NULL,
+    updated_at    REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at);
+"""
+
+STATUSES = ('pending', 'claimed', 'done', 'dead')
+
+
+def default_worker_name():
+    """Name stored on claims when none is given: host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ============================================================================
+# QUEUE
+# ============================================================================
+class ReportQueue:
+    """
+    Args:
+        path: SQLite database file (created on first use)
+        lease_seconds: how long a claim is held before another worker may take it
+        max_attempts: failed attempts before a job is dead-lettered
+        backoff_base: retry delay in seconds after the first failure; doubles
+            per attempt up to backoff_max
+        backoff_max: cap on the retry delay in seconds
+    """
+
+    def __init__(self, path='report_queue.db', lease_seconds=300, max_attempts=5, backoff_base=5.0,
+                 backoff_max=900.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def _transaction(self, work):
+        """Run work(cursor) inside BEGIN IMMEDIATE so claims are atomic across processes."""
+        with self._lock:
+            cursor = self._db.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(cursor)
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+            return result
+
+    def enqueue(self, data, delay=0):
+        """Add one submission. Returns its job id."""
+        return self.enqueue_many([data], delay)[0]
+
+    def enqueue_many(self, submissions, delay=0):
+        """
+        Validate and add submissions in one transaction. Returns their job ids.
+        Raises SubmissionError (nothing is queued) if any submission is invalid.
+        """
+        now = time.time()
+        rows = [json.dumps(Submission.from_dict(data).to_dict()) for data in submissions]
+
+        def insert(cursor):
+            ids = []
+            for submission in rows:
+                cursor.execute('INSERT INTO jobs (submission, available_at, created_at, updated_at) '
+                               'VALUES (?, ?, ?, ?)', (submission, now + delay, now, now))
+                ids.append(cursor.lastrowid)
+            return ids
+        return self._transaction(insert)
+
+    def claim(self, limit=1, worker=None):
+        """
+        Lease up to limit jobs that are due, oldest first. Jobs whose lease
+        expired (their worker died) are claimable again, unless they have
+        used max_attempts: those are dead-lettered with last_error
+        "lease expired" instead of being handed to another worker.
+
+        Returns:
+            list of dicts with id, data, attempts (including this one) and
+            worker (pass it back to ack/nack)
+        """
+        now = time.time()
+        worker = worker or default_worker_name()
+
+        def take(cursor):
+            cursor.execute(
+                "UPDATE jobs SET status = 'dead', lease_expires = NULL, updated_at = ?, "
+                "last_error = 'lease expired (worker ' || COALESCE(worker, '?') || ')' "
+                "WHERE status = 'claimed' AND lease_expires <= ? AND attempts >= ?",
+                (now, now, self.max_attempts))
+            rows = cursor.execute(
+                "SELECT id, submission, attempts FROM jobs "
+                "WHERE (status = 'pending' AND available_at <= ?) "
+                "   OR (status = 'claimed' AND lease_expires <= ?) "
+                "ORDER BY id LIMIT ?", (now, now, limit)).fetchall()
+            for job_id, _, _ in rows:
+                cursor.execute("UPDATE jobs SET status = 'claimed', attempts = attempts + 1, "
+                               "lease_expires = ?, worker = ?, updated_at = ? WHERE id = ?",
+                               (now + self.lease_seconds, worker, now, job_id))
+            return [{'id': job_id, 'data': json.loads(submission), 'attempts': attempts + 1, 'worker': worker}
+                    for job_id, submission, attempts in rows]
+        return self._transaction(take)
+
+    def ack(self, job_id, output=None, worker=None):
+        """
+        Mark a job claimed by worker (default this process) done.
+
+        Returns:
+            bool: False if the lease was lost (it expired and another worker
+            took the job over), in which case nothing is recorded
+        """
+        now = time.time()
+        return self._transaction(lambda cursor: cursor.execute(
+            "UPDATE jobs SET status = 'done', output = ?, lease_expires = NULL, last_error = NULL, "
+            "updated_at = ? WHERE id = ? AND worker = ? AND status = 'claimed'",
+            (output, now, job_id, worker or default_worker_name())).rowcount == 1)
+
+    def nack(self, job_id, error, worker=None):
+        """
+        Record a failed attempt by worker (default this process). The job is
+        retried after an exponential backoff, or dead-lettered once it has
+        used max_attempts.
+
+        Returns:
+            str: the job's new status ('pending' or 'dead'), or None if the
+            lease was lost and nothing was recorded
+        """
+        now = time.time()
+        worker = worker or default_worker_name()
+
+        def fail(cursor):
+            row = cursor.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'claimed'",
+                                 (job_id, worker)).fetchone()
+            if row is None:
+                if cursor.execute('SELECT 1 FROM jobs WHERE id = ?', (job_id,)).fetchone() is None:
+                    raise KeyError(job_id)
+                return None
+            attempts = row[0]
+            if attempts >= self.max_attempts:
+                status, available_at = 'dead', now
+            else:
+                status = 'pending'
+                available_at = now + min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+            cursor.execute("UPDATE jobs SET status = ?, available_at = ?, lease_expires = NULL, "
+                           "last_error = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'claimed'",
+                           (status, available_at, str(error), now, job_id, worker))
+            return status
+        return self._transaction(fail)
+
+    def release(self, job_ids, worker=None):
+        """Return jobs claimed by worker to the queue without counting the attempt (clean shutdown)."""
+        now = time.time()
+        worker = worker or default_worker_name()
+
+        def give_back(cursor):
+            for job_id in job_ids:
+                cursor.execute("UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), "
+                               "available_at = ?, lease_expires = NULL, updated_at = ? "
+                               "WHERE id = ? AND worker = ? AND status = 'claimed'", (now, now, job_id, worker))
+        self._transaction(give_back)
+
+    # ------------------------------------------------------------------------
+    # Inspection and maintenance
+    # ------------------------------------------------------------------------
+    def stats(self):
+        """Job counts by status, plus how many pending jobs are due now."""
+        with self._lock:
+            counts = dict(self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+            due = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND available_at <= ?",
+                                   (time.time(),)).fetchone()[0]
+        result = {status: counts.get(status, 0) for status in STATUSES}
+        result['due'] = due
+        return result
+
+    def dead_letters(self, limit=100):
+        with self._lock:
+            rows = self._db.execute("SELECT id, submission, attempts, last_error, updated_at FROM jobs "
+                                    "WHERE status = 'dead' ORDER BY id LIMIT ?", (limit,)).fetchall()
+        return [{'id': job_id, 'data': json.loads(submission), 'attempts': attempts, 'error': error,
+                 'failed_at': datetime.fromtimestamp(failed_at).isoformat(timespec='seconds')}
+                for job_id, submission, attempts, error, failed_at in rows]
+
+    def retry_dead(self, job_ids=None):
+        """Move dead jobs (all, or the given ids) back to pending with a fresh attempt count."""
+        now = time.time()
+
+        def revive(cursor):
+            if job_ids is None:
+                return cursor.execute("UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, "
+                                      "updated_at = ? WHERE status = 'dead'", (now, now)).rowcount
+            return sum(cursor.execute("UPDATE jobs SET status = 'pending', attempts = 0, available_at = ?, "
+                                      "updated_at = ? WHERE status = 'dead' AND id = ?",
+                                      (now, now, job_id)).rowcount for job_id in job_ids)
+        return self._transaction(revive)
+
+    def purge_done(self, older_than=0):
+        """Delete done jobs last updated more than older_than seconds ago."""
+        cutoff = time.time() - older_than
+        return self._transaction(lambda cursor: cursor.execute(
+            "DELETE FROM jobs WHERE status = 'done' AND updated_at <= ?", (cutoff,)).rowcount)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+def run_worker(queue, out_dir='reports', batch_size=8, poll_interval=1.0, drain=False, max_jobs=None,
+               worker=None, log=print):
+    """
+    Claim and render jobs until stopped.
+
+    Args:
+        queue: ReportQueue
+        out_dir: report cache directory the PDFs are rendered into
+        batch_size: jobs claimed per round trip to the database
+        poll_interval: seconds to sleep when nothing is due
+        drain: return once no job is due instead of polling forever
+        max_jobs: optional cap on jobs processed before returning
+        worker: worker name stored on claims (default host:pid)
+        log: callable for one-line progress messages (None to silence)
+
+    Returns:
+        dict: counts of ok, retried and dead jobs, and of lost leases (jobs
+        another worker took over before this one finished)
+    """
+    reports._init_render_worker()
+    cache = ReportCache(out_dir)
+    worker = worker or default_worker_name()
+    counts = {'ok': 0, 'retried': 0, 'dead': 0, 'lost': 0}
+    claimed = []
+    try:
+        while max_jobs is None or sum(counts.values()) < max_jobs:
+            limit = batch_size if max_jobs is None else min(batch_size, max_jobs - sum(counts.values()))
+            claimed = queue.claim(limit, worker)
+            if not claimed:
+                if drain:
+                    break
+                time.sleep(poll_interval)
+                continue
+            while claimed:
+                job = claimed[0]
+                try:
+                    generated_at = reports.report_clock()
+                    key = reports.report_key(job['data'], generated_at)
+                    path = cache.get(key) or reports._render_to_cache_in_worker(
+                        job['data'], out_dir, key, generated_at)[0]
+                except Exception as e:
+                    status = queue.nack(job['id'], f"{type(e).__name__}: {e}", worker)
+                    counts[{'dead': 'dead', None: 'lost'}.get(status, 'retried')] += 1
+                    if log:
+                        log(f"Job {job['id']} failed (attempt {job['attempts']}, now {status or 'taken over'}): {e}")
+                else:
+                    if queue.ack(job['id'], path, worker):
+                        counts['ok'] += 1
+                    else:
+                        counts['lost'] += 1
+                        if log:
+                            log(f"Job {job['id']} lease expired before it finished; another worker has it")
+                claimed.pop(0)
+    finally:
+        if claimed:
+            queue.release([job['id'] for job in claimed], worker)
+    return counts
+
+
+# ============================================================================
+# CLI INTERFACE
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py queue',
+                                     description='Durable local queue for MBRACE report generation')
+    parser.add_argument('--db', type=str, default='report_queue.db', help='Queue database file')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='Queue submissions from a JSONL/CSV file or --data')
+    enqueue.add_argument('file', nargs='?', help='JSONL or CSV file with one submission per record')
+    enqueue.add_argument('--data', type=str, help='JSON string with one submission')
+
+    work = commands.add_parser('work', help='Render queued jobs')
+    work.add_argument('--out-dir', type=str, default='reports', help='Report cache directory')
+    work.add_argument('--batch-size', type=int, default=8, help='Jobs claimed per round trip')
+    work.add_argument('--poll', type=float, default=1.0, help='Seconds between polls when idle')
+    work.add_argument('--drain', action='store_true', help='Exit once no job is due')
+    work.add_argument('--max-attempts', type=int, default=5, help='Attempts before dead-lettering')
+    work.add_argument('--lease', type=float, default=300, help='Claim lease in seconds')
+
+    commands.add_parser('stats', help='Show job counts by status')
+    dead = commands.add_parser('dead', help='List dead-lettered jobs')
+    dead.add_argument('--limit', type=int, default=100)
+    retry = commands.add_parser('retry-dead', help='Re-queue dead-lettered jobs')
+    retry.add_argument('ids', nargs='*', type=int, help='Job ids (default: all dead jobs)')
+    purge = commands.add_parser('purge', help='Delete finished jobs')
+    purge.add_argument('--older-than', type=float, default=24, help='Hours since the job finished')
+
+    args = parser.parse_args(argv)
+    if args.command == 'work':
+        queue = ReportQueue(args.db, lease_seconds=args.lease, max_attempts=args.max_attempts)
+    else:
+        queue = ReportQueue(args.db)
+
+    try:
+        if args.command == 'enqueue':
+            if args.data:
+                try:
+                    records = [json.loads(args.data)]
+                except json.JSONDecodeError as e:
+                    parser.error(f"--data: invalid JSON: {e}")
+            elif args.file:
+                records = reports.read_submissions(args.file)
+            else:
+                parser.error('enqueue needs a file or --data')
+            valid = []
+            for index, record in enumerate(parse_submissions(records), 1):
+                if isinstance(record, Submission):
+                    valid.append(record)
+                else:
+                    print(f"Record {index} skipped: {record}")
+            ids = queue.enqueue_many(valid)
+            print(f"Queued {len(ids)} jobs" + (f" ({ids[0]}-{ids[-1]})" if ids else ''))
+        elif args.command == 'work':
+            try:
+                counts = run_worker(queue, args.out_dir, args.batch_size, args.poll, args.drain)
+            except KeyboardInterrupt:
+                counts = None
+            print(f"Worker stopped: {counts or 'interrupted'}; queue: {queue.stats()}")
+        elif args.command == 'stats':
+            print(json.dumps(queue.stats()))
+        elif args.command == 'dead':
+            for job in queue.dead_letters(args.limit):
+                print(json.dumps(job))
+        elif args.command == 'retry-dead':
+            print(f"Re-queued {queue.retry_dead(args.ids or None)} jobs")
+        elif args.command == 'purge':
+            print(f"Purged {queue.purge_done(args.older_than * 3600)} jobs")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+MBRACE Intelligence - Incremental Re-scoring
+============================================
+
+When the program catalog changes (an EmPOWER amount, an IRA tier), only
+the leads whose input combination scores differently need a new report.
+This compares the previous and current catalogs (see incentive_rules.RulesDiff)
+and re-renders just those leads from a stored submission file. Each report
+keeps its original index, so it replaces the file a full --batch run wrote
+into the same --out-dir.
+
+Run with:
+    python generate_incentive_report.py rescore leads.jsonl --old rules_2025.12.1.json --out-dir reports
+    python generate_incentive_report.py rescore leads.jsonl --old old.json --new new.json --dry-run
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import generate_incentive_report as reports
+from incentive_rules import DEFAULT_RULES_PATH, diff_rules, set_rules
+from submission import Submission, SubmissionError
+
+
+def select_affected(records, diff, counts):
+    """
+    Yield (index, Submission) for the records whose scores change under diff.
+
+    Unchanged and invalid records are skipped and tallied in counts
+    ('total', 'affected', 'skipped', 'invalid').
+    """
+    for index, data in enumerate(records, 1):
+        counts['total'] += 1
+        if isinstance(data, Exception):
+            counts['invalid'] += 1
+            continue
+        try:
+            submission = Submission.from_dict(data)
+        except SubmissionError:
+            counts['invalid'] += 1
+            continue
+        if diff.affects(submission):
+            counts['affected'] += 1
+            yield index, submission
+        else:
+            counts['skipped'] += 1
+
+
+def rescore(records, diff, out_dir='reports', manifest_path=None, workers=1, dry_run=False):
+    """
+    Re-render the reports that a catalog change affects.
+
+    The new catalog must be the process-wide rule set (set_rules) so the
+    renders, including pool workers, score with it.
+
+    Args:
+        records: iterable of stored submission dicts (e.g. from read_submissions)
+        diff: incentive_rules.RulesDiff between the previous and current catalog
+        out_dir: directory holding the reports to replace
+        manifest_path: optional JSONL file with one entry per re-rendered lead
+        workers: render processes
+        dry_run: only count affected leads, render nothing
+
+    Returns:
+        dict: counts of total, affected, skipped (unchanged), invalid,
+        rendered and failed leads, plus elapsed seconds
+    """
+    start = time.perf_counter()
+    counts = {'total': 0, 'affected': 0, 'skipped': 0, 'invalid': 0, 'rendered': 0, 'failed': 0}
+    affected = select_affected(records, diff, counts)
+    if dry_run:
+        for _ in affected:
+            pass
+    else:
+        for entry in reports.generate_reports(affected, out_dir, manifest_path, workers=workers,
+                                              indexed=True):
+            if entry['status'] == 'ok':
+                counts['rendered'] += 1
+            else:
+                counts['failed'] += 1
+                print(f"Record {entry['index']} failed: {entry['error']}", file=sys.stderr)
+    counts['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py rescore',
+                                     description='Re-render only the reports a catalog change affects')
+    parser.add_argument('file', nargs='?', help='Stored submissions (JSONL or CSV) to check')
+    parser.add_argument('--old', type=str, required=True, help='Previous incentive catalog JSON')
+    parser.add_argument('--new', type=str, default=None,
+                        help='Current catalog (default: $MBRACE_INCENTIVE_RULES or incentive_rules.json)')
+    parser.add_argument('--out-dir', type=str, default='reports', help='Directory holding the reports to replace')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='JSONL manifest of re-rendered leads (defaults to <out-dir>/rescore_manifest.jsonl)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Render processes')
+    parser.add_argument('--dry-run', action='store_true', help='Count affected leads without rendering')
+    parser.add_argument('--diff', action='store_true', help='Print the catalog diff as JSON')
+    args = parser.parse_args(argv)
+
+    new_path = os.path.abspath(args.new or os.environ.get('MBRACE_INCENTIVE_RULES') or DEFAULT_RULES_PATH)
+    diff = diff_rules(args.old, new_path)
+    if args.diff or not args.file:
+        print(json.dumps(diff.summary(), indent=2, default=str))
+        if not args.file:
+            return 0
+    print(f"Catalog {diff.old.version} -> {diff.new.version}: {len(diff.changes)} changed entries, "
+          f"{len(diff.changed_keys)} of {diff.combinations} input combinations score differently")
+
+    # Renders (and pool workers) must score with the new catalog
+    os.environ['MBRACE_INCENTIVE_RULES'] = new_path
+    set_rules(diff.new)
+    manifest_path = None if args.dry_run else (
+        args.manifest or os.path.join(args.out_dir, 'rescore_manifest.jsonl'))
+    counts = rescore(reports.read_submissions(args.file), diff, args.out_dir, manifest_path,
+                     workers=args.workers, dry_run=args.dry_run)
+    action = 'would re-render' if args.dry_run else f"re-rendered {counts['rendered']}"
+    print(f"{counts['total']} leads: {counts['affected']} affected ({action}), "
+          f"{counts['skipped']} skipped as unchanged, {counts['invalid']} invalid, "
+          f"{counts['failed']} failed in {counts['elapsed_seconds']}s")
+    return 1 if counts['failed'] else 0
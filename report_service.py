@@ -0,0 +1,359 @@
+"""
+MBRACE Intelligence - Incentive Report HTTP Service
+===================================================
+
+Long-running PDF render service for the n8n "Generate PDF Report" node
+(PDF_GENERATION_ENDPOINT). Styles stay warm in a pool of render processes, so
+a lead no longer pays interpreter start-up and the reportlab import.
+
+Run with: python generate_incentive_report.py serve --port 8080
+
+Endpoints:
+    POST /generate   submission JSON (or the n8n {"template": ..., "data": {...}} envelope)
+                     -> application/pdf bytes, or {"path": ...} with ?response=path
+    GET  /healthz    liveness/readiness probe
+    GET  /metrics    Prometheus text exposition
+    GET  /leads      top leads from the lead index (--lead-index), e.g.
+                     ?k=500&urgency=HIGH&utility=Pepco&band=25k_50k&order_by=priority
+"""
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import generate_incentive_report as reports
+from lead_index import LeadIndex, lead_id_for
+from report_cache import ReportCache
+from submission import Submission
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+class ServiceMetrics:
+    """Thread-safe counters rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.requests = {'ok': 0, 'error': 0, 'bad_request': 0}
+        self.render_seconds = 0.0
+        self.render_count = 0
+        self.cache_hits = 0
+        self.index_errors = 0
+        self.in_flight = 0
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def index_error(self):
+        with self._lock:
+            self.index_errors += 1
+
+    def end(self, status, seconds=None):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[status] += 1
+            if seconds:
+                self.render_seconds += seconds
+                self.render_count += 1
+
+    def render(self, workers):
+        with self._lock:
+            lines = [
+                '# HELP mbrace_render_requests_total Render requests by outcome.',
+                '# TYPE mbrace_render_requests_total counter',
+            ]
+            for status, count in self.requests.items():
+                lines.append(f'mbrace_render_requests_total{{status="{status}"}} {count}')
+            lines += [
+                '# HELP mbrace_render_seconds Time spent rendering reports in workers.',
+                '# TYPE mbrace_render_seconds summary',
+                f'mbrace_render_seconds_sum {self.render_seconds:.6f}',
+                f'mbrace_render_seconds_count {self.render_count}',
+                '# HELP mbrace_report_cache_hits_total Requests answered from the report cache.',
+                '# TYPE mbrace_report_cache_hits_total counter',
+                f'mbrace_report_cache_hits_total {self.cache_hits}',
+                '# HELP mbrace_lead_index_errors_total Submissions the lead index failed to store.',
+                '# TYPE mbrace_lead_index_errors_total counter',
+                f'mbrace_lead_index_errors_total {self.index_errors}',
+                '# HELP mbrace_render_in_flight Requests currently being rendered.',
+                '# TYPE mbrace_render_in_flight gauge',
+                f'mbrace_render_in_flight {self.in_flight}',
+                '# HELP mbrace_render_workers Render worker processes.',
+                '# TYPE mbrace_render_workers gauge',
+                f'mbrace_render_workers {workers}',
+                '# HELP mbrace_uptime_seconds Seconds since the service started.',
+                '# TYPE mbrace_uptime_seconds gauge',
+                f'mbrace_uptime_seconds {time.time() - self.started:.1f}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+# ============================================================================
+# RENDER SERVICE
+# ============================================================================
+class ReportService:
+    """
+    Owns the render pool and the output store shared by all request threads.
+
+    Rendered reports are kept in a content-addressed ReportCache under
+    store_dir, so an identical resubmission is answered without rendering.
+
+    Args:
+        workers: render processes (each builds styles once at start-up)
+        store_dir: report cache directory (default ./reports)
+        timeout: seconds to wait for a render before answering 504
+        cache_max_bytes: optional size bound for the report cache
+        cache_max_age: optional age bound in seconds for cached reports
+        lead_index: optional lead_index.LeadIndex; every submission is added
+            to it as it arrives, and GET /leads queries it
+    """
+
+    def __init__(self, workers=None, store_dir='reports', timeout=60, cache_max_bytes=None,
+                 cache_max_age=None, lead_index=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.store_dir = store_dir
+        self.timeout = timeout
+        self.cache = ReportCache(store_dir, cache_max_bytes, cache_max_age)
+        self.metrics = ServiceMetrics()
+        self.lead_index = lead_index
+        self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                        initializer=reports._init_render_worker)
+        os.makedirs(store_dir, exist_ok=True)
+
+    def warm_up(self):
+        """Start every worker now so the first leads don't pay the spawn cost."""
+        futures = [self.pool.submit(reports._init_render_worker) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def render(self, data, keep=False):
+        """
+        Render one submission on the pool.
+
+        Returns (path, seconds) when keep=True, otherwise (pdf_bytes, seconds).
+        Cache hits return immediately with seconds=0. Byte responses that miss
+        the cache are rendered in memory, answered from memory and then
+        written to the cache, so a resubmission on either path is a hit.
+        """
+        generated_at = reports.report_clock()
+        key = reports.report_key(data, generated_at)
+        cached = self.cache.get(key)
+        if cached:
+            self.metrics.cache_hit()
+            if keep:
+                return os.path.abspath(cached), 0
+            with open(cached, 'rb') as f:
+                return f.read(), 0
+
+        if keep:
+            future = self.pool.submit(reports._render_to_cache_in_worker, data, self.store_dir, key,
+                                      generated_at)
+            path, seconds = future.result(timeout=self.timeout)
+            self.cache.maybe_evict()
+            return os.path.abspath(path), seconds
+        future = self.pool.submit(reports._render_bytes_in_worker, data, generated_at)
+        pdf, seconds = future.result(timeout=self.timeout)
+        try:
+            self.cache.put_bytes(key, pdf)
+        except OSError as e:  # a full or read-only store must not cost the lead its report
+            print(f"Report cache write failed: {type(e).__name__}: {e}", file=sys.stderr)
+        return pdf, seconds
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        if self.lead_index is not None:
+            self.lead_index.close()
+
+
+# /leads query parameters that may repeat (LeadIndex.top filters)
+LEAD_FILTERS = ('utility', 'building_type', 'urgency', 'band')
+
+
+def parse_lead_query(query):
+    """LeadIndex.top keyword arguments from a /leads query string. Raises ValueError."""
+    params = parse_qs(query)
+    options = {name: params[name] for name in LEAD_FILTERS if name in params}
+    for name in ('min_value', 'max_value'):
+        if name in params:
+            options[name] = int(params[name][0])
+    k = int(params.get('k', ['100'])[0])
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    options['k'] = min(k, 10000)
+    options['order_by'] = params.get('order_by', ['priority'])[0]
+    return options
+
+
+def parse_payload(body):
+    """
+    Decode a request body into the submission dict, unwrapping the n8n
+    {"template", "data"} envelope. Raises ValueError.
+    """
+    payload = json.loads(body or b'null')
+    if isinstance(payload, dict) and isinstance(payload.get('data'), dict) and 'template' in payload:
+        payload = payload['data']
+    if not isinstance(payload, dict):
+        raise ValueError('expected a JSON object with submission fields')
+    return payload
+
+
+def parse_submission(body):
+    """
+    Decode and validate a request body (see parse_payload). Raises
+    ValueError (SubmissionError for bad field values).
+    """
+    return Submission.from_dict(parse_payload(body))
+
+
+# ============================================================================
+# HTTP HANDLER
+# ============================================================================
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'MBRACEReportService/1.0'
+    service = None  # set by make_server
+
+    def _send(self, code, body, content_type='application/json'):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/healthz':
+            self._send(200, {'status': 'ok', 'workers': self.service.workers,
+                             'in_flight': self.service.metrics.in_flight})
+        elif path == '/metrics':
+            self._send(200, self.service.metrics.render(self.service.workers),
+                       'text/plain; version=0.0.4')
+        elif path == '/leads':
+            if self.service.lead_index is None:
+                self._send(404, {'error': 'no lead index (start the service with --lead-index)'})
+                return
+            try:
+                leads = self.service.lead_index.top(**parse_lead_query(urlparse(self.path).query))
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+                return
+            self._send(200, {'leads': leads, 'count': len(leads)})
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path not in ('/', '/generate'):
+            self._send(404, {'error': 'not found'})
+            return
+
+        metrics = self.service.metrics
+        metrics.begin()
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = parse_payload(self.rfile.read(length))
+            data = Submission.from_dict(payload)
+        except ValueError as e:
+            metrics.end('bad_request')
+            self._send(400, {'error': str(e)})
+            return
+        if self.service.lead_index is not None:
+            # Best effort: a locked or full index database must not cost the lead its report.
+            # The id comes from the raw payload; a Submission keeps only the report fields.
+            try:
+                self.service.lead_index.add(data, lead_id=lead_id_for(payload))
+            except Exception as e:
+                metrics.index_error()
+                print(f"Lead index add failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+        keep = parse_qs(url.query).get('response', ['pdf'])[0] == 'path'
+        try:
+            result, seconds = self.service.render(data, keep=keep)
+        except FutureTimeout:
+            metrics.end('error')
+            self._send(504, {'error': f'render exceeded {self.service.timeout}s'})
+            return
+        except Exception as e:
+            metrics.end('error')
+            self._send(500, {'error': f'{type(e).__name__}: {e}'})
+            return
+
+        metrics.end('ok', seconds)
+        if keep:
+            self._send(200, {'path': result, 'render_seconds': seconds})
+        else:
+            self._send(200, result, 'application/pdf')
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host='127.0.0.1', port=8080, service=None, quiet=False):
+    """Build a ThreadingHTTPServer bound to a ReportService."""
+    service = service or ReportService()
+    handler = type('BoundReportRequestHandler', (ReportRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.quiet = quiet
+    server.service = service
+    return server
+
+
+# ============================================================================
+# CLI INTERFACE
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py serve',
+                                     description='Run the MBRACE report render service')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=8080, help='Listen port')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Render processes (default: CPU count)')
+    parser.add_argument('--store-dir', type=str, default='reports',
+                        help='Report cache directory (also where ?response=path reports are kept)')
+    parser.add_argument('--cache-max-mb', type=float, default=None, help='Evict cached reports beyond this size')
+    parser.add_argument('--cache-max-age', type=float, default=None,
+                        help='Evict cached reports older than this many hours')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-render timeout in seconds')
+    parser.add_argument('--quiet', action='store_true', help='Disable per-request access logs')
+    parser.add_argument('--lead-index', type=str, default=None,
+                        help='Lead index database: index every submission and serve GET /leads')
+    args = parser.parse_args(argv)
+
+    service = ReportService(
+        args.workers, args.store_dir, args.timeout,
+        cache_max_bytes=int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None,
+        cache_max_age=args.cache_max_age * 3600 if args.cache_max_age else None,
+        lead_index=LeadIndex(args.lead_index) if args.lead_index else None,
+    )
+    service.warm_up()
+    server = make_server(args.host, args.port, service, args.quiet)
+    print(f"MBRACE report service listening on http://{args.host}:{args.port} "
+          f"({service.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+MBRACE Intelligence - Scenario Sweep
+====================================
+
+"What if they were on Pepco instead of BGE, or in the next income tier?"
+sweep() takes a base submission plus the fields to vary and scores the
+whole cross-product in one call, ranked by estimated incentives (or
+payback). Scoring is memoized per input combination, so even a sweep over
+every listed value of every field is a few thousand cache lookups.
+
+Axes are any calculator fields (utility, income_level, building_type,
+heating_system, system_age), each a list of values or '*' for every value
+in the catalog, plus optional project costs that replace the catalog's
+estimate when computing coverage and payback.
+
+Run with:
+    python generate_incentive_report.py sweep --data '{"utility": "BGE", ...}' \\
+        --vary utility='*' --vary income_level=under_80_ami,80_150_ami --cost 15000,25000 --pdf sweep.pdf
+"""
+
+from xml.sax.saxutils import escape
+import argparse
+import itertools
+import json
+
+from incentive_rules import KEY_FIELDS, get_rules
+from submission import Submission, SubmissionError, normalize_value
+
+ALL_VALUES = '*'
+
+# Ranking keys: (row value, highest first)
+RANK_KEYS = {
+    'total_high': (lambda row: row['total_high'], True),
+    'total_low': (lambda row: row['total_low'], True),
+    'midpoint': (lambda row: row['total_low'] + row['total_high'], True),
+    'annual_savings': (lambda row: row['annual_savings_low'] + row['annual_savings_high'], True),
+    'payback_years': (lambda row: row['payback_years'], False),
+}
+
+# Rows that fit the one-page comparison PDF
+PDF_MAX_ROWS = 30
+
+
+def _axis_values(field, values, rules, errors):
+    """Catalog values for one axis ('*' expands to every listed value)."""
+    if values == ALL_VALUES or values == [ALL_VALUES]:
+        return list(rules.domains[field])
+    resolved = []
+    for value in values:
+        member = normalize_value(field, value)
+        if member is None:
+            errors.append(f"{field}: unknown value {value!r}")
+        elif member.value not in resolved:
+            resolved.append(member.value)
+    return resolved
+
+
+def _scenario_row(rules, key, result, project_cost):
+    """One scenario: the input values, the scores and (with a cost override) recomputed coverage/payback."""
+    row = dict(zip(KEY_FIELDS, key))
+    savings = (result['annual_savings']['low'], result['annual_savings']['high'])
+    if project_cost is None:
+        project_cost = rules.project_cost(row['building_type'])
+        coverage, payback = result['coverage_percent'], result['payback_years']
+    else:
+        avg_incentive = (result['total_low'] + result['total_high']) / 2
+        coverage = rules.coverage_label(avg_incentive, project_cost)
+        payback = rules.payback_years(avg_incentive, project_cost, savings)
+    row.update(
+        project_cost=project_cost,
+        total_low=result['total_low'],
+        total_high=result['total_high'],
+        coverage_percent=coverage,
+        annual_savings_low=savings[0],
+        annual_savings_high=savings[1],
+        payback_years=payback,
+        urgency_level=result['urgency_level'],
+        programs=[program['name'] for program in result['programs']],
+    )
+    return row
+
+
+def sweep(base, axes=None, project_costs=None, rank_by='total_high', top=None):
+    """
+    Score every combination of the varied fields around a base submission.
+
+    Args:
+        base: submission dict or Submission; fields that are not varied keep
+            its values (or the catalog defaults)
+        axes: dict of field -> list of values, or '*' for every catalog value
+        project_costs: optional list of project costs to sweep in place of
+            the catalog estimate for the building type
+        rank_by: one of RANK_KEYS
+        top: keep only the best top rows
+
+    Returns:
+        dict: base (the unmodified submission's row), scenarios (count),
+        rank_by and rows ranked best first, each with rank and
+        delta_high/delta_low against the base
+
+    Raises:
+        SubmissionError: unknown field values in base or axes
+        ValueError: unknown axis field or rank_by
+    """
+    rules = get_rules()
+    axes = dict(axes or {})
+    unknown = set(axes) - set(KEY_FIELDS)
+    if unknown:
+        raise ValueError(f"cannot vary {', '.join(sorted(unknown))} (choose from {', '.join(KEY_FIELDS)})")
+    if rank_by not in RANK_KEYS:
+        raise ValueError(f"rank_by must be one of {', '.join(RANK_KEYS)}")
+    base = Submission.from_dict(base)
+
+    errors = []
+    base_key = tuple(base.get(field, rules.defaults[field]) for field in KEY_FIELDS)
+    values = [_axis_values(field, axes[field], rules, errors) if field in axes else [base_key[position]]
+              for position, field in enumerate(KEY_FIELDS)]
+    if errors:
+        raise SubmissionError(errors)
+    costs = list(project_costs) if project_costs else [None]
+    if any(cost is not None and cost <= 0 for cost in costs):
+        raise ValueError("project costs must be positive")
+
+    base_row = _scenario_row(rules, base_key, rules.evaluate_submission(base), None)
+    rows = []
+    for key in itertools.product(*values):
+        result = rules.lookup(*rules.normalize_key(key))
+        for cost in costs:
+            row = _scenario_row(rules, key, result, cost)
+            row['delta_low'] = row['total_low'] - base_row['total_low']
+            row['delta_high'] = row['total_high'] - base_row['total_high']
+            rows.append(row)
+
+    value, descending = RANK_KEYS[rank_by]
+    rows.sort(key=value, reverse=descending)
+    scenarios = len(rows)
+    if top:
+        rows = rows[:top]
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return {'base': base_row, 'scenarios': scenarios, 'rank_by': rank_by, 'rows': rows}
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+COLUMNS = (
+    ('Rank', lambda r: str(r['rank'])),
+    ('Utility', lambda r: r['utility']),
+    ('Income', lambda r: r['income_level']),
+    ('Building', lambda r: r['building_type']),
+    ('Heating', lambda r: r['heating_system']),
+    ('Age', lambda r: r['system_age']),
+    ('Cost', lambda r: f"${r['project_cost']:,}"),
+    ('Incentives', lambda r: f"${r['total_low']:,} - ${r['total_high']:,}"),
+    ('vs. Base', lambda r: f"{r['delta_high']:+,}"),
+    ('Coverage', lambda r: r['coverage_percent']),
+    ('Payback', lambda r: f"{r['payback_years']} yr"),
+)
+
+
+def format_table(result):
+    """The ranked rows as a plain-text table."""
+    header = [name for name, _ in COLUMNS]
+    lines = [[cell(row) for _, cell in COLUMNS] for row in result['rows']]
+    widths = [max(len(text) for text in column) for column in zip(header, *lines)]
+    return '\n'.join('  '.join(text.ljust(width) for text, width in zip(line, widths)).rstrip()
+                     for line in [header] + lines)
+
+
+def sweep_pdf(result, output_path, title=None, styles=None):
+    """
+    One-page comparison PDF: the base scenario and the top ranked rows.
+
+    Args:
+        result: dict returned by sweep()
+        output_path: PDF path or binary file object
+        title: heading, e.g. the lead's address
+        styles: optional (styles, table_styles) pair (default: report_layout.default_styles())
+    """
+    from reportlab.lib.pagesizes import landscape
+    import generate_incentive_report as reports
+    import report_layout as layout
+    inch = layout.inch
+    styles, table_styles = styles or layout.default_styles()
+    base = result['base']
+    rows = result['rows'][:PDF_MAX_ROWS]
+
+    doc = layout.SimpleDocTemplate(
+        output_path,
+        pagesize=landscape(layout.letter),
+        rightMargin=0.5*inch,
+        leftMargin=0.5*inch,
+        topMargin=0.5*inch,
+        bottomMargin=0.5*inch,
+        title='Incentive Scenario Comparison',
+        invariant=reports.pdf_invariant(),
+    )
+    story = [
+        layout.Paragraph("Incentive Scenario Comparison", styles['SubHeader']),
+        layout.Paragraph(
+            f"<b>{escape(title or 'Base scenario')}:</b> "
+            + ', '.join(f"{field.replace('_', ' ')} {escape(str(base[field]))}" for field in KEY_FIELDS)
+            + f" &nbsp; <b>Incentives:</b> ${base['total_low']:,} — ${base['total_high']:,}"
+            f" &nbsp; <b>Generated:</b> {reports.report_clock().strftime('%B %d, %Y')}",
+            styles['MBRACEBody']),
+    ]
+    data = [[name for name, _ in COLUMNS]] + [[cell(row) for _, cell in COLUMNS] for row in rows]
+    table = layout.Table(data, colWidths=[0.45*inch, 1.1*inch, 0.95*inch, 1.0*inch, 1.25*inch, 0.55*inch,
+                                          0.75*inch, 1.45*inch, 0.75*inch, 0.7*inch, 0.65*inch],
+                         rowHeights=[14] * len(data))
+    table.setStyle(table_styles['comparison'])
+    story.append(table)
+    shown = f"Top {len(rows)} of {result['scenarios']:,} scenarios" if result['scenarios'] > len(rows) \
+        else f"{result['scenarios']:,} scenarios"
+    story.append(layout.Paragraph(
+        f"{shown}, ranked by {result['rank_by'].replace('_', ' ')}. Estimates only; see the full "
+        "incentive scan for eligibility details.", styles['Footer']))
+    doc.build(story)
+    return output_path
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+def _parse_axis(text):
+    field, sep, values = text.partition('=')
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"expected field=value1,value2 or field=*, got {text!r}")
+    return field.strip(), ALL_VALUES if values.strip() == ALL_VALUES else [v.strip() for v in values.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='generate_incentive_report.py sweep',
+                                     description='Compare incentive estimates across what-if scenarios')
+    parser.add_argument('--data', type=str, required=True, help='JSON string with the base submission')
+    parser.add_argument('--vary', type=_parse_axis, action='append', default=[], metavar='FIELD=VALUES',
+                        help="Field to vary: comma-separated values or '*' for all (repeatable)")
+    parser.add_argument('--cost', type=str, default=None, help='Comma-separated project costs to compare')
+    parser.add_argument('--rank', choices=list(RANK_KEYS), default='total_high', help='Ranking key')
+    parser.add_argument('--top', type=int, default=None, help='Show only the best N scenarios')
+    parser.add_argument('--pdf', type=str, default=None, help='Also write a one-page comparison PDF')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON instead of a table')
+    args = parser.parse_args(argv)
+
+    try:
+        costs = [int(c) for c in args.cost.split(',')] if args.cost else None
+        result = sweep(json.loads(args.data), dict(args.vary), costs, args.rank, args.top)
+    except (ValueError, SubmissionError) as e:
+        parser.error(str(e))
+    print(json.dumps(result, indent=2) if args.json else format_table(result))
+    if args.pdf:
+        base = json.loads(args.data)
+        sweep_pdf(result, args.pdf, title=base.get('org_name') or base.get('address'))
+        print(f"Comparison PDF: {args.pdf}")
+    return 0
@@ -0,0 +1,281 @@
+"""
+MBRACE Intelligence - Calculator Submission Model
+=================================================
+
+Typed, validated representation of one calculator submission. Categorical
+fields are stored as enum members (shared singletons), so a Submission is a
+small fixed-size slots object instead of a dict of strings; batch runs that
+hold hundreds of thousands of leads use a fraction of the memory.
+
+Parsing folds case, spacing and common spellings onto the catalog values in
+one pass ("pepco" -> "Pepco", "Single Family" -> "single_family",
+"heat pump" -> "existing_heat_pump"). Values that still don't match raise
+SubmissionError listing every problem, instead of silently scoring with the
+catalog defaults. A field that was not submitted (missing, None or "")
+stays None and the catalog default applies when scoring.
+
+Submission supports get()/[] with the same field names as the submission
+dict, so it can be passed anywhere a submission dict is accepted.
+
+Usage:
+    from submission import Submission, SubmissionError
+    lead = Submission.from_json(request_body)          # bytes or str
+    lead = Submission.from_dict({'utility': 'pepco', ...})
+    calculate_incentives(lead)
+"""
+
+from dataclasses import dataclass, fields
+from enum import Enum
+import json
+import re
+
+from incentive_rules import is_blank
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # the standard library parser accepts bytes too
+    _loads = json.loads
+
+
+class SubmissionError(ValueError):
+    """A submission failed validation. errors lists one message per bad field."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
+
+
+# ============================================================================
+# CATEGORICAL FIELDS
+# ============================================================================
+# Values match the domains in incentive_rules.json and the calculator form
+class BuildingType(str, Enum):
+    SINGLE_FAMILY = 'single_family'
+    TWO_TO_FOUR_UNIT = '2-4_unit'
+    MULTIFAMILY_5_PLUS = '5+_multifamily'
+    NONPROFIT = 'nonprofit'
+
+
+class Utility(str, Enum):
+    BGE = 'BGE'
+    PEPCO = 'Pepco'
+    POTOMAC_EDISON = 'Potomac Edison'
+    SMECO = 'SMECO'
+    OTHER = 'Other'
+
+
+class HeatingSystem(str, Enum):
+    GAS = 'gas'
+    OIL = 'oil'
+    PROPANE = 'propane'
+    ELECTRIC_RESISTANCE = 'electric_resistance'
+    EXISTING_HEAT_PUMP = 'existing_heat_pump'
+
+
+class SystemAge(str, Enum):
+    UNDER_10 = '<10'
+    AGE_10_15 = '10-15'
+    AGE_15_20 = '15-20'
+    OVER_20 = '20+'
+
+
+class IncomeLevel(str, Enum):
+    UNDER_80_AMI = 'under_80_ami'
+    AMI_80_150 = '80_150_ami'
+    OVER_150_AMI = 'over_150_ami'
+
+
+ENUM_FIELDS = {
+    'building_type': BuildingType,
+    'utility': Utility,
+    'heating_system': HeatingSystem,
+    'system_age': SystemAge,
+    'income_level': IncomeLevel,
+}
+
+TEXT_FIELDS = ('address', 'phone', 'email', 'org_name')
+
+# Spellings seen in form exports and CRM imports, keyed by _fold(spelling).
+# Every canonical value is added automatically.
+ALIASES = {
+    'utility': {
+        'baltimore gas and electric': Utility.BGE,
+        'baltimore gas & electric': Utility.BGE,
+        'potomac electric power': Utility.PEPCO,
+        'potomac electric power company': Utility.PEPCO,
+        'southern maryland electric cooperative': Utility.SMECO,
+        'southern maryland electric coop': Utility.SMECO,
+    },
+    'building_type': {
+        'single family home': BuildingType.SINGLE_FAMILY,
+        'single-family': BuildingType.SINGLE_FAMILY,
+        '2-4 units': BuildingType.TWO_TO_FOUR_UNIT,
+        '5+ unit': BuildingType.MULTIFAMILY_5_PLUS,
+        '5+ units': BuildingType.MULTIFAMILY_5_PLUS,
+        '5+ multi-family': BuildingType.MULTIFAMILY_5_PLUS,
+        'non-profit': BuildingType.NONPROFIT,
+        'non profit': BuildingType.NONPROFIT,
+    },
+    'heating_system': {
+        'natural gas': HeatingSystem.GAS,
+        'heating oil': HeatingSystem.OIL,
+        'fuel oil': HeatingSystem.OIL,
+        'electric': HeatingSystem.ELECTRIC_RESISTANCE,
+        'electric baseboard': HeatingSystem.ELECTRIC_RESISTANCE,
+        'heat pump': HeatingSystem.EXISTING_HEAT_PUMP,
+    },
+    'system_age': {
+        'under 10': SystemAge.UNDER_10,
+        '0-10': SystemAge.UNDER_10,
+        '20 plus': SystemAge.OVER_20,
+        'over 20': SystemAge.OVER_20,
+    },
+    'income_level': {
+        'under 80': IncomeLevel.UNDER_80_AMI,
+        '<80 ami': IncomeLevel.UNDER_80_AMI,
+        '80-150 ami': IncomeLevel.AMI_80_150,
+        '80-150': IncomeLevel.AMI_80_150,
+        'over 150': IncomeLevel.OVER_150_AMI,
+        '>150 ami': IncomeLevel.OVER_150_AMI,
+    },
+}
+
+_SEPARATORS = re.compile(r'[\s_]+')
+
+
+def _fold(value):
+    """Case/spacing-insensitive form used to match aliases."""
+    return _SEPARATORS.sub(' ', value.replace('%', '')).strip().lower()
+
+
+# Exact canonical strings first (the common case), then folded spellings
+_EXACT = {field: {member.value: member for member in enum} for field, enum in ENUM_FIELDS.items()}
+_FOLDED = {
+    field: {**{_fold(member.value): member for member in enum},
+            **{_fold(alias): member for alias, member in ALIASES.get(field, {}).items()}}
+    for field, enum in ENUM_FIELDS.items()
+}
+
+
+def normalize_value(field, value):
+    """
+    The enum member a raw categorical value means, or None if it matches nothing.
+
+    Args:
+        field: one of ENUM_FIELDS
+        value: raw submitted value
+    """
+    if not isinstance(value, str):
+        return None
+    return _EXACT[field].get(value) or _FOLDED[field].get(_fold(value))
+
+
+# ============================================================================
+# SUBMISSION
+# ============================================================================
+@dataclass(frozen=True, slots=True)
+class Submission:
+    address: str = None
+    building_type: BuildingType = None
+    utility: Utility = None
+    heating_system: HeatingSystem = None
+    system_age: SystemAge = None
+    income_level: IncomeLevel = None
+    phone: str = None
+    email: str = None
+    org_name: str = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Validate and normalize a submission dict in one pass.
+
+        Unknown keys are ignored and blank fields (None or '') are left
+        unset, as RuleSet.submission_key treats them. Raises SubmissionError
+        listing every field that is present but unusable.
+        """
+        if isinstance(data, Submission):
+            return data
+        if not isinstance(data, dict):
+            raise SubmissionError([f"expected a JSON object, got {type(data).__name__}"])
+        values = {}
+        errors = []
+        for field, enum in ENUM_FIELDS.items():
+            raw = data.get(field)
+            if is_blank(raw):
+                continue
+            member = normalize_value(field, raw)
+            if member is None:
+                expected = ', '.join(m.value for m in enum)
+                errors.append(f"{field}: unknown value {raw!r} (expected one of {expected})")
+            else:
+                values[field] = member
+        for field in TEXT_FIELDS:
+            raw = data.get(field)
+            if is_blank(raw):
+                continue
+            # Numbers (a phone sent as a JSON number) are kept as text, as the report prints them
+            if isinstance(raw, (dict, list)):
+                errors.append(f"{field}: expected a string, got {type(raw).__name__}")
+            else:
+                values[field] = str(raw).strip()
+        if errors:
+            raise SubmissionError(errors)
+        return cls(**values)
+
+    @classmethod
+    def from_json(cls, raw):
+        """Parse and validate a JSON object from bytes or str (uses orjson when installed)."""
+        try:
+            data = _loads(raw)
+        except ValueError as e:
+            raise SubmissionError([f"invalid JSON: {e}"]) from None
+        return cls.from_dict(data)
+
+    # Read access with submission-dict field names and plain string values
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in _FIELD_SET else None
+        if value is None:
+            return default
+        return value.value if isinstance(value, Enum) else value
+
+    def __getitem__(self, field):
+        value = self.get(field)
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field):
+        return self.get(field) is not None
+
+    def keys(self):
+        return [field for field in FIELD_NAMES if self.get(field) is not None]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def to_dict(self):
+        """Plain submission dict with only the submitted fields."""
+        return {field: self.get(field) for field in self.keys()}
+
+
+FIELD_NAMES = tuple(f.name for f in fields(Submission))
+_FIELD_SET = frozenset(FIELD_NAMES)
+
+
+def parse_submissions(records):
+    """
+    Validate an iterable of submission dicts.
+
+    Yields a Submission per valid record and a SubmissionError per invalid
+    one, so batch callers can report bad records and keep going.
+    """
+    for record in records:
+        if isinstance(record, Exception):
+            yield record
+            continue
+        try:
+            yield Submission.from_dict(record)
+        except SubmissionError as e:
+            yield e
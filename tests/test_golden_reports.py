@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import generate_incentive_report as reports
+import golden_reports
+
+GOLDENS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'goldens', 'reports.jsonl.gz')
+
+
+@pytest.fixture
+def deterministic():
+    reports.set_deterministic()
+    yield
+    reports.set_deterministic(False)
+
+
+def test_committed_goldens_check_clean(capsys):
+    assert golden_reports.main(['check', '--goldens', GOLDENS, '--limit', '12', '--workers', '1']) == 0
+    assert '12 of 12 cases match' in capsys.readouterr().out
+
+
+def test_check_without_template_cache():
+    result = golden_reports.check_goldens(GOLDENS, limit=6, use_template_cache=False)
+    assert (result['cases'], result['passed'], result['failures']) == (6, 6, [])
+
+
+def test_deterministic_renders_are_identical(deterministic):
+    _, data = next(golden_reports.golden_corpus())
+    first = reports.render_report_bytes(data)
+    assert reports.render_report_bytes(data) == first
+    extracted = golden_reports.extract_pdf(first)
+    assert extracted['pages'] == len(extracted['text']) == len(extracted['structure'])
+    assert 'Report Generated: January 01, 2025' in extracted['text'][0]
+
+
+def test_lean_profile_reads_the_same(deterministic):
+    _, data = next(golden_reports.golden_corpus())
+    standard = golden_reports.extract_pdf(reports.render_report_bytes(data))
+    lean = golden_reports.extract_pdf(reports.render_report_bytes(data, output_profile='lean'))
+    assert lean['text'] == standard['text']
+
+
+def test_check_reports_drift(tmp_path):
+    path = str(tmp_path / 'goldens.jsonl.gz')
+    golden_reports.record_goldens(path, limit=4)
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    text_case = json.loads(lines[1])
+    text_case['text'][0][0] = 'A DIFFERENT TITLE'
+    text_case['text_sha256'] = 'changed'
+    bytes_case = json.loads(lines[2])
+    bytes_case['pdf_sha256'] = 'changed'
+    lines[1], lines[2] = json.dumps(text_case), json.dumps(bytes_case)
+    dropped_key = json.loads(lines.pop(4))['key']
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    result = golden_reports.check_goldens(path, limit=4)
+    kinds = {failure['key']: failure['kinds'] for failure in result['failures']}
+    assert kinds == {text_case['key']: ['text'], dropped_key: ['unexpected']}
+    assert result['bytes_only'] == [bytes_case['key']]
+    assert any('A DIFFERENT TITLE' in line for failure in result['failures'] for line in failure['diff'])
+
+
+def test_corpus_does_not_depend_on_the_benchmarks():
+    # The corpus vocabulary is owned here, so benchmark edits cannot shift the goldens
+    code = 'import sys, golden_reports; print("report_bench" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(golden_reports.__file__)))
+    assert result.stdout.strip() == 'False'
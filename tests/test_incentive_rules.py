@@ -0,0 +1,90 @@
+import itertools
+import random
+
+import pytest
+
+from generate_incentive_report import calculate_incentives
+import incentive_rules
+from incentive_rules import BULK_COLUMNS, KEY_FIELDS, UNLISTED, get_rules
+
+# Catalog values, spellings that normalize onto them, unlisted values and blanks
+EXTRA_VALUES = {
+    'utility': ['pepco', 'bge', 'Unknown Co-op', None, ''],
+    'income_level': ['not_a_band', None],
+    'building_type': ['Single Family', 'castle', None, ''],
+    'heating_system': ['heat pump', 'coal', None],
+    'system_age': ['ancient', None, ''],
+}
+
+
+def _columns(rules, count=3000, seed=0):
+    values = {field: sorted(set(domain) - {UNLISTED}) + EXTRA_VALUES[field]
+              for field, domain in zip(KEY_FIELDS, zip(*rules.input_space()))}
+    rng = random.Random(seed)
+    rows = [tuple(rng.choice(values[field]) for field in KEY_FIELDS) for _ in range(count)]
+    # Every catalog combination at least once, then random rows with aliases and blanks
+    rows = [tuple(value if value != UNLISTED else 'unlisted' for value in key)
+            for key in rules.input_space()] + rows
+    return rows, {field: [row[i] for row in rows] for i, field in enumerate(KEY_FIELDS)}
+
+
+def _expected(record):
+    result = calculate_incentives(record)
+    return {
+        'total_low': result['total_low'],
+        'total_high': result['total_high'],
+        'coverage_percent': result['coverage_percent'],
+        'annual_savings_low': result['annual_savings']['low'],
+        'annual_savings_high': result['annual_savings']['high'],
+        'payback_years': result['payback_years'],
+        'urgency_level': result['urgency_level'],
+    }
+
+
+def _assert_parity(rows, bulk):
+    for name in BULK_COLUMNS:
+        assert len(bulk[name]) == len(rows)
+    for position, row in enumerate(rows):
+        got = {name: bulk[name][position] for name in BULK_COLUMNS}
+        assert got == _expected(dict(zip(KEY_FIELDS, row))), row
+
+
+def test_evaluate_bulk_matches_evaluate():
+    rules = get_rules()
+    rows, columns = _columns(rules)
+    _assert_parity(rows, rules.evaluate_bulk(columns))
+
+
+def test_evaluate_bulk_without_numpy_matches_evaluate(monkeypatch):
+    rules = get_rules()
+    rows, columns = _columns(rules, count=500, seed=1)
+    monkeypatch.setattr(incentive_rules, '_numpy', lambda: None)
+    _assert_parity(rows, rules.evaluate_bulk(columns))
+
+
+def test_evaluate_bulk_missing_column_uses_default():
+    rules = get_rules()
+    bulk = rules.evaluate_bulk({'building_type': ['nonprofit', 'single_family']})
+    for position, building_type in enumerate(['nonprofit', 'single_family']):
+        assert {name: bulk[name][position] for name in BULK_COLUMNS} == _expected({'building_type': building_type})
+
+
+def test_blank_values_score_as_not_submitted():
+    rules = get_rules()
+    expected = _expected({'building_type': 'single_family'})
+    for blank in (None, ''):
+        record = {'utility': blank, 'building_type': 'single_family'}
+        assert _expected(record) == expected
+        bulk = rules.evaluate_bulk({field: [value] for field, value in record.items()})
+        assert {name: bulk[name][0] for name in BULK_COLUMNS} == expected
+
+
+def test_evaluate_bulk_rejects_ragged_columns():
+    with pytest.raises(ValueError):
+        get_rules().evaluate_bulk({'utility': ['BGE', 'Pepco'], 'system_age': ['20+']})
+
+
+def test_lookup_matches_evaluate_over_input_space():
+    rules = get_rules()
+    for key in itertools.islice(rules.input_space(), 0, None, 7):
+        assert incentive_rules.thaw(rules.lookup(*key)) == rules.evaluate(*rules.normalize_key(key))
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from incentive_rules import BULK_COLUMNS, KEY_FIELDS, get_rules
+from lead_archive import ArchiveError, LeadArchive, LeadArchiveWriter
+from submission import Submission, SubmissionError
+
+LEADS = [
+    {'address': '1 Main St', 'utility': 'BGE', 'building_type': 'single_family', 'heating_system': 'gas',
+     'system_age': '<10', 'income_level': 'under_80_ami', 'email': 'a@example.org'},
+    {'address': '22 Rue Café, Silver Spring', 'utility': 'Pepco', 'building_type': 'nonprofit',
+     'org_name': 'Église Communautaire', 'phone': '+14105550000'},
+    {'utility': 'smeco', 'heating_system': 'heat pump'},
+    {'address': '9 Oak Ave', 'building_type': '5+_multifamily', 'system_age': '20+', 'income_level': '80_150_ami'},
+    {},
+]
+
+
+def _canonical(records):
+    return [Submission.from_dict(record).to_dict() for record in records]
+
+
+def _read(path):
+    with LeadArchive(path) as archive:
+        return [submission.to_dict() for submission in archive]
+
+
+def test_round_trip_across_blocks(tmp_path):
+    path = str(tmp_path / 'leads.mba')
+    with LeadArchiveWriter(path, block_rows=2) as writer:
+        writer.extend(LEADS)
+    with LeadArchive(path) as archive:
+        assert len(archive) == len(LEADS)
+        assert [len(block) for block in archive.blocks()] == [2, 2, 1]
+    assert _read(path) == _canonical(LEADS)
+
+
+def test_append_to_existing_archive(tmp_path):
+    path = str(tmp_path / 'leads.mba')
+    with LeadArchiveWriter(path) as writer:
+        writer.extend(LEADS[:2])
+    with LeadArchiveWriter(path) as writer:
+        writer.extend(LEADS[2:])
+    assert _read(path) == _canonical(LEADS)
+
+
+def test_incomplete_block_is_ignored_then_truncated(tmp_path):
+    path = str(tmp_path / 'leads.mba')
+    with LeadArchiveWriter(path, block_rows=3) as writer:
+        writer.extend(LEADS)
+    complete = _canonical(LEADS[:3])
+    # Simulate a crash part way through writing the second block
+    size = os.path.getsize(path)
+    with open(path, 'r+b') as f:
+        f.truncate(size - 5)
+    assert _read(path) == complete
+
+    with LeadArchiveWriter(path) as writer:
+        writer.append(LEADS[4])
+    assert _read(path) == complete + _canonical(LEADS[4:])
+
+
+def test_score_matches_bulk_scoring_of_dicts(tmp_path):
+    path = str(tmp_path / 'leads.mba')
+    with LeadArchiveWriter(path, block_rows=2) as writer:
+        writer.extend(LEADS)
+    rules = get_rules()
+    expected = rules.evaluate_bulk({field: [Submission.from_dict(lead).get(field) for lead in LEADS]
+                                    for field in KEY_FIELDS})
+    with LeadArchive(path) as archive:
+        scored = {name: [] for name in BULK_COLUMNS}
+        for block in archive.score(rules):
+            for name in BULK_COLUMNS:
+                scored[name].extend(list(block[name]))
+    assert scored == {name: list(expected[name]) for name in BULK_COLUMNS}
+
+
+def test_invalid_record_is_rejected(tmp_path):
+    with LeadArchiveWriter(str(tmp_path / 'leads.mba')) as writer:
+        with pytest.raises(SubmissionError):
+            writer.append({'utility': 'Atlantis Power'})
+
+
+def test_non_archive_is_rejected(tmp_path):
+    path = tmp_path / 'leads.jsonl'
+    path.write_text('{"utility": "BGE"}\n')
+    with pytest.raises(ArchiveError):
+        LeadArchive(str(path))
+
+
+def test_read_submissions_accepts_archives(tmp_path):
+    import generate_incentive_report as reports
+    path = str(tmp_path / 'leads.mba')
+    with LeadArchiveWriter(path) as writer:
+        writer.extend(LEADS)
+    assert [Submission.from_dict(record).to_dict() for record in reports.read_submissions(path)] == \
+        _canonical(LEADS)
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from incentive_rules import DEFAULT_RULES_PATH, RuleSet, get_rules
+from lead_index import URGENCY_RANK, LeadIndex, lead_id_for
+
+
+def _lead(number, **fields):
+    lead = {'address': f"{number} Main St", 'utility': 'BGE', 'building_type': 'single_family',
+            'heating_system': 'gas', 'system_age': '10-15', 'income_level': 'over_150_ami'}
+    lead.update(fields)
+    return lead
+
+
+LEADS = [
+    _lead(1, lead_id='a', system_age='20+', income_level='under_80_ami'),
+    _lead(2, lead_id='b', utility='Pepco', system_age='20+'),
+    _lead(3, lead_id='c', utility='Pepco', building_type='nonprofit', income_level='under_80_ami'),
+    _lead(4, lead_id='d', utility='SMECO', system_age='<10', income_level='80_150_ami'),
+    _lead(5, lead_id='e', utility='Pepco', building_type='5+_multifamily', system_age='15-20'),
+]
+
+
+@pytest.fixture
+def index():
+    index = LeadIndex(':memory:')
+    index.add_many(LEADS)
+    yield index
+    index.close()
+
+
+def _changed_rules(**defaults):
+    """The current catalog with other defaults (as after a catalog update)."""
+    with open(DEFAULT_RULES_PATH) as f:
+        catalog = json.load(f)
+    catalog['defaults'].update(defaults)
+    catalog['version'] = 'test'
+    return RuleSet(catalog)
+
+
+def test_top_orders_by_urgency_then_value(index):
+    leads = index.top(10, include_submission=False)
+    keys = [(URGENCY_RANK[lead['urgency_level']], -lead['total_high']) for lead in leads]
+    assert keys == sorted(keys)
+    assert len(leads) == len(LEADS)
+
+
+def test_top_matches_filtering_in_python(index):
+    rules = get_rules()
+    expected = sorted(
+        (lead for lead in LEADS if lead['utility'] == 'Pepco'
+         and rules.lookup(*rules.submission_key(lead))['urgency_level'] == 'HIGH'),
+        key=lambda lead: -rules.lookup(*rules.submission_key(lead))['total_high'])
+    leads = index.top(10, utility='pepco', urgency='HIGH')
+    assert [lead['lead_id'] for lead in leads] == [lead['lead_id'] for lead in expected]
+    assert leads[0]['submission']['address'] == expected[0]['address']
+    assert index.count(utility='Pepco', urgency='HIGH') == len(expected)
+
+
+def test_top_limits_and_filters(index):
+    assert len(index.top(2)) == 2
+    assert all(lead['building_type'] == 'nonprofit' for lead in index.top(10, building_type='non-profit'))
+    assert all(lead['total_high'] >= 25000 for lead in index.top(10, band=['25k_50k', '50k_plus']))
+    with pytest.raises(ValueError):
+        index.top(10, utility='Atlantis Power')
+    with pytest.raises(ValueError):
+        index.top(0)
+    with pytest.raises(ValueError):
+        index.top(-1)
+
+
+def test_readding_a_lead_replaces_it(index):
+    index.add(_lead(1, lead_id='a', utility='SMECO'))
+    assert index.count() == len(LEADS)
+    [lead] = [lead for lead in index.top(10) if lead['lead_id'] == 'a']
+    assert lead['utility'] == 'SMECO'
+
+
+def test_contact_ids_are_scoped_to_the_address():
+    assert lead_id_for({'email': 'a@example.org', 'address': '1  Main St'}) == \
+        lead_id_for({'email': 'a@example.org', 'address': '1 main st'})
+    assert lead_id_for({'email': 'a@example.org', 'address': '1 Main St'}) != \
+        lead_id_for({'email': 'a@example.org', 'address': '2 Main St'})
+    assert lead_id_for({'lead_id': 7, 'email': 'a@example.org'}) == '7'
+    assert lead_id_for({'address': '1 Main St'}) is None
+
+
+def test_rescore_matches_indexing_with_new_catalog():
+    rules = _changed_rules(income_level='under_80_ami', utility='Pepco')
+    leads = LEADS + [{'address': '6 Main St', 'building_type': 'nonprofit'}, {'address': '7 Main St'}]
+    old = LeadIndex(':memory:')
+    old.add_many(leads)
+    old.rules = rules
+    assert old.stale
+    assert old.rescore()['updated'] == len(leads)
+    assert not old.stale
+    fresh = LeadIndex(':memory:', rules=rules)
+    fresh.add_many(leads)
+    assert old.top(100, include_submission=False) == fresh.top(100, include_submission=False)
+    # The blank fields took the new defaults
+    [blank] = [lead for lead in old.top(100) if lead['submission'] == {'address': '7 Main St'}]
+    assert (blank['utility'], blank['income_level']) == ('Pepco', 'under_80_ami')
+    old.close()
+    fresh.close()
+
+
+def test_add_rescores_a_stale_index_first(index):
+    index.rules = _changed_rules(system_age='20+')
+    index.add(_lead(8, lead_id='h'))
+    assert not index.stale
+    assert index.count() == len(LEADS) + 1
+
+
+def test_remove_and_stats(index):
+    assert index.remove('a') and not index.remove('a')
+    stats = index.stats()
+    assert stats['leads'] == len(LEADS) - 1
+    assert sum(group['leads'] for group in stats['by_utility'].values()) == stats['leads']
+
+
+def test_cli_rejects_malformed_data(tmp_path, capsys):
+    import lead_index
+    with pytest.raises(SystemExit) as exit_info:
+        lead_index.main(['--index', str(tmp_path / 'leads.db'), 'add', '--data', '{"utility": "BGE"'])
+    assert exit_info.value.code == 2
+    assert '--data: invalid JSON' in capsys.readouterr().err
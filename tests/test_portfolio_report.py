@@ -0,0 +1,65 @@
+from io import BytesIO
+
+import pytest
+
+import portfolio_report
+from portfolio_report import PortfolioProperty, score_portfolio
+from submission import SubmissionError
+
+MULTIFAMILY = {'address': '1 Elm Ct', 'building_type': '5+_multifamily', 'utility': 'BGE',
+               'income_level': 'under_80_ami', 'system_age': '20+'}
+
+
+@pytest.mark.parametrize('raw, units', [(12, 12), ('12', 12), ('12.0', 12), (12.0, 12)])
+def test_units_accept_whole_numbers_written_as_floats(raw, units):
+    assert PortfolioProperty.from_dict(dict(MULTIFAMILY, units=raw), 1).units == units
+
+
+@pytest.mark.parametrize('raw', ['12.5', '0', '-3', 'twelve', 'nan'])
+def test_units_reject_other_values(raw):
+    with pytest.raises(SubmissionError, match='units'):
+        PortfolioProperty.from_dict(dict(MULTIFAMILY, units=raw), 1)
+
+
+def test_units_required_for_per_unit_building_types():
+    with pytest.raises(SubmissionError, match='units: required'):
+        PortfolioProperty.from_dict(dict(MULTIFAMILY, unit_cuont=48), 1)
+    single = PortfolioProperty.from_dict(dict(MULTIFAMILY, building_type='single_family'), 1)
+    assert single.units == 1
+
+
+def test_per_unit_building_types_scale_by_units():
+    one = score_portfolio([dict(MULTIFAMILY, units=1)])
+    many = score_portfolio([dict(MULTIFAMILY, unit_count='48')])
+    assert many['unit_count'] == 48
+    assert (many['total_low'], many['total_high']) == (48 * one['total_low'], 48 * one['total_high'])
+    assert many['project_cost'] == 48 * one['project_cost']
+    # Other building types count once per building, whatever their units
+    house = dict(MULTIFAMILY, building_type='single_family')
+    assert score_portfolio([dict(house, units=4)])['total_high'] == score_portfolio([house])['total_high']
+
+
+def test_invalid_records_are_excluded_and_listed():
+    portfolio = score_portfolio([dict(MULTIFAMILY, units=2), dict(MULTIFAMILY, utility='Nowhere Power'), 'x'])
+    assert portfolio['property_count'] == 1
+    assert [error['index'] for error in portfolio['errors']] == [2, 3]
+
+
+def test_property_detail_is_split_into_fixed_size_tables(monkeypatch):
+    import report_layout as layout
+    tables = []
+    table = layout.Table
+
+    def recording_table(data, *args, **kwargs):
+        tables.append(data)
+        return table(data, *args, **kwargs)
+    monkeypatch.setattr(layout, 'Table', recording_table)
+    count = 2 * portfolio_report.PROPERTY_ROWS_PER_TABLE + 5
+    portfolio = score_portfolio([dict(MULTIFAMILY, units=index, property_name=f"P{index}")
+                                 for index in range(1, count + 1)])
+    pdf = BytesIO()
+    portfolio_report.generate_portfolio_report(portfolio, pdf)
+    assert pdf.getvalue().startswith(b'%PDF')
+    detail = [data for data in tables if data[0][0] == '#']
+    assert [len(data) - 1 for data in detail] == [portfolio_report.PROPERTY_ROWS_PER_TABLE] * 2 + [5]
+    assert [row[1] for data in detail for row in data[1:]] == [f"P{index}" for index in range(1, count + 1)]
@@ -0,0 +1,102 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+import generate_incentive_report as reports
+from report_async import AsyncReportRenderer
+
+
+@pytest.fixture
+def gates(monkeypatch):
+    """Replace the worker render with a fast fake; renders of an address in gates wait for its Event."""
+    gates = {}
+
+    def fake_render(data, generated_at=None):
+        gate = gates.get(data.get('address'))
+        if gate is not None:
+            gate.wait(5)
+        return f"pdf:{data.get('address')}".encode(), 0.0
+    monkeypatch.setattr(reports, '_render_bytes_in_worker', fake_render)
+    yield gates
+    for gate in gates.values():
+        gate.set()
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_timeout_includes_time_waiting_for_a_slot(gates, executor):
+    gates['slow'] = threading.Event()
+    renderer = AsyncReportRenderer(max_concurrency=1, max_pending=1, executor=executor)
+
+    async def run():
+        slow = asyncio.ensure_future(renderer.render({'address': 'slow'}))
+        await asyncio.sleep(0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await renderer.render({'address': 'queued'}, timeout=0.1)
+        gates['slow'].set()
+        return await slow
+    assert asyncio.run(run()) == b'pdf:slow'
+    assert renderer.stats == dict(renderer.stats, ok=1, timeout=1)
+
+
+def test_non_blocking_render_raises_queue_full(gates, executor):
+    gates['slow'] = threading.Event()
+    renderer = AsyncReportRenderer(max_concurrency=1, max_pending=0, executor=executor)
+
+    async def run():
+        slow = asyncio.ensure_future(renderer.render({'address': 'slow'}))
+        await asyncio.sleep(0.05)
+        with pytest.raises(asyncio.QueueFull):
+            await renderer.render({'address': 'other'}, block=False)
+        gates['slow'].set()
+        await slow
+        # A free slot admits non-blocking callers again
+        return await renderer.render({'address': 'other'}, block=False)
+    assert asyncio.run(run()) == b'pdf:other'
+    assert renderer.stats['rejected'] == 1
+
+
+def test_render_many_reads_at_most_a_window_ahead_of_a_slow_report(gates, executor):
+    gates['1'] = threading.Event()
+    renderer = AsyncReportRenderer(max_concurrency=2, max_pending=2, executor=executor)
+    read = []
+
+    async def source():
+        for index in range(1, 41):
+            read.append(index)
+            yield {'address': str(index)}
+
+    async def run():
+        entries = []
+
+        async def consume():
+            async for entry in renderer.render_many(source()):
+                entries.append(entry)
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.2)
+        assert len(read) == renderer.max_concurrency + renderer.max_pending
+        assert entries == []
+        gates['1'].set()
+        await task
+        return entries
+    entries = asyncio.run(run())
+    assert [entry['index'] for entry in entries] == list(range(1, 41))
+    assert all(entry['status'] == 'ok' for entry in entries)
+    assert entries[0]['pdf'] == b'pdf:1'
+
+
+def test_one_renderer_serves_successive_event_loops(gates, executor):
+    renderer = AsyncReportRenderer(max_concurrency=1, max_pending=4, executor=executor)
+
+    async def run():
+        # More renders than slots, so callers wait on the semaphores
+        return await asyncio.gather(*(renderer.render({'address': str(index)}) for index in range(4)))
+    for _ in range(2):
+        assert asyncio.run(run()) == [f"pdf:{index}".encode() for index in range(4)]
+    assert renderer.stats['ok'] == 8
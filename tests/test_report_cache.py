@@ -0,0 +1,146 @@
+import os
+import stat
+import time
+
+import report_cache
+from report_cache import ReportCache
+
+
+def _put(cache, key, size=100, age=0):
+    path = cache.put(key, lambda target: open(target, 'wb').write(b'x' * size))
+    if age:
+        then = time.time() - age
+        os.utime(path, (then, then))
+    return path
+
+
+def test_put_then_get(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    path = _put(cache, 'abc')
+    assert cache.get('abc') == path
+    assert cache.get('missing') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.rendering_')]
+
+
+def test_put_uses_umask_file_mode(tmp_path):
+    path = _put(ReportCache(str(tmp_path)), 'abc')
+    assert stat.S_IMODE(os.stat(path).st_mode) == report_cache.FILE_MODE
+
+
+def test_failed_render_leaves_no_file(tmp_path):
+    cache = ReportCache(str(tmp_path))
+
+    def fail(target):
+        raise RuntimeError('render failed')
+    try:
+        cache.put('abc', fail)
+    except RuntimeError:
+        pass
+    assert os.listdir(tmp_path) == []
+
+
+def test_evict_by_size_drops_least_recently_used(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=250)
+    for position, key in enumerate(('old', 'middle', 'new')):
+        _put(cache, key, age=30 - position * 10)
+    cache.get('old')  # use refreshes the LRU position
+    assert cache.evict() == 1
+    assert cache.get('middle') is None
+    assert cache.get('old') and cache.get('new')
+
+
+def test_evict_by_age(tmp_path):
+    cache = ReportCache(str(tmp_path), max_age=60)
+    _put(cache, 'stale', age=120)
+    _put(cache, 'fresh')
+    assert cache.evict() == 1
+    assert cache.stats()['reports'] == 1
+    assert cache.get('fresh')
+
+
+def test_get_expired_entry_is_a_miss(tmp_path):
+    cache = ReportCache(str(tmp_path), max_age=60)
+    _put(cache, 'stale', age=120)
+    assert cache.get('stale') is None
+    assert not os.path.exists(cache.path_for('stale'))
+
+
+def test_get_after_concurrent_eviction_is_a_miss(tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path))
+    path = _put(cache, 'abc')
+    utime = os.utime
+
+    def evicted_first(target, *args, **kwargs):
+        os.remove(target)
+        return utime(target, *args, **kwargs)
+    monkeypatch.setattr(os, 'utime', evicted_first)
+    assert cache.get('abc') is None
+    assert not os.path.exists(path)
+
+
+def test_maybe_evict_respects_interval(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=0, evict_interval=3600)
+    _put(cache, 'first')  # put() evicts once, starting the interval
+    _put(cache, 'second')
+    assert cache.maybe_evict() == 0
+    assert cache.stats()['reports'] == 1
+
+
+def test_generate_report_custom_styles_bypass_cache(tmp_path, monkeypatch):
+    import generate_incentive_report as reports
+    monkeypatch.setattr(reports, '_report_cache', ReportCache(str(tmp_path)))
+    data = {'address': '1 Main St', 'building_type': 'single_family', 'utility': 'BGE'}
+    shared = reports.generate_report(data)
+    assert reports.generate_report(data) == shared
+    custom = reports.generate_report(data, styles=reports.get_custom_styles(), table_styles=reports.get_table_styles())
+    assert custom != shared and os.path.exists(custom)
+
+
+def test_entries_skip_files_removed_during_the_scan(tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path))
+    _put(cache, 'kept')
+    gone = _put(cache, 'gone')
+    scandir = os.scandir
+
+    class Vanished:
+        def __init__(self, entry):
+            self.name, self.path = entry.name, entry.path
+
+        def stat(self):
+            raise FileNotFoundError(self.path)
+
+    class Scan:
+        def __init__(self, directory):
+            self.scan = scandir(directory)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.scan.close()
+
+        def __iter__(self):
+            return (Vanished(entry) if entry.path == gone else entry for entry in self.scan)
+    monkeypatch.setattr(os, 'scandir', Scan)
+    assert [path for path, *_ in cache.entries()] == [cache.path_for('kept')]
+    assert cache.evict() == 0
+
+
+def test_put_bytes(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    path = cache.put_bytes('abc', b'%PDF-1.4')
+    assert cache.get('abc') == path
+    with open(path, 'rb') as f:
+        assert f.read() == b'%PDF-1.4'
+
+
+def test_report_key_folds_spellings_like_submission():
+    import generate_incentive_report as reports
+    from submission import Submission
+    raw = {'address': ' 1 Main St ', 'utility': 'bge', 'building_type': '5+ Units ', 'system_age': '',
+           'income_level': None}
+    key = reports.report_key(raw)
+    assert key == reports.report_key(Submission.from_dict(raw))
+    assert key == reports.report_key({'address': '1 Main St', 'utility': 'BGE', 'building_type': '5+_multifamily'})
+    assert key != reports.report_key(dict(raw, utility='Unknown Co-op'))
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import re
+
+import pytest
+
+import generate_incentive_report as reports
+from golden_reports import extract_pdf
+
+LEAD = {'address': '1 Main St, Baltimore', 'building_type': 'nonprofit', 'org_name': 'Harbor Food Bank',
+        'utility': 'BGE', 'income_level': 'under_80_ami', 'heating_system': 'oil', 'system_age': '20+'}
+
+
+@pytest.fixture(autouse=True)
+def deterministic():
+    reports.set_deterministic()
+    yield
+    reports.set_deterministic(False)
+
+
+def _render(profile, data=LEAD):
+    return reports.render_report_bytes(data, output_profile=profile)
+
+
+def test_lean_profile_is_smaller_with_the_same_text():
+    standard, lean = _render('standard'), _render('lean')
+    assert len(lean) < len(standard)
+    # Lean page streams are binary Flate; standard ones keep reportlab's ASCII85 wrapping
+    assert b'/ASCII85Decode' in standard and b'/ASCII85Decode' not in lean
+    assert b'/FlateDecode' in lean
+    standard_text, lean_text = extract_pdf(standard)['text'], extract_pdf(lean)['text']
+    assert lean_text == standard_text
+    assert any('1 Main St, Baltimore' in line for page in lean_text for line in page)
+
+
+def test_profiles_render_alike_on_concurrent_threads():
+    profiles = ['standard', 'lean'] * 8
+    serial = {profile: _render(profile) for profile in set(profiles)}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for profile, pdf in zip(profiles, pool.map(_render, profiles)):
+            assert pdf == serial[profile]
+
+
+def test_combined_report_pages_and_outline():
+    leads = [
+        {'address': '12 Oak St', 'utility': 'BGE'},
+        LEAD,
+        {'utility': 'Nowhere Power'},
+        {'utility': 'Pepco', 'email': 'lead@example.com'},
+        {'utility': 'SMECO', 'building_type': '2-4_unit'},
+    ]
+    pdf = BytesIO()
+    result = reports.generate_combined_report(leads, pdf)
+    assert result['reports'] == 4
+    assert [index for index, _ in result['skipped']] == [3]
+
+    # Every report keeps its own page count; the index adds one page
+    single = [extract_pdf(reports.render_report_bytes(lead))['pages'] for lead in leads if lead is not leads[2]]
+    combined = extract_pdf(pdf.getvalue())
+    assert result['pages'] == combined['pages'] == sum(single) + 1
+
+    titles = [title.decode() for title in re.findall(rb'/Title \(([^)]*)\)', pdf.getvalue())[1:]]
+    assert titles == ['1. 12 Oak St', '2. Harbor Food Bank, 1 Main St, Baltimore', '4. lead@example.com',
+                      '5. 2-4 Unit, SMECO, no address']
+    index_page = ' '.join(combined['text'][-1])
+    assert all(title in index_page for title in titles)
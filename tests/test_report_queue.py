@@ -0,0 +1,133 @@
+import types
+
+import pytest
+
+import report_queue
+from report_queue import ReportQueue, run_worker
+from submission import SubmissionError
+
+LEAD = {'address': '1 Main St', 'building_type': 'single_family', 'utility': 'BGE',
+        'heating_system': 'gas', 'system_age': '<10', 'income_level': 'under_80_ami'}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time source for report_queue (time.time / time.sleep)."""
+    now = [1_000_000.0]
+
+    def advance(seconds):
+        now[0] += seconds
+    monkeypatch.setattr(report_queue, 'time', types.SimpleNamespace(time=lambda: now[0], sleep=advance))
+    return advance
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = ReportQueue(str(tmp_path / 'queue.db'), lease_seconds=60, max_attempts=3, backoff_base=5,
+                        backoff_max=12)
+    yield queue
+    queue.close()
+
+
+def test_claim_ack(queue):
+    job_id = queue.enqueue(LEAD)
+    [job] = queue.claim(worker='a')
+    assert (job['id'], job['attempts'], job['data']['utility']) == (job_id, 1, 'BGE')
+    assert queue.claim(worker='b') == []
+    assert queue.ack(job_id, 'out.pdf', worker='a')
+    assert queue.stats()['done'] == 1
+
+
+def test_enqueue_many_rejects_invalid_batch(queue):
+    with pytest.raises(SubmissionError):
+        queue.enqueue_many([LEAD, dict(LEAD, utility='Atlantis Power')])
+    assert queue.stats()['pending'] == 0
+
+
+def test_nack_backs_off_exponentially_then_dead_letters(queue, clock):
+    job_id = queue.enqueue(LEAD)
+    delays = []
+    for attempt in (1, 2):
+        [job] = queue.claim(worker='a')
+        assert job['attempts'] == attempt
+        assert queue.nack(job_id, 'boom', worker='a') == 'pending'
+        waited = 0
+        while not queue.claim(worker='probe'):
+            clock(1)
+            waited += 1
+        queue.release([job_id], worker='probe')
+        delays.append(waited)
+    assert delays == [5, 10]
+    queue.claim(worker='a')
+    assert queue.nack(job_id, 'boom', worker='a') == 'dead'
+    [dead] = queue.dead_letters()
+    assert (dead['id'], dead['attempts'], dead['error']) == (job_id, 3, 'boom')
+    assert queue.retry_dead() == 1
+    assert queue.claim(worker='a')[0]['attempts'] == 1
+
+
+def test_backoff_is_capped(tmp_path, clock):
+    queue = ReportQueue(str(tmp_path / 'queue.db'), max_attempts=10, backoff_base=5, backoff_max=12)
+    job_id = queue.enqueue(LEAD)
+    for _ in range(4):
+        queue.claim(worker='a')
+        queue.nack(job_id, 'boom', worker='a')
+        clock(12)
+    assert queue.claim(worker='a')[0]['attempts'] == 5
+    queue.close()
+
+
+def test_expired_lease_is_reclaimed_and_stale_worker_is_ignored(queue, clock):
+    job_id = queue.enqueue(LEAD)
+    queue.claim(worker='slow')
+    clock(61)
+    [job] = queue.claim(worker='fast')
+    assert job['attempts'] == 2
+    assert queue.ack(job_id, 'slow.pdf', worker='slow') is False
+    assert queue.nack(job_id, 'late failure', worker='slow') is None
+    assert queue.ack(job_id, 'fast.pdf', worker='fast')
+    assert queue.stats()['done'] == 1
+
+
+def test_lease_expiry_on_last_attempt_dead_letters(queue, clock):
+    """A job that kills its worker every time ends in the dead-letter table."""
+    job_id = queue.enqueue(LEAD)
+    for _ in range(3):
+        assert queue.claim(worker='crashing')
+        clock(61)
+    assert queue.claim(worker='next') == []
+    [dead] = queue.dead_letters()
+    assert dead['id'] == job_id and dead['error'].startswith('lease expired')
+
+
+def test_release_returns_job_without_counting_attempt(queue):
+    job_id = queue.enqueue(LEAD)
+    queue.claim(worker='a')
+    queue.release([job_id], worker='other')
+    assert queue.stats()['claimed'] == 1
+    queue.release([job_id], worker='a')
+    assert queue.claim(worker='b')[0]['attempts'] == 1
+
+
+def test_run_worker_retries_failures(queue, tmp_path, monkeypatch):
+    import generate_incentive_report as reports
+    queue.enqueue_many([LEAD, dict(LEAD, address='2 Main St')])
+    rendered = []
+
+    def render(data, out_dir, key, generated_at):
+        if data['address'] == '2 Main St':
+            raise RuntimeError('renderer crashed')
+        rendered.append(key)
+        return str(tmp_path / f"{key}.pdf"), 0.0
+    monkeypatch.setattr(reports, '_render_to_cache_in_worker', render)
+    counts = run_worker(queue, out_dir=str(tmp_path / 'reports'), drain=True, log=None)
+    assert counts == {'ok': 1, 'retried': 1, 'dead': 0, 'lost': 0}
+    assert len(rendered) == 1
+    assert queue.stats()['pending'] == 1
+
+
+def test_cli_rejects_malformed_data(tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        report_queue.main(['--db', str(tmp_path / 'queue.db'), 'enqueue', '--data', "{'utility': 'BGE'}"])
+    assert exit_info.value.code == 2
+    assert '--data: invalid JSON' in capsys.readouterr().err
@@ -0,0 +1,106 @@
+import json
+import os
+import random
+
+import pytest
+
+import incentive_rules
+from incentive_rules import DEFAULT_RULES_PATH, KEY_FIELDS, UNLISTED, RuleSet, RulesDiff, get_rules
+from report_rescore import rescore, select_affected
+
+
+def _catalog():
+    with open(DEFAULT_RULES_PATH) as f:
+        return json.load(f)
+
+
+def _rules(change):
+    catalog = _catalog()
+    change(catalog)
+    catalog['version'] = 'test'
+    return RuleSet(catalog)
+
+
+def _raise_bge(catalog):
+    catalog['utility_rebates']['utilities']['BGE']['high'] += 1000
+
+
+def _leads(rules, count=2000, seed=0):
+    """Random leads over catalog values, known spellings, unlisted values and blanks."""
+    values = {field: sorted(set(domain) - {UNLISTED}) + ['unlisted', None, '']
+              for field, domain in zip(KEY_FIELDS, zip(*rules.input_space()))}
+    values['utility'] += ['bge', 'Baltimore Gas & Electric']
+    rng = random.Random(seed)
+    leads = []
+    for number in range(count):
+        lead = {'address': f"{number} Main St"}
+        for field in KEY_FIELDS:
+            value = rng.choice(values[field])
+            if value is not None:
+                lead[field] = value
+        leads.append(lead)
+    return leads
+
+
+def _counts():
+    return {'total': 0, 'affected': 0, 'skipped': 0, 'invalid': 0}
+
+
+def test_select_affected_matches_a_full_rescore():
+    old = get_rules()
+    new = _rules(_raise_bge)
+    leads = _leads(old)
+    counts = _counts()
+    affected = {index for index, _ in select_affected(leads, RulesDiff(old, new), counts)}
+    # Unlisted values are rejected by Submission validation and never selected
+    scored = {index for index, lead in enumerate(leads, 1) if 'unlisted' not in lead.values()}
+    expected = {index for index in scored
+                if old.evaluate_submission(leads[index - 1]) != new.evaluate_submission(leads[index - 1])}
+    assert affected == expected
+    # BGE leads, including those that left utility blank (BGE is the default)
+    assert expected == {index for index in scored if leads[index - 1].get('utility') in
+                        ('BGE', 'bge', 'Baltimore Gas & Electric', '', None)}
+    assert counts == {'total': len(leads), 'affected': len(affected), 'skipped': len(scored) - len(affected),
+                      'invalid': len(leads) - len(scored)}
+
+
+def test_changed_default_affects_only_blank_leads():
+    old = get_rules()
+    new = _rules(lambda catalog: catalog['defaults'].update(utility='Pepco'))
+    leads = [{'utility': 'BGE'}, {'utility': 'Pepco'}, {}, {'utility': ''}, {'building_type': 'nonprofit'}]
+    affected = [index for index, _ in select_affected(leads, RulesDiff(old, new), _counts())]
+    assert affected == [3, 4, 5]
+
+
+def test_unchanged_catalog_affects_nothing():
+    diff = RulesDiff(get_rules(), _rules(lambda catalog: None))
+    assert not diff.changed_keys  # only the version differs
+    assert list(select_affected(_leads(get_rules(), count=200), diff, _counts())) == []
+
+
+@pytest.fixture
+def new_rules():
+    rules = _rules(_raise_bge)
+    old = get_rules()
+    incentive_rules.set_rules(rules)
+    yield old, rules
+    incentive_rules.set_rules(old)
+
+
+def test_rescore_rerenders_only_affected_reports(tmp_path, new_rules):
+    old, new = new_rules
+    leads = [{'utility': 'BGE'}, {'utility': 'Pepco'}, {'utility': 'bge', 'address': '2 Elm St'}, {'utility': 'SMECO'}]
+    for index in range(1, len(leads) + 1):
+        with open(tmp_path / f"incentive_scan_{index:06d}.pdf", 'wb') as f:
+            f.write(b'old report')
+    counts = rescore(leads, RulesDiff(old, new), str(tmp_path))
+    assert (counts['affected'], counts['skipped'], counts['rendered'], counts['failed']) == (2, 2, 2, 0)
+    reports = {index: (tmp_path / f"incentive_scan_{index:06d}.pdf").read_bytes() for index in range(1, 5)}
+    assert reports[1].startswith(b'%PDF') and reports[3].startswith(b'%PDF')
+    assert reports[2] == reports[4] == b'old report'
+
+
+def test_dry_run_renders_nothing(tmp_path, new_rules):
+    counts = rescore([{'utility': 'BGE'}], RulesDiff(*new_rules), str(tmp_path), dry_run=True)
+    assert (counts['affected'], counts['rendered']) == (1, 0)
+    assert os.listdir(tmp_path) == []
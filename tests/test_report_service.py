@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import generate_incentive_report as reports
+from lead_index import LeadIndex
+from report_service import ReportService, make_server, parse_lead_query, parse_submission
+from submission import Submission
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """Start a service on an ephemeral port; yields a request(method, path, body) helper."""
+    servers = []
+
+    def start(**options):
+        service = ReportService(workers=1, store_dir=str(tmp_path / 'reports'), **options)
+        server = make_server('127.0.0.1', 0, service, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        def request(method, path, body=None):
+            data = json.dumps(body).encode('utf-8') if body is not None else None
+            try:
+                with urllib.request.urlopen(urllib.request.Request(base + path, data, method=method)) as response:
+                    return response.status, response.headers['Content-Type'], response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.headers['Content-Type'], e.read()
+        request.service = service
+        return request
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def test_resubmitted_leads_keep_their_id(serve, tmp_path):
+    request = serve(lead_index=LeadIndex(str(tmp_path / 'leads.db')))
+    for _ in range(2):
+        assert request('POST', '/generate', {'utility': 'BGE', 'lead_id': 'LX'})[0] == 200
+        assert request('POST', '/generate', {'template': 'incentive_report',
+                                             'data': {'utility': 'Pepco', 'submission_id': 'LY'}})[0] == 200
+    status, _, body = request('GET', '/leads')
+    assert status == 200
+    leads = json.loads(body)['leads']
+    assert sorted(lead['lead_id'] for lead in leads) == ['LX', 'LY']
+
+
+def _metric(request, name):
+    for line in request('GET', '/metrics')[2].decode('utf-8').splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[1])
+
+
+def test_byte_responses_are_cached(serve):
+    request = serve()
+    lead = {'address': '1 Main St', 'utility': 'BGE', 'building_type': 'single_family'}
+    first = request('POST', '/generate', lead)
+    assert first[:2] == (200, 'application/pdf') and first[2].startswith(b'%PDF')
+    assert request('POST', '/generate', dict(lead, utility='bge'))[2] == first[2]
+    assert _metric(request, 'mbrace_report_cache_hits_total') == 1
+    status, _, body = request('POST', '/generate?response=path', lead)
+    assert status == 200
+    with open(json.loads(body)['path'], 'rb') as f:
+        assert f.read() == first[2]
+    assert _metric(request, 'mbrace_report_cache_hits_total') == 2
+
+
+def test_routes(serve):
+    request = serve()
+    status, content_type, body = request('GET', '/healthz')
+    assert (status, content_type) == (200, 'application/json')
+    assert json.loads(body)['status'] == 'ok'
+    status, content_type, body = request('GET', '/metrics')
+    assert status == 200 and content_type.startswith('text/plain')
+    assert b'mbrace_render_requests_total{status="ok"} 0' in body
+    assert request('POST', '/', {'utility': 'SMECO'})[:2] == (200, 'application/pdf')
+    assert request('GET', '/missing')[0] == 404
+    assert request('POST', '/missing', {'utility': 'SMECO'})[0] == 404
+    # /leads needs a lead index
+    assert request('GET', '/leads')[0] == 404
+
+
+def test_bad_requests_answer_400(serve):
+    request = serve(lead_index=LeadIndex(':memory:'))
+    for body in ([1, 2], {'utility': 'Nowhere Power'}, {'template': 'x', 'data': {'system_age': 'old'}}):
+        status, _, payload = request('POST', '/generate', body)
+        assert status == 400 and json.loads(payload)['error']
+    for query in ('k=0', 'k=ten', 'order_by=newest', 'urgency=SOON', 'min_value=lots'):
+        assert request('GET', f"/leads?{query}")[0] == 400, query
+    assert _metric(request, 'mbrace_render_requests_total{status="bad_request"}') == 3
+    assert request('GET', '/leads?k=5&urgency=HIGH')[0] == 200
+
+
+def test_slow_render_answers_504(serve, monkeypatch):
+    request = serve(timeout=0.05)
+    request.service.pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(reports, '_render_bytes_in_worker', lambda data, generated_at=None: time.sleep(0.3))
+    status, _, body = request('POST', '/generate', {'utility': 'BGE'})
+    assert status == 504 and 'exceeded' in json.loads(body)['error']
+    assert _metric(request, 'mbrace_render_requests_total{status="error"}') == 1
+
+
+def test_parse_submission_unwraps_the_n8n_envelope():
+    lead = {'utility': 'pepco', 'building_type': 'Single Family'}
+    expected = Submission.from_dict(lead)
+    assert parse_submission(json.dumps(lead).encode()) == expected
+    assert parse_submission(json.dumps({'template': 'incentive_report', 'data': lead})) == expected
+    # Without a template key, 'data' is just an unknown field
+    assert parse_submission(json.dumps({'data': lead})) == Submission()
+    for body in (b'', b'[]', b'"lead"', b'{not json'):
+        with pytest.raises(ValueError):
+            parse_submission(body)
+
+
+def test_parse_lead_query():
+    assert parse_lead_query('') == {'k': 100, 'order_by': 'priority'}
+    options = parse_lead_query('k=50000&utility=BGE&utility=pepco&band=25k_50k&min_value=1000&order_by=total_high')
+    assert options == {'k': 10000, 'utility': ['BGE', 'pepco'], 'band': ['25k_50k'], 'min_value': 1000,
+                       'order_by': 'total_high'}
+    for query in ('k=0', 'k=-1', 'k=x', 'max_value=1.5'):
+        with pytest.raises(ValueError):
+            parse_lead_query(query)
@@ -0,0 +1,73 @@
+import pytest
+
+import generate_incentive_report as reports
+from incentive_rules import KEY_FIELDS, get_rules
+from scenario_sweep import sweep
+from submission import SubmissionError
+
+BASE = {'address': '1 Main St', 'utility': 'SMECO', 'income_level': 'over_150_ami',
+        'building_type': 'single_family', 'heating_system': 'gas', 'system_age': '15-20'}
+
+
+def test_cross_product_size():
+    rules = get_rules()
+    axes = {'utility': '*', 'income_level': ['under_80_ami', '80-150% AMI', 'under 80']}
+    result = sweep(BASE, axes, project_costs=[15000, 25000], top=5)
+    # Spellings of one value are swept once
+    assert result['scenarios'] == len(rules.domains['utility']) * 2 * 2
+    assert [row['rank'] for row in result['rows']] == [1, 2, 3, 4, 5]
+    assert sweep(BASE)['scenarios'] == 1
+
+
+@pytest.mark.parametrize('rank_by, value, descending', [
+    ('total_high', lambda row: row['total_high'], True),
+    ('midpoint', lambda row: row['total_low'] + row['total_high'], True),
+    ('payback_years', lambda row: row['payback_years'], False),
+])
+def test_rows_are_ranked_best_first(rank_by, value, descending):
+    rows = sweep(BASE, {'utility': '*', 'income_level': '*', 'heating_system': '*'}, rank_by=rank_by)['rows']
+    values = [value(row) for row in rows]
+    assert values == sorted(values, reverse=descending)
+    assert [row['rank'] for row in rows] == list(range(1, len(rows) + 1))
+
+
+def test_base_row_and_deltas():
+    result = sweep(BASE, {'utility': '*', 'system_age': '*'})
+    base = result['base']
+    expected = reports.calculate_incentives(BASE)
+    assert (base['total_low'], base['total_high']) == (expected['total_low'], expected['total_high'])
+    for row in result['rows']:
+        assert row['delta_low'] == row['total_low'] - base['total_low']
+        assert row['delta_high'] == row['total_high'] - base['total_high']
+        scored = reports.calculate_incentives(dict(BASE, **{field: row[field] for field in KEY_FIELDS}))
+        assert (row['total_low'], row['total_high']) == (scored['total_low'], scored['total_high'])
+    same = [row for row in result['rows'] if all(row[field] == BASE[field] for field in KEY_FIELDS)]
+    assert len(same) == 1 and same[0]['delta_high'] == same[0]['delta_low'] == 0
+
+
+def test_blank_base_fields_use_the_catalog_defaults():
+    rules = get_rules()
+    base = sweep({'utility': 'Pepco'})['base']
+    assert base['building_type'] == rules.defaults['building_type']
+    assert base['total_high'] == reports.calculate_incentives({'utility': 'Pepco'})['total_high']
+
+
+def test_project_cost_override_recomputes_coverage_and_payback():
+    rules = get_rules()
+    row = sweep(BASE, project_costs=[20000])['rows'][0]
+    average = (row['total_low'] + row['total_high']) / 2
+    assert row['project_cost'] == 20000
+    assert row['coverage_percent'] == rules.coverage_label(average, 20000)
+    assert row['payback_years'] == rules.payback_years(
+        average, 20000, (row['annual_savings_low'], row['annual_savings_high']))
+
+
+def test_invalid_sweeps_are_rejected():
+    with pytest.raises(ValueError, match='cannot vary'):
+        sweep(BASE, {'address': ['x']})
+    with pytest.raises(ValueError, match='rank_by'):
+        sweep(BASE, rank_by='cheapest')
+    with pytest.raises(ValueError, match='positive'):
+        sweep(BASE, project_costs=[0])
+    with pytest.raises(SubmissionError):
+        sweep(BASE, {'utility': ['Nowhere Power']})
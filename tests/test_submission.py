@@ -0,0 +1,97 @@
+import pytest
+
+from incentive_rules import thaw
+from submission import (BuildingType, HeatingSystem, IncomeLevel, Submission, SubmissionError, SystemAge,
+                        Utility, parse_submissions)
+
+
+@pytest.mark.parametrize('field, raw, member', [
+    ('utility', 'pepco', Utility.PEPCO),
+    ('utility', 'Baltimore Gas & Electric', Utility.BGE),
+    ('utility', 'POTOMAC EDISON', Utility.POTOMAC_EDISON),
+    ('building_type', 'Single Family', BuildingType.SINGLE_FAMILY),
+    ('building_type', 'non-profit', BuildingType.NONPROFIT),
+    ('building_type', '5+ units', BuildingType.MULTIFAMILY_5_PLUS),
+    ('heating_system', 'heat pump', HeatingSystem.EXISTING_HEAT_PUMP),
+    ('heating_system', 'Natural Gas', HeatingSystem.GAS),
+    ('system_age', 'over 20', SystemAge.OVER_20),
+    ('system_age', '<10', SystemAge.UNDER_10),
+    ('income_level', '80-150% AMI', IncomeLevel.AMI_80_150),
+    ('income_level', 'under_80_ami', IncomeLevel.UNDER_80_AMI),
+])
+def test_aliases_normalize_to_catalog_values(field, raw, member):
+    submission = Submission.from_dict({field: raw})
+    assert getattr(submission, field) is member
+    assert submission[field] == member.value
+
+
+def test_rejections_list_every_bad_field():
+    with pytest.raises(SubmissionError) as raised:
+        Submission.from_dict({'utility': 'Atlantis Power', 'system_age': 'ancient', 'phone': ['410']})
+    errors = raised.value.errors
+    assert len(errors) == 3
+    assert errors[0].startswith("utility: unknown value 'Atlantis Power'")
+    assert any(error.startswith('system_age:') for error in errors)
+    assert 'phone: expected a string, got list' in errors
+
+
+@pytest.mark.parametrize('payload', [[], 'lead', 42, None])
+def test_rejects_non_objects(payload):
+    with pytest.raises(SubmissionError):
+        Submission.from_dict(payload)
+
+
+def test_blank_fields_stay_unset():
+    submission = Submission.from_dict({'utility': '', 'building_type': None, 'address': ' 1 Main St '})
+    assert submission.utility is None and submission.building_type is None
+    assert submission.to_dict() == {'address': '1 Main St'}
+    assert 'utility' not in submission
+    assert submission.get('utility', 'BGE') == 'BGE'
+    with pytest.raises(KeyError):
+        submission['utility']
+
+
+def test_scalar_text_fields_become_strings():
+    submission = Submission.from_dict({'phone': 4105551234, 'address': '1 Main St'})
+    assert submission.phone == '4105551234'
+
+
+def test_unknown_keys_are_ignored_and_dict_round_trips():
+    data = {'address': '1 Main St', 'utility': 'Pepco', 'building_type': 'nonprofit', 'org_name': 'Org',
+            'email': 'a@example.org'}
+    submission = Submission.from_dict(dict(data, campaign='spring'))
+    assert submission.to_dict() == data
+    assert Submission.from_dict(submission) is submission
+    assert Submission.from_dict(submission.to_dict()) == submission
+
+
+def test_from_json():
+    assert Submission.from_json(b'{"utility": "smeco"}').utility is Utility.SMECO
+    with pytest.raises(SubmissionError, match='invalid JSON'):
+        Submission.from_json('{not json')
+
+
+def test_parse_submissions_yields_errors_in_place():
+    bad = ValueError('line 2: bad JSON')
+    results = list(parse_submissions([{'utility': 'BGE'}, bad, {'utility': 'nowhere'}]))
+    assert isinstance(results[0], Submission)
+    assert results[1] is bad
+    assert isinstance(results[2], SubmissionError)
+
+
+def test_submission_scores_like_its_dict():
+    import generate_incentive_report as reports
+    data = {'utility': 'pepco', 'building_type': 'Single Family', 'income_level': 'under 80'}
+    canonical = {'utility': 'Pepco', 'building_type': 'single_family', 'income_level': 'under_80_ami'}
+    assert thaw(reports.calculate_incentives(Submission.from_dict(data))) == \
+        thaw(reports.calculate_incentives(canonical))
+
+
+@pytest.mark.parametrize('blank', [None, ''])
+def test_blank_fields_score_the_same_as_a_dict_and_a_submission(blank):
+    import generate_incentive_report as reports
+    data = {'utility': blank, 'income_level': blank, 'building_type': '5+_multifamily',
+            'heating_system': blank, 'system_age': blank}
+    as_dict = thaw(reports.calculate_incentives(data))
+    assert as_dict == thaw(reports.calculate_incentives(Submission.from_dict(data)))
+    assert as_dict == thaw(reports.calculate_incentives({'building_type': '5+_multifamily'}))